@@ -0,0 +1,271 @@
+"""
+Offline stand-in for an OSRM server.
+
+Implements the response shapes of OSRM's `/route/v1/{profile}/{coordinates}`,
+`/table/v1/{profile}/{coordinates}` and `/nearest/v1/{profile}/{coordinates}` services without a map
+extract. Answers are deterministic:
+distance = haversine x detour factor, duration = distance / speed. Route geometry is the straight
+line between waypoints, subdivided about every `segment_m` meters so legs carry realistic
+annotation/geometry sizes. Latency, error rate and the table size limit are configurable, so
+OSRMService and the matrix builders can be load tested on any Linux box.
+
+Usage (from the `backend` directory):
+    PYTHONPATH=./src python benchmarks/osrm_standin.py --port 5001 --latency-ms 5 --error-rate 0.01
+    # then point OSRMService(osrm_url="http://localhost:5001") at it
+
+In-process (e.g. from a harness):
+    server = start_standin(StandinConfig(latency_ms=2))   # port 0 picks a free port
+    url = f"http://127.0.0.1:{server.server_port}"
+    ...
+    server.shutdown()
+"""
+import argparse
+import base64
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from wulfs_routing_api.utils.polyline import encode_polyline
+
+
+@dataclass
+class StandinConfig:
+    detour_factor: float = 1.3
+    speed_kmh: float = 40.0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    max_table_size: int = 100
+    max_route_size: int = 500
+    segment_m: float = 250.0
+    seed: int = 0
+
+
+@dataclass
+class StandinStats:
+    requests: int = 0
+    errors: int = 0
+    by_service: dict = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, service: str, error: bool):
+        with self.lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.by_service[service] = self.by_service.get(service, 0) + 1
+
+
+def _haversine_m(a, b) -> float:
+    """Great-circle distance in meters between two (lon, lat) points."""
+    lon1, lat1, lon2, lat2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000.0 * math.asin(math.sqrt(min(1.0, h)))
+
+
+class OSRMStandin():
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.stats = StandinStats()
+        self._random = random.Random(config.seed)
+        self._random_lock = threading.Lock()
+
+    def _uniform(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+    # -- answers ------------------------------------------------------
+    def distance_m(self, a, b) -> float:
+        return _haversine_m(a, b) * self.config.detour_factor
+
+    def duration_s(self, distance_m: float) -> float:
+        return distance_m / (self.config.speed_kmh / 3.6)
+
+    def _leg(self, a, b, annotations: set):
+        distance = self.distance_m(a, b)
+        pieces = max(1, int(distance // self.config.segment_m))
+        coordinates = [[a[0] + (b[0] - a[0]) * i / pieces, a[1] + (b[1] - a[1]) * i / pieces] for i in range(pieces + 1)]
+        leg = {"distance": round(distance, 1), "duration": round(self.duration_s(distance), 1),
+               "weight": round(self.duration_s(distance), 1), "summary": "", "steps": []}
+        if annotations:
+            segment = distance / pieces
+            annotation = {}
+            if "distance" in annotations or "true" in annotations:
+                annotation["distance"] = [round(segment, 1)] * pieces
+            if "duration" in annotations or "true" in annotations:
+                annotation["duration"] = [round(self.duration_s(segment), 1)] * pieces
+            leg["annotation"] = annotation
+        return leg, coordinates
+
+    @staticmethod
+    def _waypoint(point):
+        # Deterministic, like OSRM's hints for one dataset; every coordinate snaps to itself
+        hint = base64.urlsafe_b64encode(f"standin:{point[0]:.6f},{point[1]:.6f}".encode()).decode()
+        return {"hint": hint, "distance": 0.0, "name": "", "location": [round(point[0], 6), round(point[1], 6)]}
+
+    def nearest(self, points, params):
+        if len(points) != 1:
+            return 400, {"code": "InvalidOptions", "message": "Only one input coordinate is supported"}
+        return 200, {"code": "Ok", "waypoints": [{**self._waypoint(points[0]), "nodes": [0, 0]}]}
+
+    def route(self, points, params):
+        if len(points) > self.config.max_route_size:
+            return 400, {"code": "TooBig", "message": "Number of entries exceeds the maximum route size"}
+        annotations = set(params.get("annotations", ["false"])[0].split(",")) - {"false"}
+        overview = params.get("overview", ["simplified"])[0]
+        geometries = params.get("geometries", ["polyline"])[0]
+
+        legs, line = [], []
+        for a, b in zip(points, points[1:]):
+            leg, coordinates = self._leg(a, b, annotations)
+            legs.append(leg)
+            line.extend(coordinates[1:] if line else coordinates)
+        route = {
+            "distance": round(sum(leg["distance"] for leg in legs), 1),
+            "duration": round(sum(leg["duration"] for leg in legs), 1),
+            "weight": round(sum(leg["weight"] for leg in legs), 1),
+            "weight_name": "routability",
+            "legs": legs,
+        }
+        if overview != "false":
+            if overview == "simplified":
+                line = [line[0], line[-1]] if len(line) > 2 else line
+            if geometries == "geojson":
+                route["geometry"] = {"type": "LineString", "coordinates": line}
+            else:
+                precision = 6 if geometries == "polyline6" else 5
+                route["geometry"] = encode_polyline([(lat, lon) for lon, lat in line], precision)
+        return 200, {"code": "Ok", "routes": [route], "waypoints": [self._waypoint(p) for p in points]}
+
+    def table(self, points, params):
+        if len(points) > self.config.max_table_size:
+            return 400, {"code": "TooBig", "message": "Too many table coordinates"}
+
+        def indices(name):
+            value = params.get(name, ["all"])[0]
+            return list(range(len(points))) if value == "all" else [int(i) for i in value.split(";")]
+
+        try:
+            sources, destinations = indices("sources"), indices("destinations")
+            if any(i >= len(points) for i in sources + destinations):
+                raise ValueError
+        except ValueError:
+            return 400, {"code": "InvalidOptions", "message": "Invalid sources or destinations"}
+        annotations = params.get("annotations", ["duration"])[0].split(",")
+        distances = [[round(self.distance_m(points[s], points[d]), 1) for d in destinations] for s in sources]
+        body = {
+            "code": "Ok",
+            "sources": [self._waypoint(points[s]) for s in sources],
+            "destinations": [self._waypoint(points[d]) for d in destinations],
+        }
+        if "duration" in annotations:
+            body["durations"] = [[round(self.duration_s(d), 1) for d in row] for row in distances]
+        if "distance" in annotations:
+            body["distances"] = distances
+        return 200, body
+
+    # -- dispatch -----------------------------------------------------
+    def handle(self, path: str):
+        """Return (status, body) for a request path, applying the configured latency and errors."""
+        url = urlsplit(path)  # not urlparse: it would split ";"-separated coordinates off as params
+        parts = url.path.strip("/").split("/")
+        service = parts[0] if parts else ""
+
+        delay = self.config.latency_ms + self.config.jitter_ms * self._uniform()
+        if delay:
+            time.sleep(delay / 1000)
+        if self.config.error_rate and self._uniform() < self.config.error_rate:
+            self.stats.record(service, True)
+            return 503, {"code": "Unavailable", "message": "Injected error"}
+
+        if len(parts) != 4 or service not in ("route", "table", "nearest") or parts[1] != "v1":
+            self.stats.record(service, True)
+            return 400, {"code": "InvalidUrl", "message": f"URL string malformed: {url.path}"}
+        try:
+            points = [tuple(float(v) for v in pair.split(",")) for pair in parts[3].split(";")]
+            if len(points) < (2 if service == "route" else 1) or any(
+                    len(p) != 2 or not (-180 <= p[0] <= 180 and -90 <= p[1] <= 90) for p in points):
+                raise ValueError
+        except ValueError:
+            self.stats.record(service, True)
+            return 400, {"code": "InvalidQuery", "message": "Query string malformed"}
+
+        params = parse_qs(url.query)
+        if "hints" in params and len(params["hints"][0].split(";")) != len(points):
+            self.stats.record(service, True)
+            return 400, {"code": "InvalidOptions", "message": "Number of hints must match the number of coordinates"}
+        status, body = {"route": self.route, "table": self.table, "nearest": self.nearest}[service](points, params)
+        self.stats.record(service, status != 200)
+        return status, body
+
+
+def _handler_for(standin: OSRMStandin):
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 keeps connections alive, so pooled clients can reuse them
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; without TCP_NODELAY keep-alive requests stall on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            status, body = standin.handle(self.path)
+            data = json.dumps(body, separators=(",", ":")).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class _StandinServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connection bursts into 1 s SYN retries at high concurrency
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def start_standin(config: StandinConfig = None, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread. `server.standin` exposes its stats."""
+    standin = OSRMStandin(config or StandinConfig())
+    server = _StandinServer((host, port), _handler_for(standin))
+    server.standin = standin
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--detour-factor", type=float, default=1.3)
+    parser.add_argument("--speed-kmh", type=float, default=40.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed latency added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform random latency on top of --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--max-table-size", type=int, default=100, help="Like osrm-routed --max-table-size")
+    parser.add_argument("--max-route-size", type=int, default=500, help="Like osrm-routed --max-viaroute-size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StandinConfig(detour_factor=args.detour_factor, speed_kmh=args.speed_kmh, latency_ms=args.latency_ms,
+                           jitter_ms=args.jitter_ms, error_rate=args.error_rate, max_table_size=args.max_table_size,
+                           max_route_size=args.max_route_size, seed=args.seed)
+    server = start_standin(config, args.host, args.port)
+    print(f"OSRM stand-in listening on http://{args.host}:{server.server_port} ({config})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps({"requests": server.standin.stats.requests, "errors": server.standin.stats.errors,
+                          "by_service": server.standin.stats.by_service}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+OSRM throughput harness.
+
+Drives OSRMService and the distance-matrix builder against the offline OSRM stand-in
+(benchmarks/osrm_standin.py, started in a separate process unless --url is given) and reports:
+
+  * route requests per second and latency percentiles for 1..N concurrent workers,
+    with a new connection per request (the OSRMService default) vs a pooled requests.Session
+  * VRPService.build_distance_matrix: pairwise /route calls vs the same matrix built twice
+    through a memoizing distance function vs a single /table request
+
+Usage (from the `backend` directory):
+    PYTHONPATH=./src python benchmarks/osrm_throughput.py --latency-ms 2 --requests 2000 --output osrm.json
+    PYTHONPATH=./src python benchmarks/osrm_throughput.py --url http://localhost:5001   # real OSRM
+"""
+import argparse
+import functools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from wulfs_routing_api.services.osrm_service import OSRMService
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+CUSTOMER_MASTER = os.path.join(os.path.dirname(os.path.dirname(BENCHMARKS_DIR)), "data", "wulfs_customer_master.csv")
+DEPOT = (42.34902, -71.03118)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_standin_process(args) -> tuple:
+    port = _free_port()
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in [os.path.join(os.path.dirname(BENCHMARKS_DIR), "src"), env.get("PYTHONPATH")] if p)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS_DIR, "osrm_standin.py"), "--port", str(port),
+         "--latency-ms", str(args.latency_ms), "--error-rate", str(args.error_rate)],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("OSRM stand-in did not start")
+
+def pooled_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def load_points(n: int, seed: int) -> list:
+    df = pd.read_csv(CUSTOMER_MASTER, usecols=["Latitude", "Longitude"]).dropna()
+    rng = np.random.default_rng(seed)
+    sample = df.to_numpy()[rng.choice(len(df), size=min(n, len(df)), replace=False)]
+    return [tuple(p) for p in sample]
+
+def _percentiles(latencies):
+    q = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else [0, 0, 0]
+    return {"p50_ms": round(float(q[0]), 2), "p95_ms": round(float(q[1]), 2), "p99_ms": round(float(q[2]), 2)}
+
+
+# ---------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------
+def route_throughput(url: str, pairs: list, concurrency: int, pooled: bool) -> dict:
+    session = pooled_session(concurrency) if pooled else None
+    service = OSRMService(osrm_url=url, max_retries=1, session=session)
+    latencies, failures = [], 0
+
+    def call(pair):
+        start = time.perf_counter()
+        miles, _ = service.get_route_time_distance(*pair)
+        return time.perf_counter() - start, miles is None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, failed in pool.map(call, pairs):
+            latencies.append(latency)
+            failures += failed
+    elapsed = time.perf_counter() - start
+    if session:
+        session.close()
+    return {"concurrency": concurrency, "client": "pooled" if pooled else "new-connection",
+            "requests": len(pairs), "failed": failures, "seconds": round(elapsed, 3),
+            "requests_per_second": round(len(pairs) / elapsed, 1), **_percentiles(latencies)}
+
+def matrix_builders(url: str, points: list, session: requests.Session) -> list:
+    from wulfs_routing_api.services.vrp_service import VRPService
+
+    stops = pd.DataFrame(points, columns=["lat", "lon"])
+    n = len(points) + 1
+    service = OSRMService(osrm_url=url, max_retries=1, session=session)
+    vrp = VRPService()
+    results = []
+
+    start = time.perf_counter()
+    vrp.build_distance_matrix(stops, DEPOT, distance_fn=service.get_route_distance)
+    results.append({"builder": "pairwise /route", "points": n, "requests": n * (n - 1) // 2,
+                    "seconds": round(time.perf_counter() - start, 3)})
+
+    # The same customers are routed again (e.g. a re-run job); a memoized distance function skips OSRM
+    cached = functools.lru_cache(maxsize=None)(service.get_route_distance)
+    start = time.perf_counter()
+    vrp.build_distance_matrix(stops, DEPOT, distance_fn=cached)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    vrp.build_distance_matrix(stops, DEPOT, distance_fn=cached)
+    second = time.perf_counter() - start
+    info = cached.cache_info()
+    results.append({"builder": "pairwise /route, memoized (2 builds)", "points": n, "requests": info.misses,
+                    "cache_hits": info.hits, "seconds": round(first + second, 3),
+                    "first_build_seconds": round(first, 3), "second_build_seconds": round(second, 4)})
+
+    coordinates = ";".join(f"{lon},{lat}" for lat, lon in [DEPOT, *points])
+    start = time.perf_counter()
+    response = session.get(f"{url}/table/v1/driving/{coordinates}", params={"annotations": "distance,duration"}, timeout=30)
+    response.raise_for_status()
+    table = response.json()
+    results.append({"builder": "single /table", "points": n, "requests": 1,
+                    "seconds": round(time.perf_counter() - start, 3), "code": table.get("code")})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Existing OSRM (or stand-in) URL; default starts a stand-in")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Stand-in latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stand-in injected error rate")
+    parser.add_argument("--requests", type=int, default=1000, help="Route requests per throughput run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--matrix-size", type=int, default=40, help="Stops in the matrix builder comparison")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_standin_process(args)
+    try:
+        points = load_points(max(args.matrix_size, 200), args.seed)
+        rng = np.random.default_rng(args.seed)
+        pairs = [(points[i], points[j]) for i, j in rng.integers(len(points), size=(args.requests, 2))]
+
+        throughput = []
+        for concurrency in args.concurrency:
+            for pooled in (False, True):
+                row = route_throughput(url, pairs, concurrency, pooled)
+                throughput.append(row)
+                print(f"{row['client']:<15} x{concurrency:<3} {row['requests_per_second']:>8.1f} req/s  "
+                      f"p50 {row['p50_ms']:.1f} ms  p99 {row['p99_ms']:.1f} ms  failed {row['failed']}", file=sys.stderr)
+
+        with pooled_session(4) as session:
+            matrices = matrix_builders(url, points[:args.matrix_size], session)
+        for row in matrices:
+            print(f"{row['builder']:<38} {row['requests']:>6} requests  {row['seconds']:.3f}s", file=sys.stderr)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    best = {client: max((r for r in throughput if r["client"] == client), key=lambda r: r["requests_per_second"])
+            for client in ("new-connection", "pooled")}
+    report = {
+        "target": "stand-in" if process else url,
+        "settings": {k: v for k, v in vars(args).items() if k != "output"},
+        "route_throughput": throughput,
+        "summary": {
+            "best_new_connection_rps": best["new-connection"]["requests_per_second"],
+            "best_pooled_rps": best["pooled"]["requests_per_second"],
+            "pooling_speedup": round(best["pooled"]["requests_per_second"] / best["new-connection"]["requests_per_second"], 2),
+            "single_worker_rps": statistics.mean(r["requests_per_second"] for r in throughput if r["concurrency"] == min(args.concurrency)),
+        },
+        "matrix_builders": matrices,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+End-to-end load test for the API + Celery route generation pipeline.
+
+Replays order files against `POST /routes/generate` at a configurable concurrency and follows every
+job to completion through `GET /routes/{job_id}/status`. Everything runs in one process:
+
+  * the FastAPI app is driven through httpx's ASGI transport (no server, no lifespan)
+  * a Celery worker runs on threads (--worker-concurrency, like `celery worker --concurrency=4`)
+    against an in-memory broker and result backend, or against Redis with --redis-url
+  * Supabase is replaced by an in-memory fake seeded from the customer master (--db-latency-ms per call),
+    or with --storage sqlite by the local SQLite models (STORAGE_BACKEND=sqlite) on a fresh database
+  * OSRM is the offline stand-in (benchmarks/osrm_standin.py) in a separate process, unless --osrm-url
+
+Reported per job and as p50/p95/p99: enqueue latency (POST round trip), queue wait (enqueued ->
+task start on a worker), the duration of each task stage (from the progress events) and end-to-end
+time (POST sent -> completion observed by the polling client).
+
+Usage (from the `backend` directory):
+    PYTHONPATH=./src python benchmarks/pipeline_load_test.py --jobs 20 --concurrency 8
+    PYTHONPATH=./src python benchmarks/pipeline_load_test.py --jobs 40 --rate 0.5 --split-mode Sweep
+    PYTHONPATH=./src python benchmarks/pipeline_load_test.py --synthetic-orders 150 --output load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime as dt
+import io
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(BENCHMARKS_DIR))
+CUSTOMER_MASTER = os.path.join(REPO_ROOT, "data", "wulfs_customer_master.csv")
+DAILY_ORDERS = os.path.join(REPO_ROOT, "data", "daily_orders.xlsx")
+DEPOT = (42.34902, -71.03118)
+TERMINAL = ("SUCCESS", "FAILURE", "REVOKED")
+
+
+# ---------------------------------------------------------------------
+# Fake Supabase (sync client used by the worker)
+# ---------------------------------------------------------------------
+class _FakeQuery():
+    def __init__(self, db, table: str):
+        self.db, self.table, self.action, self.filters = db, table, "select", []
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def delete(self, *args, **kwargs):
+        self.action = "delete"
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, set(values)))
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, {value}))
+        return self
+
+    def execute(self):
+        self.db.wait()
+        rows = self.db.tables.setdefault(self.table, [])
+        matched = [r for r in rows if all(r.get(c) in v for c, v in self.filters)]
+        if self.action == "delete":
+            with self.db.lock:
+                self.db.tables[self.table] = [r for r in rows if r not in matched]
+        return SimpleNamespace(data=matched)
+
+
+class _FakeRpc():
+    def __init__(self, db, name: str, params: dict):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        self.db.wait()
+        return SimpleNamespace(data=self.db.call(self.name, self.params))
+
+
+class FakeSupabase():
+    """The subset of the supabase-py client the worker uses, answering from memory."""
+
+    def __init__(self, customers: list, latency_ms: float = 0.0):
+        self.tables = {"customers": customers, "routes": [], "stops": []}
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self._route_ids = itertools.count(1)
+
+    def wait(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def table(self, name: str):
+        return _FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict):
+        return _FakeRpc(self, name, params)
+
+    def _add_stops(self, route_ids, params, prefix):
+        with self.lock:
+            for i, route_id in enumerate(route_ids):
+                self.tables["stops"].append({"route_id": route_id, "customer_id": params[f"{prefix}customer_id"][i],
+                                             "sequence": params[f"{prefix}sequence"][i]})
+
+    def call(self, name: str, params: dict):
+        if name == "persist_route_job":
+            with self.lock:
+                created = {v: next(self._route_ids) for v in params["p_vehicle_index"]}
+                self.tables["routes"].extend({"id": rid, "route_date": params["p_route_date"]} for rid in created.values())
+            self._add_stops([created[v] for v in params["p_stop_vehicle_index"]], params, "p_stop_")
+            return [{"vehicle_index": v, "route_id": rid} for v, rid in created.items()]
+        if name == "append_route_stops":
+            self._add_stops(params["p_route_id"], params, "p_")
+            return []
+        if name == "set_customer_snaps":
+            columns = ("snap_lat", "snap_lon", "snap_distance_m", "osrm_hint")
+            snaps = {cid: {c: params[f"p_{c}"][i] for c in columns} for i, cid in enumerate(params["p_customer_id"])}
+            with self.lock:
+                for row in self.tables["customers"]:
+                    if row["id"] in snaps:
+                        row.update(snaps[row["id"]], osrm_dataset=params["p_osrm_dataset"])
+            return len(snaps)
+        raise ValueError(f"FakeSupabase has no RPC {name!r}")
+
+
+def load_customers() -> list:
+    from wulfs_routing_api.models.orders.supabase_order import SupabaseOrder
+    from wulfs_routing_api.services.order_services import OrderService
+
+    master = pd.read_csv(CUSTOMER_MASTER, dtype={"ZIP": str}).dropna(subset=["Latitude", "Longitude"])
+    master = master.drop_duplicates("Customer Name").reset_index(drop=True)
+    name_keys = OrderService(SupabaseOrder())._norm_names(master["Customer Name"])
+    return [
+        {"id": i + 1, "name_key": key, "name": row["Customer Name"], "address": row["Street Address"],
+         "city": row["City"], "state": row["State"], "zip": row["ZIP"], "lat": row["Latitude"], "lon": row["Longitude"]}
+        for i, (key, (_, row)) in enumerate(zip(name_keys, master.iterrows()))
+    ]
+
+
+# ---------------------------------------------------------------------
+# Order files
+# ---------------------------------------------------------------------
+def order_files(paths: list, synthetic_orders: int, variants: int, seed: int) -> list:
+    """(name, bytes) for each order file to replay; synthetic files sample the master's customer names."""
+    files = []
+    for path in paths:
+        with open(path, "rb") as f:
+            files.append((os.path.basename(path), f.read()))
+    if synthetic_orders:
+        names = pd.read_csv(CUSTOMER_MASTER, usecols=["Customer Name"])["Customer Name"].dropna().unique()
+        rng = np.random.default_rng(seed)
+        for i in range(variants):
+            sample = rng.choice(names, size=synthetic_orders, replace=synthetic_orders > len(names))
+            buffer = io.StringIO()
+            pd.DataFrame({"Customer Name": sample}).to_csv(buffer, index=False)
+            files.append((f"synthetic-{synthetic_orders}-{i}.csv", buffer.getvalue().encode("utf-8")))
+    if not files:
+        raise ValueError("No order files to replay")
+    return files
+
+
+# ---------------------------------------------------------------------
+# Timeline recording (worker side)
+# ---------------------------------------------------------------------
+class Timeline():
+    """Wall-clock timestamps of task start and every progress event, keyed by job id."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = {}
+        self.events = {}
+
+    def task_started(self, task_id):
+        with self.lock:
+            self.started[task_id] = time.time()
+
+    def event(self, job_id, event):
+        with self.lock:
+            self.events.setdefault(job_id, []).append((time.time(), event))
+
+
+def install_recorder(timeline: Timeline, forward: bool):
+    """Wrap progress publishing so every event is timestamped; forward to Redis pub/sub only with --redis-url."""
+    from celery.signals import task_prerun
+    from wulfs_routing_api.tasks import progress
+
+    publish = progress.publish_progress
+
+    def recording_publish(job_id, event):
+        timeline.event(job_id, event)
+        if forward:
+            publish(job_id, event)
+
+    progress.publish_progress = recording_publish
+    task_prerun.connect(lambda task_id=None, **kwargs: timeline.task_started(task_id), weak=False)
+
+
+# ---------------------------------------------------------------------
+# Load generation (client side)
+# ---------------------------------------------------------------------
+async def run_job(client, order_file, args, poll_interval: float) -> dict:
+    name, content = order_file
+    data = {"num_vehicles": str(args.vehicles), "split_mode": args.split_mode,
+            "route_date_str": dt.date.today().isoformat(), "hq_lat": str(DEPOT[0]), "hq_lon": str(DEPOT[1])}
+    submitted = time.time()
+    response = await client.post("/routes/generate", files={"orders_file": (name, content)}, data=data)
+    enqueued = time.time()
+    if response.status_code != 200:
+        return {"order_file": name, "submitted": submitted, "enqueued": enqueued, "status": "REJECTED",
+                "error": response.text[:200]}
+    job_id = response.json()["job_id"]
+
+    status = None
+    deadline = time.monotonic() + args.job_timeout
+    while time.monotonic() < deadline:
+        status = (await client.get(f"/routes/{job_id}/status")).json()["status"]
+        if status in TERMINAL:
+            break
+        await asyncio.sleep(poll_interval)
+    else:
+        status = "TIMEOUT"
+    return {"order_file": name, "job_id": job_id, "submitted": submitted, "enqueued": enqueued,
+            "observed_done": time.time(), "status": status}
+
+
+async def generate_load(app, files: list, args) -> list:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+        file_cycle = itertools.cycle(files)
+        if args.rate:
+            # Open loop: arrivals at a fixed rate regardless of how fast jobs finish
+            tasks = []
+            for _ in range(args.jobs):
+                tasks.append(asyncio.create_task(run_job(client, next(file_cycle), args, args.poll_interval)))
+                await asyncio.sleep(1 / args.rate)
+            return list(await asyncio.gather(*tasks))
+
+        # Closed loop: --concurrency clients, each submitting its next job when the previous one finishes
+        remaining = itertools.count()
+        results = []
+
+        async def user():
+            while next(remaining) < args.jobs:
+                results.append(await run_job(client, next(file_cycle), args, args.poll_interval))
+
+        await asyncio.gather(*(user() for _ in range(args.concurrency)))
+        return results
+
+
+# ---------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------
+def _percentiles(values) -> dict:
+    if not values:
+        return {"count": 0}
+    q = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "mean": round(float(np.mean(values)), 4), "p50": round(float(q[0]), 4),
+            "p95": round(float(q[1]), 4), "p99": round(float(q[2]), 4), "max": round(float(np.max(values)), 4)}
+
+
+def job_breakdown(job: dict, timeline: Timeline) -> dict:
+    """Enqueue latency, queue wait and per-stage seconds; a stage lasts until the next event."""
+    row = {"enqueue_s": job["enqueued"] - job["submitted"]}
+    job_id = job.get("job_id")
+    if job_id in timeline.started:
+        row["queue_wait_s"] = timeline.started[job_id] - job["enqueued"]
+    events = timeline.events.get(job_id, [])
+    stages = {}
+    for (t, event), (t_next, _) in zip(events, events[1:]):
+        stages[event.get("stage", event.get("status"))] = round(t_next - t, 4)
+    row["stages_s"] = stages
+    final = events[-1][1] if events else {}
+    if final.get("status") in TERMINAL:
+        row["worker_done"] = events[-1][0]
+        row["task_status"] = (final.get("result") or {}).get("status", final["status"])
+    if "observed_done" in job:
+        row["end_to_end_s"] = job["observed_done"] - job["submitted"]
+    return row
+
+
+def build_report(jobs: list, timeline: Timeline, args, elapsed: float) -> dict:
+    rows = [{**job, **job_breakdown(job, timeline)} for job in jobs]
+    completed = [r for r in rows if r.get("task_status") == "SUCCESS"]
+    stage_names = list(dict.fromkeys(s for r in completed for s in r["stages_s"]))
+    return {
+        "settings": {k: v for k, v in vars(args).items() if k != "output"},
+        "jobs": len(rows),
+        "succeeded": len(completed),
+        "failed": sum(r.get("task_status") not in (None, "SUCCESS") for r in rows),
+        "unfinished": sum(r["status"] in ("TIMEOUT", "REJECTED") for r in rows),
+        "seconds": round(elapsed, 3),
+        "jobs_per_minute": round(len(completed) / elapsed * 60, 2) if elapsed else 0.0,
+        "enqueue_s": _percentiles([r["enqueue_s"] for r in rows]),
+        "queue_wait_s": _percentiles([r["queue_wait_s"] for r in rows if "queue_wait_s" in r]),
+        "stages_s": {s: _percentiles([r["stages_s"][s] for r in completed if s in r["stages_s"]]) for s in stage_names},
+        "end_to_end_s": _percentiles([r["end_to_end_s"] for r in completed]),
+        # Completion already stored vs seen by the client; a large gap means the poll interval dominates
+        "poll_lag_s": _percentiles([r["observed_done"] - r["worker_done"] for r in completed if "worker_done" in r]),
+        "job_details": [{k: (round(v, 4) if isinstance(v, float) else v) for k, v in r.items()
+                         if k not in ("submitted", "enqueued", "observed_done", "worker_done")} for r in rows],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=12, help="Route generation jobs to submit")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed loop: simultaneous clients")
+    parser.add_argument("--rate", type=float, default=None, help="Open loop: job arrivals per second (overrides --concurrency)")
+    parser.add_argument("--orders", nargs="*", default=[DAILY_ORDERS], help="Order files (CSV/Excel) to replay")
+    parser.add_argument("--synthetic-orders", type=int, default=0, help="Also replay files of this many sampled customers")
+    parser.add_argument("--synthetic-files", type=int, default=4, help="Number of synthetic order files")
+    parser.add_argument("--vehicles", type=int, default=4)
+    parser.add_argument("--split-mode", default="OR-Tool", choices=["OR-Tool", "Sweep"])
+    parser.add_argument("--solver-time-limit", type=float, default=10.0, help="Sets VRP_TIME_LIMIT_SECONDS for the worker")
+    parser.add_argument("--worker-concurrency", type=int, default=4, help="Celery worker threads")
+    parser.add_argument("--redis-url", default=None, help="Use this Redis as broker/result backend instead of memory")
+    parser.add_argument("--storage", choices=["fake", "sqlite"], default="fake", help="Fake Supabase or local SQLite models")
+    parser.add_argument("--sqlite-path", default=":memory:", help="Database for --storage sqlite")
+    parser.add_argument("--db-latency-ms", type=float, default=20.0, help="Latency of every fake Supabase call")
+    parser.add_argument("--osrm-url", default=None, help="Existing OSRM (or stand-in) URL; default starts a stand-in")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Stand-in OSRM latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stand-in OSRM injected error rate")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="Seconds between status polls per job")
+    parser.add_argument("--job-timeout", type=float, default=600.0, help="Give up following a job after this long")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    from osrm_throughput import start_standin_process
+
+    process = None
+    if args.osrm_url is None:
+        process, args.osrm_url = start_standin_process(args)
+    # Read by OSRMService and the task when they are constructed on the worker
+    os.environ["OSRM_URL"] = args.osrm_url
+    os.environ["VRP_TIME_LIMIT_SECONDS"] = str(args.solver_time_limit)
+
+    try:
+        from celery.contrib.testing.worker import start_worker
+        from wulfs_routing_api.celery_app import celery_app
+        from wulfs_routing_api import constants
+        from wulfs_routing_api.models import supabase_db
+
+        celery_app.conf.update(
+            broker_url=args.redis_url or "memory://",
+            result_backend=args.redis_url or "cache+memory://",
+            # The memory transport polls every second by default, which would dominate queue wait
+            broker_transport_options={} if args.redis_url else {"polling_interval": 0.01},
+        )
+        if args.storage == "sqlite":
+            from wulfs_routing_api.models.customers.sqlite_customer import SQLiteCustomer
+            from wulfs_routing_api.models.sqlite_db import configure_sqlite
+
+            constants.STORAGE_BACKEND = "sqlite"
+            configure_sqlite(args.sqlite_path)
+            SQLiteCustomer().create_many(pd.DataFrame(load_customers()))
+        else:
+            supabase_db._supabase = FakeSupabase(load_customers(), args.db_latency_ms)
+            supabase_db._supabase_initialized = True
+
+        timeline = Timeline()
+        install_recorder(timeline, forward=bool(args.redis_url))
+        files = order_files(args.orders, args.synthetic_orders, args.synthetic_files, args.seed)
+
+        from wulfs_routing_api.main import app
+
+        with start_worker(celery_app, pool="threads", concurrency=args.worker_concurrency,
+                          perform_ping_check=False, loglevel="WARNING", shutdown_timeout=args.job_timeout):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sys.stderr):  # the solver prints progress; keep stdout for the report
+                jobs = asyncio.run(generate_load(app, files, args))
+            elapsed = time.perf_counter() - start
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    report = build_report(jobs, timeline, args, elapsed)
+    summary = {k: report[k] for k in ("succeeded", "failed", "unfinished", "jobs_per_minute")}
+    print(f"{summary}  e2e p50 {report['end_to_end_s'].get('p50')}s  p95 {report['end_to_end_s'].get('p95')}s  "
+          f"p99 {report['end_to_end_s'].get('p99')}s  queue wait p95 {report['queue_wait_s'].get('p95')}s", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Solver benchmark for VRPService.
+
+Builds reproducible instances (seeded) from the real customer master and from synthetic
+clustered points, solves each with every VRPService mode against a precomputed distance
+matrix, and records wall time, peak memory, total distance, route balance and
+time-to-first-solution. Every case runs in a fresh worker process so peak RSS is per case;
+Python allocation peaks come from a second, untimed solve under tracemalloc.
+
+Matrices are approximate (haversine km x --road-factor) unless a cached matrix is found in
+--matrix-dir as <instance key>.npy (depot first, in km), e.g. one saved from OSRM's /table.
+
+Usage (from the `backend` directory):
+    PYTHONPATH=./src python benchmarks/solver_benchmark.py --sizes 20 100 500 2000 --output report.json
+    PYTHONPATH=./src python benchmarks/solver_benchmark.py --baseline benchmarks/baselines/solver_baseline.json
+    PYTHONPATH=./src python benchmarks/solver_benchmark.py --save-baseline benchmarks/baselines/solver_baseline.json
+"""
+import argparse
+import contextlib
+import datetime as dt
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CUSTOMER_MASTER = os.path.join(REPO_ROOT, "data", "wulfs_customer_master.csv")
+# Depot (latitude, longitude); same HQ as the frontend default
+DEPOT = (42.34902, -71.03118)
+MODES = ["OR-Tool", "Sweep"]
+SOURCES = ["master", "clustered"]
+
+
+# ---------------------------------------------------------------------
+# Instances
+# ---------------------------------------------------------------------
+def load_master_points() -> np.ndarray:
+    df = pd.read_csv(CUSTOMER_MASTER, usecols=["Latitude", "Longitude"]).dropna()
+    return df[["Latitude", "Longitude"]].to_numpy(dtype=float)
+
+def make_instance(source: str, size: int, seed: int, master: np.ndarray) -> pd.DataFrame:
+    """
+    `master` samples real customers (with replacement and ~100 m jitter once `size` exceeds the
+    master); `clustered` draws Gaussian clusters around random centers in the master's bounding box.
+    """
+    rng = np.random.default_rng(seed)
+    if source == "master":
+        replace = size > len(master)
+        points = master[rng.choice(len(master), size=size, replace=replace)]
+        if replace:
+            points = points + rng.normal(0, 0.001, size=points.shape)
+    else:
+        lo, hi = master.min(axis=0), master.max(axis=0)
+        centers = rng.uniform(lo, hi, size=(max(3, size // 60), 2))
+        points = centers[rng.integers(len(centers), size=size)] + rng.normal(0, 0.02, size=(size, 2))
+    return pd.DataFrame({"lat": points[:, 0], "lon": points[:, 1]})
+
+def instance_key(source: str, size: int, seed: int) -> str:
+    return f"{source}-{size}-seed{seed}"
+
+def default_vehicles(size: int) -> int:
+    return int(min(40, max(2, size // 30)))
+
+
+# ---------------------------------------------------------------------
+# Matrices
+# ---------------------------------------------------------------------
+def haversine_matrix(points: np.ndarray) -> np.ndarray:
+    """Pairwise great-circle distances in km."""
+    lat, lon = np.radians(points[:, 0]), np.radians(points[:, 1])
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def distance_matrix_for(stops: pd.DataFrame, key: str, matrix_dir: str | None, road_factor: float):
+    points = np.vstack([np.asarray(DEPOT), stops[["lat", "lon"]].to_numpy()])
+    if matrix_dir:
+        path = os.path.join(matrix_dir, f"{key}.npy")
+        if os.path.exists(path):
+            matrix = np.load(path)
+            if matrix.shape == (len(points), len(points)):
+                return matrix, "cached"
+    return haversine_matrix(points) * road_factor, "approximate"
+
+
+# ---------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------
+def route_metrics(vehicle_routes, matrix: np.ndarray, num_stops: int) -> dict:
+    """Distances are evaluated on the same matrix for every mode (depot -> stops -> depot)."""
+    distances, counts = [], []
+    visited = 0
+    for stop_indices in vehicle_routes.values():
+        nodes = [0] + [i + 1 for i in stop_indices] + [0]
+        distances.append(float(matrix[nodes[:-1], nodes[1:]].sum()) if stop_indices else 0.0)
+        counts.append(len(stop_indices))
+        visited += len(stop_indices)
+    distances = np.asarray(distances)
+    mean = distances.mean() if len(distances) else 0.0
+    return {
+        "total_distance_km": round(float(distances.sum()), 3),
+        "max_route_km": round(float(distances.max()), 3) if len(distances) else 0.0,
+        "route_distance_cv": round(float(distances.std() / mean), 4) if mean else 0.0,
+        "stops_min": int(min(counts)) if counts else 0,
+        "stops_max": int(max(counts)) if counts else 0,
+        "unassigned_stops": int(num_stops - visited),
+    }
+
+
+# ---------------------------------------------------------------------
+# One case (runs in its own process)
+# ---------------------------------------------------------------------
+def run_case(case: dict) -> dict:
+    from wulfs_routing_api.services.vrp_service import VRPService
+
+    master = load_master_points()
+    stops = make_instance(case["source"], case["size"], case["seed"], master)
+    key = instance_key(case["source"], case["size"], case["seed"])
+    matrix, matrix_source = distance_matrix_for(stops, key, case["matrix_dir"], case["road_factor"])
+    matrix_list = matrix.tolist()
+
+    service = VRPService(time_limit_seconds=case["time_limit"])
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):  # the solver prints progress; keep stdout for the report
+        _, vehicle_routes = service.solve_vrp(case["mode"], stops, case["vehicles"], DEPOT, distance_matrix=matrix_list)
+    wall = time.perf_counter() - start
+    stats = service.last_solve_stats if case["mode"] == "OR-Tool" else {}
+    first_solution = stats.get("first_solution_seconds")
+    # Read before the allocation run below, whose tracing tables would count too
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # tracemalloc slows Python-heavy modes (Sweep) severalfold, so Python allocations are measured
+    # in a second, untimed solve of the same instance
+    tracemalloc.start()
+    with contextlib.redirect_stdout(sys.stderr):
+        VRPService(time_limit_seconds=case["time_limit"]).solve_vrp(case["mode"], stops, case["vehicles"], DEPOT,
+                                                                    distance_matrix=matrix_list)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if case["mode"] != "OR-Tool":
+        # Constructive modes produce their only solution at the end
+        first_solution = wall
+    return {
+        "case": f"{key}-v{case['vehicles']}-{case['mode']}",
+        "source": case["source"], "size": case["size"], "seed": case["seed"], "vehicles": case["vehicles"],
+        "mode": case["mode"], "matrix": matrix_source,
+        "wall_seconds": round(wall, 4),
+        # None when OR-Tools found no solution and the fallback produced the routes
+        "first_solution_seconds": None if first_solution is None else round(first_solution, 4),
+        "solutions_found": stats.get("solutions", 1),
+        "fallback": bool(stats.get("fallback", False)),
+        "peak_rss_mb": round(peak_rss / 1024, 1),
+        "peak_python_alloc_mb": round(traced_peak / 2**20, 2),
+        **route_metrics(vehicle_routes, matrix, len(stops)),
+    }
+
+
+# ---------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------
+def compare(results, baseline, max_slowdown: float, max_distance_increase: float):
+    """Return (rows, regressions) comparing each case with the baseline's case of the same name."""
+    base = {r["case"]: r for r in baseline["results"]}
+    rows, regressions = [], []
+    for r in results:
+        b = base.get(r["case"])
+        if b is None:
+            continue
+        slowdown = r["wall_seconds"] / b["wall_seconds"] if b["wall_seconds"] else 1.0
+        distance_change = (r["total_distance_km"] - b["total_distance_km"]) / b["total_distance_km"] if b["total_distance_km"] else 0.0
+        row = {"case": r["case"], "slowdown": round(slowdown, 3), "distance_change": round(distance_change, 4)}
+        rows.append(row)
+        # OR-Tools runs to its time limit, so only quality is compared for it
+        if (r["mode"] != "OR-Tool" and slowdown > max_slowdown) or distance_change > max_distance_increase:
+            regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 500, 2000], help="Stops per instance")
+    parser.add_argument("--sources", nargs="+", choices=SOURCES, default=SOURCES)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--vehicles", type=int, default=None, help="Vehicles per instance (default: scales with size)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--time-limit", type=float, default=5.0, help="OR-Tools search time limit in seconds")
+    parser.add_argument("--road-factor", type=float, default=1.3, help="Detour factor applied to approximate matrices")
+    parser.add_argument("--matrix-dir", default=None, help="Directory of cached <instance key>.npy matrices")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against this report")
+    parser.add_argument("--save-baseline", default=None, help="Write the report as the new baseline")
+    parser.add_argument("--max-slowdown", type=float, default=1.5, help="Allowed wall-time ratio vs baseline")
+    parser.add_argument("--max-distance-increase", type=float, default=0.05, help="Allowed relative distance increase")
+    args = parser.parse_args()
+
+    cases = [
+        {"source": source, "size": size, "seed": args.seed, "mode": mode,
+         "vehicles": args.vehicles or default_vehicles(size), "time_limit": args.time_limit,
+         "road_factor": args.road_factor, "matrix_dir": args.matrix_dir}
+        for size in args.sizes for source in args.sources for mode in args.modes
+    ]
+
+    results = []
+    for case in cases:
+        # A fresh process per case so peak RSS is not carried over between cases
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(run_case, case).result()
+        results.append(result)
+        first = result["first_solution_seconds"]
+        print(f"{result['case']:<36} {result['wall_seconds']:>8.3f}s  first {'-' if first is None else f'{first:.3f}':>7}s  "
+              f"{result['total_distance_km']:>10.1f} km  stops {result['stops_min']}-{result['stops_max']}  "
+              f"rss {result['peak_rss_mb']:.0f} MB", file=sys.stderr)
+
+    import ortools
+    report = {
+        "created_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "ortools": ortools.__version__,
+                        "machine": platform.machine(), "cpus": os.cpu_count()},
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")},
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows, regressions = compare(results, json.load(f), args.max_slowdown, args.max_distance_increase)
+        report["comparison"] = {"baseline": args.baseline, "cases": rows, "regressions": regressions}
+        exit_code = 1 if regressions else 0
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    if not args.output:
+        print(json.dumps(report, indent=2))
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Startup-time benchmark for the API process.
+
+Imports `wulfs_routing_api.main` in fresh interpreters (as uvicorn does on every start and
+--reload cycle), reports the import time and fails if it exceeds the budget or if any of the
+worker-only heavy dependencies were imported.
+
+Usage (from the `backend` directory):
+    PYTHONPATH=./src python benchmarks/startup_benchmark.py --runs 5 --budget 2.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Dependencies only the Celery worker needs; none of them may load in the API process
+WORKER_ONLY_MODULES = ["ortools", "folium", "shapely", "sklearn", "debugpy", "pandas", "numpy",
+                       "wulfs_routing_api.tasks.celery_tasks"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import wulfs_routing_api.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (WORKER_ONLY_MODULES,)
+
+
+def measure_once(env) -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreter runs")
+    parser.add_argument("--budget", type=float, default=2.0, help="Maximum median import time in seconds")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in [src, env.get("PYTHONPATH")] if p)
+
+    runs = [measure_once(env) for _ in range(args.runs)]
+    timings = [r["seconds"] for r in runs]
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    report = {
+        "runs": args.runs,
+        "median_seconds": round(statistics.median(timings), 3),
+        "max_seconds": round(max(timings), 3),
+        "budget_seconds": args.budget,
+        "worker_only_modules_loaded": loaded,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"API import time: median {report['median_seconds']}s, max {report['max_seconds']}s "
+              f"over {args.runs} runs (budget {args.budget}s)")
+        if loaded:
+            print(f"Worker-only modules imported by the API: {', '.join(loaded)}")
+
+    if report["median_seconds"] > args.budget or loaded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
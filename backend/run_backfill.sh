@@ -0,0 +1,3 @@
+#!/bin/bash
+# Route every dated order file in a directory in parallel, e.g. ./run_backfill.sh ../data/orders --sink db
+PYTHONPATH=./src python -m wulfs_routing_api.backfill "$@"
@@ -0,0 +1,6 @@
+#/bin/bash
+# Schedules the nightly precompute (celery_app.beat_schedule); run exactly one beat process
+PYTHONPATH=./src celery -A wulfs_routing_api.celery_app beat --loglevel=info
+
+# Run the precompute now instead of waiting for the schedule
+#PYTHONPATH=./src celery -A wulfs_routing_api.celery_app call wulfs_routing_api.tasks.celery_tasks.precompute_snapshot_task
@@ -1,15 +1,24 @@
 import base64
+import json
 import os
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi import FastAPI, HTTPException
-from wulfs_routing_api.models.stops.supabase_stop import SupabaseStop
+import time
+import datetime as dt
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi import UploadFile, File, Form
+from wulfs_routing_api.models.storage import route_model, stop_model
 from wulfs_routing_api.services.stops_service import StopService
-from wulfs_routing_api.models.routes.supabase_route import SupabaseRoute
 from wulfs_routing_api.services.route_service import RouteService
+from wulfs_routing_api.services.export_service import ExportService, EXPORT_FORMATS
 from wulfs_routing_api.celery_app import celery_app
-from wulfs_routing_api.tasks.celery_tasks import generate_routing_task
-from wulfs_routing_api.models.supabase_db import supabase
+from wulfs_routing_api.tasks.signatures import send_generate_routing_task
+from wulfs_routing_api.utils.async_utils import run_sync
+from wulfs_routing_api.utils.tracing import span
+from wulfs_routing_api.utils.http_cache import (
+    IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, cached_json_response, stops_response_cache,
+)
+from wulfs_routing_api.tasks.progress import TERMINAL_STATES, get_async_redis, progress_channel
+from wulfs_routing_api.tasks.profiling import PROFILE_ARTIFACTS, PROFILE_MODES, profile_key
 from pydantic import BaseModel
 from celery.result import AsyncResult
 import logging
@@ -18,29 +27,143 @@ logger.setLevel(os.getenv("LOG_LEVEL", "WARNING").upper())
 
 router = APIRouter()
 
+# Comment frames keep idle event streams open through proxies
+SSE_KEEPALIVE_SECONDS = 15
+# Celery reports unknown (or expired) job ids as PENDING, just like queued ones: an event stream
+# stops waiting for a job that stays PENDING this long
+SSE_PENDING_TIMEOUT_SECONDS = float(os.getenv("SSE_PENDING_TIMEOUT_SECONDS", "600"))
+
 def get_service() -> RouteService:
-    return RouteService(SupabaseRoute())
+    return RouteService(route_model())
+
+def _read_job(job_id: str) -> dict:
+    """Read a Celery job's state from the result backend. Blocking; call through run_sync."""
+    task_result = AsyncResult(job_id, app=celery_app)
+    ready = task_result.ready()
+    status = task_result.status
+    return {
+        "status": status,
+        "ready": ready,
+        "successful": ready and task_result.successful(),
+        "result": task_result.result if ready else None,
+        "meta": task_result.info if status == "PROGRESS" and isinstance(task_result.info, dict) else {},
+    }
 
 @router.get("/routes", tags=["Routing"])
-async def list_routes(service: RouteService = Depends(get_service)):
-    """Lists all previously generated routes."""
+async def list_routes(
+    start_date: dt.date | None = Query(None, description="Earliest route date to include"),
+    end_date: dt.date | None = Query(None, description="Latest route date to include"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    service: RouteService = Depends(get_service),
+):
+    """Lists previously generated routes, newest first, one page at a time."""
     try:
-        return service.list_routes()
-    except RuntimeError as e:
+        return await service.alist_routes(start_date, end_date, limit, cursor)
+    except (ValueError, RuntimeError) as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/routes/{route_id}/stops", tags=["Routing"])
-async def get_stops_for_route(route_id: int):
-    """Gets all stops details for a specific route."""
+async def get_stops_for_route(route_id: int, request: Request):
+    """
+    Gets all stops details for a specific route, in the same shape as GET /stops.
+    Stops never change once persisted and only customer fields that are not rewritten later are
+    included, so the response is cached and served with a strong ETag.
+    """
     try:
-        service = StopService(SupabaseStop())
-        return service.get_stops_for_route(route_id)
+        service = StopService(stop_model())
+        entry, cached = await stops_response_cache.get_or_build(
+            ("route", route_id), lambda: service.aget_stops_for_route(route_id)
+        )
+        return cached_json_response(request, entry, cacheable=cached)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _resolve_route_ids(route_ids: list[int] | None, job_id: str | None, route_date: dt.date | None) -> list[int]:
+    """Route ids given explicitly, produced by a finished job, or generated for a date."""
+    if route_ids is not None:
+        return route_ids
+    if job_id:
+        job = await run_sync(_read_job, job_id)
+        if not job["ready"]:
+            raise HTTPException(status_code=202, detail="Job is not yet complete.")
+        if not job["successful"] or job["result"].get("status") != "SUCCESS":
+            raise HTTPException(status_code=404, detail=f"Job {job_id} has no routes.")
+        return job["result"]["route_ids"]
+    if route_date:
+        return await RouteService(route_model()).aroute_ids_for_date(route_date)
+    raise HTTPException(status_code=422, detail="One of route_ids, job_id or route_date is required.")
+
+@router.get("/stops", tags=["Routing"])
+async def get_stops_for_routes(
+    request: Request,
+    route_ids: list[int] | None = Query(None, description="Route ids, repeat the parameter for each id"),
+    job_id: str | None = Query(None, description="Completed route generation job"),
+    route_date: dt.date | None = Query(None, description="All routes generated for this date"),
+):
+    """Gets the stops of many routes in one request, grouped by route."""
+    # The routes of a date can still grow; explicit ids and finished jobs cannot
+    cache_control = REVALIDATE_CACHE_CONTROL if route_ids is None and not job_id else IMMUTABLE_CACHE_CONTROL
+    try:
+        route_ids = await _resolve_route_ids(route_ids, job_id, route_date)
+        service = StopService(stop_model())
+        entry, cached = await stops_response_cache.get_or_build(
+            ("routes", tuple(route_ids)),
+            lambda: service.aget_stops_for_routes(route_ids),
+            # Do not cache routes whose stops are not (yet) visible
+            cacheable=lambda groups: all(group["stops"] for group in groups),
+        )
+        return cached_json_response(request, entry, cache_control, cacheable=cached)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/routes/geometry", tags=["Routing"])
+async def get_route_geometry(
+    request: Request,
+    route_ids: list[int] | None = Query(None, description="Route ids, repeat the parameter for each id"),
+    job_id: str | None = Query(None, description="Completed route generation job"),
+    route_date: dt.date | None = Query(None, description="All routes generated for this date"),
+):
+    """
+    Gets the routes' geometry as a compact GeoJSON FeatureCollection (a LineString per route
+    and a Point per stop), cached like the stops it is built from.
+    """
+    cache_control = REVALIDATE_CACHE_CONTROL if route_ids is None and not job_id else IMMUTABLE_CACHE_CONTROL
+    try:
+        route_ids = await _resolve_route_ids(route_ids, job_id, route_date)
+        service = StopService(stop_model())
+        entry, cached = await stops_response_cache.get_or_build(
+            ("geometry", tuple(route_ids)),
+            lambda: service.aget_route_geometry(route_ids),
+            cacheable=lambda collection: bool(collection["features"]),
+        )
+        return cached_json_response(request, entry, cache_control, cacheable=cached)
     except RuntimeError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/export/routes", tags=["Routing"])
+async def export_routes(
+    start_date: dt.date | None = Query(None, description="Earliest route date to include"),
+    end_date: dt.date | None = Query(None, description="Latest route date to include"),
+    format: str = Query("parquet", pattern="^(arrow|parquet)$", description="arrow (IPC stream) or parquet"),
+):
+    """
+    Streams every stop of the routes in a date range, joined with its route and customer,
+    as an Arrow IPC stream or a Parquet file.
+    """
+    service = ExportService(route_model(), stop_model())
+    media_type, extension = EXPORT_FORMATS[format]
+    file_name = f"routes_{start_date or 'start'}_{end_date or 'end'}.{extension}"
+    return StreamingResponse(
+        service.astream_export(format, start_date, end_date),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
 class JobResponse(BaseModel):
     job_id: str
+    trace_id: str | None = None
 
 @router.post("/routes/generate", response_model=JobResponse, tags=["Routing"])
 async def generate_routes(
@@ -50,25 +173,36 @@ async def generate_routes(
     route_date_str: str = Form(...),
     hq_lat: float = Form(...),
     hq_lon: float = Form(...),
+    profile: str = Form("", description="Profile the job: sample, cprofile or memory (see GET /routes/{job_id}/profile)"),
 ):
     """
     Accepts order data and triggers a background task to generate routes.
     """
-    try:
-        orders_content = await orders_file.read()
-        orders_content_b64 = base64.b64encode(orders_content).decode('utf-8')
-
-        task = generate_routing_task.delay(
-            orders_file_content_b64=orders_content_b64,
-            num_vehicles=num_vehicles,
-            split_mode=split_mode,
-            route_date_str=route_date_str,
-            hq_lat=hq_lat,
-            hq_lon=hq_lon,
-        )
-        return {"job_id": task.id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to start job: {e}")
+    if profile and profile not in PROFILE_MODES:
+        raise HTTPException(status_code=422, detail=f"profile must be one of {', '.join(PROFILE_MODES)}")
+    # Root span of the job's trace; the worker continues it from the Celery message headers
+    with span("POST /routes/generate", num_vehicles=num_vehicles, split_mode=split_mode, route_date=route_date_str) as trace:
+        try:
+            orders_content = await orders_file.read()
+            orders_content_b64 = base64.b64encode(orders_content).decode('utf-8')
+
+            # Publishing to the broker is a blocking Redis call
+            with span("celery.send_task", task="generate_routing_task", payload_bytes=len(orders_content_b64)):
+                task = await run_sync(
+                    send_generate_routing_task,
+                    orders_file_content_b64=orders_content_b64,
+                    num_vehicles=num_vehicles,
+                    split_mode=split_mode,
+                    route_date_str=route_date_str,
+                    hq_lat=hq_lat,
+                    hq_lon=hq_lon,
+                    profile=profile,
+                )
+            if trace is not None:
+                trace.set_attribute("job_id", task.id)
+            return {"job_id": task.id, "trace_id": trace.trace_id if trace else None}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to start job: {e}")
 
 class StatusResponse(BaseModel):
     job_id: str
@@ -79,12 +213,78 @@ async def get_job_status(job_id: str):
     """
     Checks the status of a background route generation job.
     """
-    task_result = AsyncResult(job_id, app=celery_app)
+    job = await run_sync(_read_job, job_id)
     return {
         "job_id": job_id,
-        "status": task_result.status
+        "status": job["status"]
     }
 
+def _sse(event: dict) -> str:
+    return f"event: progress\ndata: {json.dumps(event, default=str)}\n\n"
+
+def _final_event(job_id: str, job: dict) -> dict:
+    result = job["result"] if job["successful"] else {"error": str(job["result"])}
+    return {"job_id": job_id, "status": job["status"], "result": result}
+
+async def _job_event_stream(job_id: str):
+    """
+    Yield the job's current state, then every progress event published by the worker,
+    until the job reaches a terminal state.
+
+    The terminal event is only published from task_postrun, which Celery skips for jobs revoked
+    while queued and for jobs whose worker process died; the result backend is therefore re-read
+    on every idle interval, and the stream ends with its state once the job is ready.
+    """
+    pubsub = get_async_redis().pubsub()
+    # Subscribe before reading the current state so no event between the two is lost
+    await pubsub.subscribe(progress_channel(job_id))
+    try:
+        job = await run_sync(_read_job, job_id)
+        if job["ready"]:
+            yield _sse(_final_event(job_id, job))
+            return
+        yield _sse({"job_id": job_id, "status": job["status"], **job["meta"]})
+
+        pending_since = time.monotonic() if job["status"] == "PENDING" else None
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=SSE_KEEPALIVE_SECONDS)
+            if message is None:
+                job = await run_sync(_read_job, job_id)
+                if job["ready"]:
+                    yield _sse(_final_event(job_id, job))
+                    return
+                if job["status"] != "PENDING":
+                    pending_since = None
+                elif pending_since is None:
+                    pending_since = time.monotonic()
+                elif time.monotonic() - pending_since > SSE_PENDING_TIMEOUT_SECONDS:
+                    yield _sse({"job_id": job_id, "status": "PENDING",
+                                "message": "The job has not started; it may be unknown or expired."})
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            pending_since = None
+            event = json.loads(message["data"])
+            yield _sse({"job_id": job_id, **event})
+            if event.get("status") in TERMINAL_STATES:
+                return
+    finally:
+        await pubsub.unsubscribe(progress_channel(job_id))
+        await pubsub.aclose()
+
+@router.get("/routes/{job_id}/events", tags=["Routing"])
+async def stream_job_events(job_id: str):
+    """
+    Streams the progress of a route generation job as Server-Sent Events.
+    The stream ends after the SUCCESS, FAILURE or REVOKED event, which carries the job result,
+    or with a PENDING event when the job does not start within SSE_PENDING_TIMEOUT_SECONDS.
+    """
+    return StreamingResponse(
+        _job_event_stream(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 class ResultResponse(BaseModel):
     job_id: str
     status: str
@@ -95,19 +295,38 @@ async def get_job_result(job_id: str):
     """
     Retrieves the result of a completed route generation job.
     """
-    task_result = AsyncResult(job_id, app=celery_app)
-    if not task_result.ready():
+    job = await run_sync(_read_job, job_id)
+    if not job["ready"]:
         raise HTTPException(status_code=202, detail="Job is not yet complete.")
 
-    if task_result.successful():
+    if job["successful"]:
         return {
             "job_id": job_id,
-            "status": task_result.status,
-            "result": task_result.result,
+            "status": job["status"],
+            "result": job["result"],
         }
     else: # Task failed
         return {
             "job_id": job_id,
             "status": "FAILURE",
-            "result": {"error": str(task_result.info)}, # The exception info
+            "result": {"error": str(job["result"])}, # The exception info
         }
+
+@router.get("/routes/{job_id}/profile", tags=["Routing"])
+async def get_job_profile(
+    job_id: str,
+    artifact: str = Query("summary", pattern="^(summary|folded|pstats)$",
+                          description="summary (JSON), folded (flame graph stacks) or pstats (cProfile mode only)"),
+):
+    """
+    Gets a profiled job's artifacts: the summary with per-stage time (and tracemalloc peaks in memory
+    mode) and the top functions, folded stacks for flamegraph.pl or speedscope, or the cProfile stats
+    for pstats/snakeviz.
+    Artifacts are available once the job has finished and expire with its result.
+    """
+    data = await get_async_redis().get(profile_key(job_id, artifact))
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"No {artifact} profile for job {job_id}.")
+    media_type, file_name = PROFILE_ARTIFACTS[artifact]
+    headers = {} if artifact == "summary" else {"Content-Disposition": f'attachment; filename="{job_id}-{file_name}"'}
+    return Response(content=data, media_type=media_type, headers=headers)
@@ -0,0 +1,305 @@
+"""
+Offline batch runner: generate routes for many days of order files without the API or Celery.
+
+Every order file in a directory whose name contains a date (2025-03-14 or 20250314) is routed
+through the same OrderService -> VRPService -> RoadGeometryService -> RouteService steps as the
+Celery task; files sharing a date are routed together as that day. Days run in parallel in a
+process pool. All workers share one customer master (loaded once from the configured storage) and
+one distance matrix over depot + every customer, which is built once through OSRM's /table service
+(or haversine), cached on disk and memory-mapped by each worker. Results go to the configured storage (--sink db; STORAGE_BACKEND=sqlite for a local file)
+or to Parquet datasets partitioned by route date (--sink parquet: <out-dir>/stops and <out-dir>/missing_orders).
+
+Usage (from the `backend` directory):
+    PYTHONPATH=./src python -m wulfs_routing_api.backfill ../data/orders --vehicles 4 --out-dir backfill_out
+    STORAGE_BACKEND=sqlite PYTHONPATH=./src python -m wulfs_routing_api.backfill ../data/orders --sink db --time-limit 30
+"""
+import argparse
+import datetime as dt
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from wulfs_routing_api.models.storage import customer_model, order_model, route_model, storage_available
+from wulfs_routing_api.services.customer_service import CustomerService
+from wulfs_routing_api.services.order_services import OrderService
+from wulfs_routing_api.services.osrm_service import OSRMService
+from wulfs_routing_api.services.road_geometry_service import RoadGeometryService
+from wulfs_routing_api.services.route_service import RouteService
+from wulfs_routing_api.services.vrp_service import VRPService
+from wulfs_routing_api.utils.data_io_utils import read_table
+
+logger = logging.getLogger(__name__)
+
+ORDER_FILE_EXTENSIONS = (".csv", ".xlsx", ".xls")
+FILE_DATE = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+# Same HQ as the frontend default
+DEFAULT_DEPOT = (42.34902, -71.03118)
+# route_date is the hive partition key (stops/route_date=2025-03-14/part.parquet), not a file column.
+# Every partition is written with the same schema, whatever one day's data looks like (no missing
+# orders, no road geometry, ids read as numbers), so the datasets read back as a whole.
+PARQUET_STOP_COLUMNS = [
+    ("vehicle_index", "int64"), ("sequence", "int64"), ("customer_id", "int64"), ("customer_name", "string"),
+    ("address", "string"), ("city", "string"), ("state", "string"), ("zip", "string"),
+    ("lat", "float64"), ("lon", "float64"), ("order_id", "string"), ("notes", "string"),
+    ("match_score", "float64"), ("leg_polyline", "string"),
+    ("cumulative_distance_m", "float64"), ("cumulative_duration_s", "float64"),
+]
+# suggestions is the JSON list of {"name_key", "score"} candidates
+PARQUET_MISSING_ORDER_COLUMNS = [
+    ("customer_name", "string"), ("order_id", "string"), ("notes", "string"),
+    ("order_name_key", "string"), ("suggestions", "string"),
+]
+
+
+def find_order_files(orders_dir: str, start: Optional[dt.date] = None, end: Optional[dt.date] = None) -> List[Tuple[dt.date, List[str]]]:
+    """
+    (route date, paths) of the order files in `orders_dir` dated within [start, end], oldest first.
+    Several files of one date (e.g. orders_2025-03-14.csv and orders_20250314.xlsx) are grouped and
+    routed as one day, so they neither overwrite each other's partition nor produce two route sets.
+    """
+    files = {}
+    for name in sorted(os.listdir(orders_dir)):
+        match = FILE_DATE.search(name)
+        if not name.lower().endswith(ORDER_FILE_EXTENSIONS) or not match:
+            continue
+        try:
+            route_date = dt.date(*map(int, match.groups()))
+        except ValueError:
+            logger.warning(f"Skipping {name}: {match.group(0)} is not a date")
+            continue
+        if (start and route_date < start) or (end and route_date > end):
+            continue
+        files.setdefault(route_date, []).append(os.path.join(orders_dir, name))
+    for route_date, paths in files.items():
+        if len(paths) > 1:
+            logger.warning(f"{len(paths)} order files for {route_date} are routed as one day: "
+                           f"{', '.join(os.path.basename(p) for p in paths)}")
+    return sorted(files.items())
+
+
+# ---------------------------------------------------------------------
+# Shared distance matrix
+# ---------------------------------------------------------------------
+def _haversine_miles(points: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(points[:, 0]), np.radians(points[:, 1])
+    a = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+         + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+    return 2 * 3958.8 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def matrix_cache_path(cache_dir: str, points: np.ndarray, source: str) -> str:
+    digest = hashlib.sha256(np.round(points, 6).tobytes() + source.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"distance_matrix_{source}_{len(points)}_{digest}.npy")
+
+def build_distance_matrix(points: np.ndarray, source: str, cache_dir: str, max_table_size: int) -> str:
+    """
+    Distances in miles between all `points` (depot first), saved as .npy in `cache_dir` and reused
+    while the depot and customer coordinates are unchanged. Pairs OSRM cannot route fall back to haversine.
+
+    Returns:
+        str: path of the cached matrix.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = matrix_cache_path(cache_dir, points, source)
+    if os.path.exists(path):
+        logger.info(f"Reusing distance matrix {path}")
+        return path
+
+    matrix = _haversine_miles(points)
+    if source == "osrm":
+        table = OSRMService().get_distance_table([tuple(p) for p in points], max_table_size=max_table_size)
+        if table is None:
+            raise RuntimeError("OSRM /table failed; use --distance-source haversine to run without OSRM")
+        table = np.array(table, dtype=float)  # None -> nan
+        matrix = np.where(np.isnan(table), matrix, table)
+
+    np.save(path + ".tmp.npy", matrix)
+    os.replace(path + ".tmp.npy", path)
+    return path
+
+
+# ---------------------------------------------------------------------
+# One day (runs in a worker process)
+# ---------------------------------------------------------------------
+_worker: dict = {}
+
+def _init_worker(customer_df: pd.DataFrame, matrix_path: Optional[str], settings: dict):
+    logging.basicConfig(level=settings["log_level"], format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    _worker["customers"] = customer_df
+    # Memory-mapped: every worker reads the same pages of the one cached matrix
+    _worker["matrix"] = np.load(matrix_path, mmap_mode="r") if matrix_path else None
+    _worker["matrix_index"] = {int(c): i + 1 for i, c in enumerate(customer_df["customer_id"])}
+    _worker["settings"] = settings
+
+def _day_matrix(stops_df: pd.DataFrame) -> Optional[List[List[float]]]:
+    matrix = _worker["matrix"]
+    if matrix is None:
+        return None
+    index = np.array([0] + [_worker["matrix_index"][int(c)] for c in stops_df["customer_id"]])
+    return np.asarray(matrix[np.ix_(index, index)]).tolist()
+
+def _as_text(value) -> Optional[str]:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # e.g. a zip code read as a number
+    return str(value)
+
+def _arrow_table(df: pd.DataFrame, columns: List[Tuple[str, str]]) -> pa.Table:
+    """`df` as a table of exactly `columns` (name, pyarrow type name); missing columns become nulls."""
+    schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in columns])
+    df = df.reindex(columns=schema.names)
+    for name, type_name in columns:
+        if type_name == "string":
+            df[name] = df[name].map(_as_text).astype(object)
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+def _write_parquet(out_dir: str, route_date: str, stops_df: pd.DataFrame, missing_orders: pd.DataFrame):
+    """Write one day as <out_dir>/stops/ and <out_dir>/missing_orders/ partitions; rewriting a day replaces it."""
+    missing_orders = missing_orders.assign(
+        suggestions=missing_orders["suggestions"].map(lambda s: json.dumps(s) if isinstance(s, list) else None))
+    tables = {"stops": _arrow_table(stops_df, PARQUET_STOP_COLUMNS),
+              "missing_orders": _arrow_table(missing_orders, PARQUET_MISSING_ORDER_COLUMNS)}
+    for dataset, table in tables.items():
+        partition = os.path.join(out_dir, dataset, f"route_date={route_date}")
+        os.makedirs(partition, exist_ok=True)
+        pq.write_table(table, os.path.join(partition, "part.parquet"))
+
+def _read_orders(paths: List[str]) -> pd.DataFrame:
+    if len(paths) == 1:
+        return read_table(paths[0])
+    # Files may spell the same headers differently ("Customer Name", "customer name")
+    frames = [read_table(path).rename(columns=lambda c: str(c).strip().lower()) for path in paths]
+    return pd.concat(frames, ignore_index=True)
+
+def run_day(route_date: dt.date, paths: List[str]) -> dict:
+    """Route one day's order files and write the result to the configured sink. Returns a summary row."""
+    settings = _worker["settings"]
+    depot = tuple(settings["depot"])
+    route_date_str = route_date.isoformat()
+    summary = {"route_date": route_date_str, "file": ";".join(os.path.basename(p) for p in paths),
+               "files": len(paths), "status": "SUCCESS"}
+    start = time.perf_counter()
+    try:
+        orders_df = _read_orders(paths)
+        stops_df, missing_orders = OrderService(order_model()).customer_details_for_orders(orders_df, _worker["customers"])
+        summary.update(orders=len(orders_df), stops=len(stops_df), missing_orders=len(missing_orders))
+        if stops_df.empty:
+            summary["status"] = "NO_STOPS"
+            return summary
+
+        vrp_service = VRPService(time_limit_seconds=settings["time_limit"])
+        distance_matrix = _day_matrix(stops_df) if settings["split_mode"] == "OR-Tool" else None
+        solve_start = time.perf_counter()
+        labels, routes = vrp_service.solve_vrp(settings["split_mode"], stops_df, settings["vehicles"], depot, distance_matrix)
+        summary["solve_seconds"] = round(time.perf_counter() - solve_start, 3)
+        stops_df["vehicle_index"] = labels
+        stops_df = vrp_service.sequence_stops(stops_df, routes)
+        summary["vehicles_used"] = int(stops_df["vehicle_index"].nunique())
+
+        route_totals = {}
+        if settings["road_geometry"]:
+            stops_df, route_totals = RoadGeometryService(vrp_service.osrm_service).annotate_stops(stops_df, depot)
+            distances = [t["total_distance_m"] for t in route_totals.values() if t.get("total_distance_m") is not None]
+            summary["road_distance_miles"] = round(OSRMService.meters_to_miles(sum(distances)), 2)
+
+        if settings["sink"] == "db":
+            route_ids = RouteService(route_model()).persist_routes_with_stops(stops_df, route_date_str, route_totals)
+            summary["route_ids"] = sorted(route_ids.values())
+        else:
+            _write_parquet(settings["out_dir"], route_date_str, stops_df, missing_orders)
+
+    except Exception as e:
+        logger.exception(f"Backfill of {route_date_str} ({summary['file']}) failed")
+        summary.update(status="FAILURE", error=str(e))
+    finally:
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+# ---------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("orders_dir", help="Directory of dated order files (CSV/Excel)")
+    parser.add_argument("--start", type=dt.date.fromisoformat, default=None, help="First route date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=dt.date.fromisoformat, default=None, help="Last route date (YYYY-MM-DD)")
+    parser.add_argument("--vehicles", type=int, default=4)
+    parser.add_argument("--split-mode", default="OR-Tool", choices=["OR-Tool", "Sweep"])
+    parser.add_argument("--time-limit", type=float, default=10.0, help="OR-Tools search time limit per day in seconds")
+    parser.add_argument("--hq-lat", type=float, default=DEFAULT_DEPOT[0])
+    parser.add_argument("--hq-lon", type=float, default=DEFAULT_DEPOT[1])
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Days routed in parallel")
+    parser.add_argument("--distance-source", default="osrm", choices=["osrm", "haversine"],
+                        help="Distance matrix from OSRM /table ($OSRM_URL) or great-circle miles")
+    parser.add_argument("--max-table-size", type=int, default=100, help="OSRM --max-table-size")
+    parser.add_argument("--no-road-geometry", action="store_true", help="Skip per-stop road legs and ETAs (no OSRM /route calls)")
+    parser.add_argument("--sink", default="parquet", choices=["parquet", "db"], help="Parquet files or the configured storage")
+    parser.add_argument("--out-dir", default="backfill_out", help="Parquet output and run summary directory")
+    parser.add_argument("--cache-dir", default=None, help="Distance matrix cache (default: <out-dir>/cache)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(message)s")
+
+    files = find_order_files(args.orders_dir, args.start, args.end)
+    if not files:
+        print(f"No dated order files found in {args.orders_dir}", file=sys.stderr)
+        return 1
+    if not storage_available():
+        print("Storage is not available. Check .env (or set STORAGE_BACKEND=sqlite).", file=sys.stderr)
+        return 1
+
+    customer_df = CustomerService(customer_model()).load_customer_master_data()
+    depot = (args.hq_lat, args.hq_lon)
+    matrix_path = None
+    if args.split_mode == "OR-Tool":
+        points = np.vstack([np.asarray(depot, dtype=float), customer_df[["lat", "lon"]].to_numpy(dtype=float)])
+        started = time.perf_counter()
+        matrix_path = build_distance_matrix(points, args.distance_source, args.cache_dir or os.path.join(args.out_dir, "cache"),
+                                            args.max_table_size)
+        print(f"Distance matrix for {len(points)} points ready in {time.perf_counter() - started:.1f}s: {matrix_path}", file=sys.stderr)
+
+    settings = {
+        "depot": depot, "vehicles": args.vehicles, "split_mode": args.split_mode, "time_limit": args.time_limit,
+        "road_geometry": not args.no_road_geometry, "sink": args.sink, "out_dir": args.out_dir,
+        "log_level": args.log_level.upper(),
+    }
+    os.makedirs(args.out_dir, exist_ok=True)
+    summaries = []
+    started = time.perf_counter()
+    # spawn: workers start clean instead of inheriting the parent's OR-Tools/HTTP state
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(files)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(customer_df, matrix_path, settings)) as pool:
+        futures = [pool.submit(run_day, route_date, paths) for route_date, paths in files]
+        for done, future in enumerate(as_completed(futures), start=1):
+            summary = future.result()
+            summaries.append(summary)
+            print(f"[{done}/{len(files)}] {summary['route_date']} {summary['status']:<8} "
+                  f"{summary.get('stops', 0)} stops, {summary.get('missing_orders', 0)} missing, {summary['seconds']:.1f}s",
+                  file=sys.stderr)
+
+    summary_df = pd.DataFrame(sorted(summaries, key=lambda s: s["route_date"]))
+    summary_path = os.path.join(args.out_dir, "backfill_summary.csv")
+    summary_df.to_csv(summary_path, index=False)
+    failed = int((summary_df["status"] == "FAILURE").sum())
+    print(json.dumps({
+        "days": len(files), "files": int(summary_df["files"].sum()), "failed": failed, "seconds": round(time.perf_counter() - started, 1),
+        "settings": {k: v for k, v in settings.items() if k != "log_level"}, "summary": summary_path,
+    }, default=str), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,8 @@
+import os
 from celery import Celery
+from celery.schedules import crontab
+
+from wulfs_routing_api.tasks.signatures import PRECOMPUTE_TASK
 
 # For now, we'll hardcode the default local Redis instance.
 # In a real app, this would come from environment variables.
@@ -14,6 +18,14 @@ celery_app = Celery(
 celery_app.conf.update(
     task_track_started=True,
     result_expires=3600, # Keep results for 1 hour
+    timezone=os.getenv("CELERY_TIMEZONE", "America/New_York"),
+    # Run with `celery beat` (run_celery_beat.sh)
+    beat_schedule={
+        "nightly-precompute": {
+            "task": PRECOMPUTE_TASK,
+            "schedule": crontab(hour=int(os.getenv("PRECOMPUTE_HOUR", "3")), minute=int(os.getenv("PRECOMPUTE_MINUTE", "0"))),
+        },
+    },
 )
 
 if __name__ == "__main__":
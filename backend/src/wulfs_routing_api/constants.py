@@ -1 +1,9 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
 REDIS_URL = "redis://localhost:6379/0"
+
+# Where the models read and write: "supabase" (default) or "sqlite" (local file, see models/sqlite_db.py)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "supabase").lower()
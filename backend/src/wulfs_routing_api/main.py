@@ -1,13 +1,7 @@
-import base64
 import os
-import debugpy
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi import FastAPI, HTTPException
-from wulfs_routing_api.celery_app import celery_app
-from wulfs_routing_api.tasks.celery_tasks import generate_routing_task
-from wulfs_routing_api.models.supabase_db import supabase
-from pydantic import BaseModel
-from celery.result import AsyncResult
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from wulfs_routing_api.models.supabase_db import init_async_supabase, close_async_supabase
 from wulfs_routing_api.api import routes_api
 import logging
 logger = logging.getLogger()
@@ -15,6 +9,7 @@ logger.setLevel(os.getenv("LOG_LEVEL", "WARNING").upper())
 
 
 if os.getenv("ACTIVATE_DEBUG") == "DEBUG" and os.getenv("RUN_MAIN") == "true":
+    import debugpy  # only needed when debugging; keeps normal startup and --reload light
     try:
         debugpy.listen(("0.0.0.0", 58979))
         print("Waiting for debugger to attach...")
@@ -22,7 +17,14 @@ if os.getenv("ACTIVATE_DEBUG") == "DEBUG" and os.getenv("RUN_MAIN") == "true":
     except RuntimeError:
         print("Debugpy already active — skipping listen()")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One shared async Supabase client (pooled connections) for all request handlers
+    await init_async_supabase()
+    yield
+    await close_async_supabase()
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.include_router(routes_api.router, tags=["Routing"])
\ No newline at end of file
@@ -2,4 +2,7 @@ import pandas as pd
 
 class CustomerModel:
     def get_all_customers(self) -> pd.DataFrame:
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def update_snapping(self, snaps_df: pd.DataFrame, dataset: str) -> int:
+        raise NotImplementedError
@@ -0,0 +1,77 @@
+import logging
+import pandas as pd
+from wulfs_routing_api.models.sqlite_db import sqlite_lock, sqlite_transaction
+from wulfs_routing_api.models.customers.customer_model import CustomerModel
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_COLUMNS = ["name", "name_key", "address", "city", "state", "zip", "lat", "lon"]
+
+class SQLiteCustomer(CustomerModel):
+    def get_all_customers(self) -> pd.DataFrame:
+        try:
+            with sqlite_lock() as connection:
+                customer_df = pd.read_sql_query(
+                    "SELECT id, name_key, name, address, city, state, zip, lat, lon, "
+                    "snap_lat, snap_lon, snap_distance_m, osrm_hint, osrm_dataset FROM customers ORDER BY id", connection)
+            return customer_df.rename(columns={"id": "customer_id", "name": "customer_name"})
+
+        except Exception as e:
+            msg = f"Unexpected error during select customers: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def create_many(self, customers_df: pd.DataFrame) -> int:
+        """
+        Bulk insert customers, one column list per field; rows whose name_key already exists are skipped.
+
+        Args:
+            customers_df (pd.DataFrame): Columns name, name_key, address, city, state, zip, lat, lon.
+        Returns:
+            int: Number of customers inserted.
+        """
+        try:
+            frame = customers_df.reindex(columns=CUSTOMER_COLUMNS).astype(object)
+            frame = frame.where(frame.notna(), None)
+            columns = [frame[c].tolist() for c in CUSTOMER_COLUMNS]
+            with sqlite_transaction() as connection:
+                before = connection.total_changes
+                connection.executemany(
+                    f"INSERT OR IGNORE INTO customers ({', '.join(CUSTOMER_COLUMNS)}) VALUES ({', '.join('?' * len(CUSTOMER_COLUMNS))})",
+                    zip(*columns))
+                inserted = connection.total_changes - before
+            logger.info(f"Inserted {inserted} customer(s) successfully.")
+            return inserted
+
+        except Exception as e:
+            msg = f"Unexpected error during customer insert: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def update_snapping(self, snaps_df: pd.DataFrame, dataset: str) -> int:
+        """
+        Store OSRM snaps of many customers in one transaction.
+
+        Args:
+            snaps_df (pd.DataFrame): Columns customer_id, snap_lat, snap_lon, snap_distance_m, osrm_hint.
+            dataset (str): Identifier of the OSRM dataset the hints belong to.
+        Returns:
+            int: Number of customers updated.
+        """
+        try:
+            rows = zip(snaps_df["snap_lat"].astype(float).tolist(), snaps_df["snap_lon"].astype(float).tolist(),
+                       snaps_df["snap_distance_m"].astype(float).tolist(), snaps_df["osrm_hint"].tolist(),
+                       [dataset] * len(snaps_df), [int(c) for c in snaps_df["customer_id"]])
+            with sqlite_transaction() as connection:
+                before = connection.total_changes
+                connection.executemany(
+                    "UPDATE customers SET snap_lat = ?, snap_lon = ?, snap_distance_m = ?, osrm_hint = ?, osrm_dataset = ? "
+                    "WHERE id = ?", rows)
+                updated = connection.total_changes - before
+            logger.info(f"Updated the snaps of {updated} customer(s).")
+            return updated
+
+        except Exception as e:
+            msg = f"Unexpected error during customer snap update: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
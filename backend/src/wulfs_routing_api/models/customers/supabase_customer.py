@@ -1,13 +1,44 @@
+import logging
 import re
 from shapely import wkb
 import pandas as pd
-from wulfs_routing_api.models.supabase_db import supabase
+from wulfs_routing_api.models.supabase_db import get_supabase
 from wulfs_routing_api.models.customers.customer_model import CustomerModel
 
+logger = logging.getLogger(__name__)
+
+SNAP_COLUMNS = "snap_lat, snap_lon, snap_distance_m, osrm_hint, osrm_dataset"
+
 class SupabaseCustomer(CustomerModel):
     def get_all_customers(self) -> pd.DataFrame:
-        response = supabase.table('customers').select("id, name_key, name, address, city, state, zip, lat, lon").execute()
+        response = get_supabase().table('customers').select("id, name_key, name, address, city, state, zip, lat, lon, " + SNAP_COLUMNS).execute()
         customer_df = pd.DataFrame(response.data)
         customer_df = customer_df.rename(columns={"id": "customer_id", "name": "customer_name"})
         return customer_df
-    
\ No newline at end of file
+    
+
+    def update_snapping(self, snaps_df: pd.DataFrame, dataset: str) -> int:
+        """
+        Store OSRM snaps in one RPC (migration 004).
+
+        Args:
+            snaps_df (pd.DataFrame): Columns customer_id, snap_lat, snap_lon, snap_distance_m, osrm_hint.
+            dataset (str): Identifier of the OSRM dataset the hints belong to.
+        Returns:
+            int: Number of customers updated.
+        """
+        try:
+            response = get_supabase().rpc("set_customer_snaps", {
+                "p_customer_id": [int(c) for c in snaps_df["customer_id"]],
+                "p_snap_lat": snaps_df["snap_lat"].astype(float).tolist(),
+                "p_snap_lon": snaps_df["snap_lon"].astype(float).tolist(),
+                "p_snap_distance_m": snaps_df["snap_distance_m"].astype(float).tolist(),
+                "p_osrm_hint": snaps_df["osrm_hint"].tolist(),
+                "p_osrm_dataset": dataset,
+            }).execute()
+            return int(response.data or 0)
+
+        except Exception as e:
+            msg = f"Unexpected error during customer snap update: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
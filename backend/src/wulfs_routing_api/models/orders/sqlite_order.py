@@ -0,0 +1,4 @@
+from wulfs_routing_api.models.orders.order_model import OrderModel
+
+class SQLiteOrder(OrderModel):
+    pass
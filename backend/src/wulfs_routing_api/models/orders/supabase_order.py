@@ -1,5 +1,5 @@
 import pandas as pd
-from wulfs_routing_api.models.supabase_db import supabase
+from wulfs_routing_api.models.supabase_db import get_supabase
 from wulfs_routing_api.models.orders.order_model import OrderModel
 
 class SupabaseOrder(OrderModel):
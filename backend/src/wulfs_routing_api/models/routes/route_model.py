@@ -1,7 +1,21 @@
-import pandas as pd
+from wulfs_routing_api.utils.async_utils import run_sync
 
 class RouteModel:
     def select_all_routes(self):
          raise NotImplementedError                
+    def select_routes_page(self, start_date, end_date, limit, after):
+         raise NotImplementedError
+    def select_route_ids_for_date(self, route_date):
+         raise NotImplementedError
     def create(self, route_to_insert):
-         raise NotImplementedError       
\ No newline at end of file
+         raise NotImplementedError       
+    def create_with_stops(self, route_date, routes, stops, chunk_size):
+         raise NotImplementedError
+    def delete(self, route_ids):
+         raise NotImplementedError
+
+    # Async interface used by the API. Sync-only models are offloaded to the bounded thread pool.
+    async def aselect_routes_page(self, start_date, end_date, limit, after):
+         return await run_sync(self.select_routes_page, start_date, end_date, limit, after)
+    async def aselect_route_ids_for_date(self, route_date):
+         return await run_sync(self.select_route_ids_for_date, route_date)
@@ -0,0 +1,147 @@
+import datetime as dt
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from wulfs_routing_api.models.sqlite_db import refresh_route_summary, sqlite_lock, sqlite_transaction
+from wulfs_routing_api.models.routes.route_model import RouteModel
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Same keys as ROUTE_LIST_COLUMNS of SupabaseRoute
+ROUTE_LIST_COLUMNS = "route_id AS id, route_date, vehicle_index, route_name, created_at, stop_count, road_distance_miles, total_duration_s"
+STOP_INSERT_COLUMNS = ["route_id", "customer_id", "sequence", "notes", "leg_polyline", "cumulative_distance_m", "cumulative_duration_s"]
+
+def _timestamp(route_date) -> str:
+    """route_date as the ISO timestamp text PostgREST returns for a TIMESTAMP column."""
+    return dt.datetime.fromisoformat(str(route_date)).isoformat()
+
+class SQLiteRoute(RouteModel):
+    def create(self, item_to_insert: Union[Dict[str, Any], List[Dict[str, Any]]]):
+        items = [item_to_insert] if isinstance(item_to_insert, dict) else item_to_insert
+        try:
+            logger.debug(f"Inserting route(s): {item_to_insert}")
+            with sqlite_transaction() as connection:
+                rows = [
+                    dict(connection.execute(
+                        "INSERT INTO routes (route_date, vehicle_index, route_name, total_distance_m, total_duration_s) "
+                        "VALUES (?, ?, ?, ?, ?) RETURNING *",
+                        (_timestamp(item["route_date"]), item["vehicle_index"], item["route_name"],
+                         item.get("total_distance_m"), item.get("total_duration_s")),
+                    ).fetchone())
+                    for item in items
+                ]
+            logger.info(f"Inserted {len(rows)} route(s) successfully.")
+            return rows[0] if isinstance(item_to_insert, dict) else rows
+
+        except Exception as e:
+            msg = f"Unexpected error during route insert: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def select_all_routes(self):
+        try:
+            with sqlite_lock() as connection:
+                rows = connection.execute(
+                    "SELECT route_id AS id, route_date, vehicle_index, route_name, created_at, stop_count, "
+                    "total_distance_miles, road_distance_miles, total_duration_s "
+                    "FROM route_summary ORDER BY created_at DESC, route_id DESC"
+                ).fetchall()
+            return [dict(row) for row in rows]
+
+        except Exception as e:
+            msg = f"Unexpected error during select all routes: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def create_with_stops(self, route_date: str, routes: Dict[str, List[Any]], stops: Dict[str, List[Any]], chunk_size: int = 5000) -> Dict[int, int]:
+        """
+        Insert all routes of a job and their stops in one transaction; same arguments as
+        SupabaseRoute.create_with_stops. Stops go in with one executemany over the columns,
+        so `chunk_size` is not needed and a failure never leaves a partial job behind.
+
+        Returns:
+            Dict[int, int]: vehicle_index -> route_id
+        """
+        num_stops = len(stops["vehicle_index"])
+        try:
+            logger.debug(f"Persisting {len(routes['vehicle_index'])} route(s) and {num_stops} stop(s) for {route_date}")
+            route_date = _timestamp(route_date)
+            with sqlite_transaction() as connection:
+                created_map = {}
+                for vehicle_index, route_name, distance_m, duration_s in zip(
+                        routes["vehicle_index"], routes["route_name"], routes["total_distance_m"], routes["total_duration_s"]):
+                    cursor = connection.execute(
+                        "INSERT INTO routes (route_date, vehicle_index, route_name, total_distance_m, total_duration_s) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (route_date, vehicle_index, route_name, distance_m, duration_s))
+                    created_map[vehicle_index] = cursor.lastrowid
+
+                columns = [[created_map[v] for v in stops["vehicle_index"]]] + [stops[c] for c in STOP_INSERT_COLUMNS[1:]]
+                connection.executemany(
+                    f"INSERT INTO stops ({', '.join(STOP_INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(STOP_INSERT_COLUMNS))})",
+                    zip(*columns))
+                refresh_route_summary(connection, created_map.values())
+
+        except Exception as e:
+            msg = f"Unexpected error during route job insert: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+        logger.info(f"Inserted {len(created_map)} route(s) and {num_stops} stop(s) successfully.")
+        return created_map
+
+    def delete(self, route_ids: List[int]):
+        try:
+            logger.debug(f"Deleting route(s): {route_ids}")
+            with sqlite_transaction() as connection:
+                connection.executemany("DELETE FROM routes WHERE id = ?", ((int(r),) for r in route_ids))
+        except Exception as e:
+            msg = f"Unexpected error during route delete: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def select_routes_page(self, start_date: Optional[dt.date] = None, end_date: Optional[dt.date] = None,
+                           limit: int = 50, after: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Select one page of the route history, newest first, using keyset pagination on (created_at, id).
+        Same arguments and rows as SupabaseRoute.select_routes_page.
+        """
+        clauses, params = [], []
+        if start_date:
+            clauses.append("route_date >= ?")
+            params.append(start_date.isoformat())
+        if end_date:
+            clauses.append("route_date < ?")
+            params.append((end_date + dt.timedelta(days=1)).isoformat())
+        if after:
+            clauses.append("(created_at, route_id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        try:
+            logger.debug(f"Select routes page: {start_date=} {end_date=} {limit=} {after=}")
+            with sqlite_lock() as connection:
+                rows = connection.execute(
+                    f"SELECT {ROUTE_LIST_COLUMNS} FROM route_summary {where}"
+                    "ORDER BY created_at DESC, route_id DESC LIMIT ?", (*params, limit)
+                ).fetchall()
+            return [dict(row) for row in rows]
+
+        except Exception as e:
+            msg = f"Unexpected error during select routes page: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def select_route_ids_for_date(self, route_date: dt.date) -> List[int]:
+        try:
+            logger.debug(f"Select route ids for {route_date}")
+            with sqlite_lock() as connection:
+                rows = connection.execute(
+                    "SELECT id FROM routes WHERE route_date >= ? AND route_date < ? ORDER BY vehicle_index",
+                    (route_date.isoformat(), (route_date + dt.timedelta(days=1)).isoformat())
+                ).fetchall()
+            return [row["id"] for row in rows]
+
+        except Exception as e:
+            msg = f"Unexpected error during select route ids: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
@@ -1,13 +1,16 @@
 import re
-from typing import Any, Dict, List, Union
-import pandas as pd
+import datetime as dt
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from wulfs_routing_api.models.supabase_db import supabase
+from wulfs_routing_api.models.supabase_db import get_supabase, get_async_supabase
 from wulfs_routing_api.models.routes.route_model import RouteModel
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columns needed by the history list
+ROUTE_LIST_COLUMNS = "id:route_id, route_date, vehicle_index, route_name, created_at, stop_count, road_distance_miles, total_duration_s"
+
 # TODO We do not have pydantic Objects yet. i.e., DTOs (Data Transfer Objects)
 class SupabaseRoute(RouteModel):
     def create(self, item_to_insert: Union[Dict[str, Any], List[Dict[str, Any]]]):
@@ -21,7 +24,7 @@ class SupabaseRoute(RouteModel):
         try:
             logger.debug(f"Inserting route(s): {item_to_insert}")
 
-            response = supabase.table("routes").insert(item_to_insert).execute()
+            response = get_supabase().table("routes").insert(item_to_insert).execute()
 
             # Validate response
             if not hasattr(response, "data") or response.data is None:
@@ -48,10 +51,20 @@ class SupabaseRoute(RouteModel):
             raise RuntimeError(msg) from e
 
     def select_all_routes(self):
+        """
+        Select the route history from the trigger-maintained `route_summary` table
+        (migrations/002), which carries stop counts and distance without touching stops.
+        """
         try:
             logger.debug(f"Select all routes")
 
-            response = supabase.table('routes').select("*").order('created_at', desc=True).execute()
+            response = (
+                get_supabase().table('route_summary')
+                .select("id:route_id, route_date, vehicle_index, route_name, created_at, stop_count, total_distance_miles, road_distance_miles, total_duration_s")
+                .order('created_at', desc=True)
+                .order('route_id', desc=True)
+                .execute()
+            )
 
             # Validate response
             if not hasattr(response, "data") or response.data is None:
@@ -68,3 +81,160 @@ class SupabaseRoute(RouteModel):
             msg = f"Unexpected error during select all routes: {e}"
             logger.exception(msg)
             raise RuntimeError(msg) from e
+
+    def create_with_stops(self, route_date: str, routes: Dict[str, List[Any]], stops: Dict[str, List[Any]], chunk_size: int = 5000) -> Dict[int, int]:
+        """
+        Insert all routes of a job and their stops atomically through the `persist_route_job` RPC.
+
+        routes = {"vehicle_index": [...], "route_name": [...], "total_distance_m": [...], "total_duration_s": [...]}
+        stops = {"vehicle_index": [...], "customer_id": [...], "sequence": [...], "notes": [...],
+                 "leg_polyline": [...], "cumulative_distance_m": [...], "cumulative_duration_s": [...]}
+
+        The routes and the first `chunk_size` stops are written in one transaction. Larger jobs
+        append the remaining stops in chunks through `append_route_stops`; if any chunk fails the
+        job's routes are deleted again (stops cascade), so no partial job is left behind.
+
+        Returns:
+            Dict[int, int]: vehicle_index -> route_id
+        """
+        num_stops = len(stops["vehicle_index"])
+        first = slice(0, chunk_size)
+        try:
+            logger.debug(f"Persisting {len(routes['vehicle_index'])} route(s) and {num_stops} stop(s) for {route_date}")
+
+            response = get_supabase().rpc("persist_route_job", {
+                "p_route_date": route_date,
+                "p_vehicle_index": routes["vehicle_index"],
+                "p_route_name": routes["route_name"],
+                "p_total_distance_m": routes["total_distance_m"],
+                "p_total_duration_s": routes["total_duration_s"],
+                "p_stop_vehicle_index": stops["vehicle_index"][first],
+                "p_stop_customer_id": stops["customer_id"][first],
+                "p_stop_sequence": stops["sequence"][first],
+                "p_stop_notes": stops["notes"][first],
+                "p_stop_leg_polyline": stops["leg_polyline"][first],
+                "p_stop_cumulative_distance_m": stops["cumulative_distance_m"][first],
+                "p_stop_cumulative_duration_s": stops["cumulative_duration_s"][first],
+            }).execute()
+
+            # Validate response
+            if not hasattr(response, "data") or not response.data:
+                msg = f"persist_route_job returned no data. Response: {response}"
+                logger.error(msg)
+                raise RuntimeError(msg)
+
+            created_map = {row["vehicle_index"]: row["route_id"] for row in response.data}
+
+        except Exception as e:
+            msg = f"Unexpected error during route job insert: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+        try:
+            for start in range(chunk_size, num_stops, chunk_size):
+                chunk = slice(start, start + chunk_size)
+                get_supabase().rpc("append_route_stops", {
+                    "p_route_id": [created_map[v] for v in stops["vehicle_index"][chunk]],
+                    "p_customer_id": stops["customer_id"][chunk],
+                    "p_sequence": stops["sequence"][chunk],
+                    "p_notes": stops["notes"][chunk],
+                    "p_leg_polyline": stops["leg_polyline"][chunk],
+                    "p_cumulative_distance_m": stops["cumulative_distance_m"][chunk],
+                    "p_cumulative_duration_s": stops["cumulative_duration_s"][chunk],
+                }).execute()
+        except Exception as e:
+            msg = f"Unexpected error appending stops, rolling back routes {list(created_map.values())}: {e}"
+            logger.exception(msg)
+            self.delete(list(created_map.values()))
+            raise RuntimeError(msg) from e
+
+        logger.info(f"Inserted {len(created_map)} route(s) and {num_stops} stop(s) successfully.")
+        return created_map
+
+    def delete(self, route_ids: List[int]):
+        try:
+            logger.debug(f"Deleting route(s): {route_ids}")
+            get_supabase().table("routes").delete(returning="minimal").in_("id", route_ids).execute()
+        except Exception as e:
+            msg = f"Unexpected error during route delete: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    @staticmethod
+    def _routes_page_query(client, start_date, end_date, limit, after):
+        """Build the keyset page query; shared by the sync and async clients."""
+        query = client.table('route_summary').select(ROUTE_LIST_COLUMNS)
+        if start_date:
+            query = query.gte('route_date', start_date.isoformat())
+        if end_date:
+            query = query.lt('route_date', (end_date + dt.timedelta(days=1)).isoformat())
+        if after:
+            created_at, route_id = after
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",route_id.lt.{route_id})')
+        return query.order('created_at', desc=True).order('route_id', desc=True).limit(limit)
+
+    @staticmethod
+    def _route_ids_for_date_query(client, route_date):
+        return (
+            client.table('routes')
+            .select("id")
+            .gte('route_date', route_date.isoformat())
+            .lt('route_date', (route_date + dt.timedelta(days=1)).isoformat())
+            .order('vehicle_index')
+        )
+
+    def select_routes_page(self, start_date: Optional[dt.date] = None, end_date: Optional[dt.date] = None,
+                           limit: int = 50, after: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Select one page of the route history, newest first, using keyset pagination on (created_at, id).
+
+        Args:
+            start_date (date): Earliest route_date to include.
+            end_date (date): Latest route_date to include.
+            limit (int): Maximum number of rows to return.
+            after (Tuple[str, int]): (created_at, id) of the last row of the previous page.
+        """
+        try:
+            logger.debug(f"Select routes page: {start_date=} {end_date=} {limit=} {after=}")
+            response = self._routes_page_query(get_supabase(), start_date, end_date, limit, after).execute()
+            return response.data or []
+
+        except Exception as e:
+            msg = f"Unexpected error during select routes page: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    async def aselect_routes_page(self, start_date: Optional[dt.date] = None, end_date: Optional[dt.date] = None,
+                                  limit: int = 50, after: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+        """Async `select_routes_page` on the shared async client."""
+        try:
+            logger.debug(f"Select routes page (async): {start_date=} {end_date=} {limit=} {after=}")
+            response = await self._routes_page_query(get_async_supabase(), start_date, end_date, limit, after).execute()
+            return response.data or []
+
+        except Exception as e:
+            msg = f"Unexpected error during select routes page: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def select_route_ids_for_date(self, route_date: dt.date) -> List[int]:
+        try:
+            logger.debug(f"Select route ids for {route_date}")
+            response = self._route_ids_for_date_query(get_supabase(), route_date).execute()
+            return [row["id"] for row in response.data or []]
+
+        except Exception as e:
+            msg = f"Unexpected error during select route ids: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    async def aselect_route_ids_for_date(self, route_date: dt.date) -> List[int]:
+        try:
+            logger.debug(f"Select route ids for {route_date} (async)")
+            response = await self._route_ids_for_date_query(get_async_supabase(), route_date).execute()
+            return [row["id"] for row in response.data or []]
+
+        except Exception as e:
+            msg = f"Unexpected error during select route ids: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
@@ -0,0 +1,188 @@
+import math
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# Local embedded storage with the schema of wulfs_routing_ddl.sql plus migrations 002 to 004.
+# Used instead of Supabase when STORAGE_BACKEND=sqlite (see models/storage.py): benchmarks,
+# load tests and offline batch jobs run without network access. ":memory:" keeps the database
+# in this process only.
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "wulfs_routing.db")
+
+# created_at is stored as ISO text so keyset cursors compare as strings, like PostgREST returns them
+_NOW = "(strftime('%Y-%m-%dT%H:%M:%f', 'now'))"
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS customers (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL,
+  name_key TEXT NOT NULL UNIQUE,
+  address TEXT,
+  city TEXT,
+  state TEXT,
+  zip TEXT,
+  lat REAL,
+  lon REAL,
+  snap_lat REAL,
+  snap_lon REAL,
+  snap_distance_m REAL,
+  osrm_hint TEXT,
+  osrm_dataset TEXT
+);
+
+CREATE TABLE IF NOT EXISTS routes (
+  id INTEGER PRIMARY KEY,
+  route_date TEXT NOT NULL,
+  vehicle_index INTEGER NOT NULL,
+  route_name TEXT NOT NULL,
+  created_at TEXT NOT NULL DEFAULT {_NOW},
+  total_distance_m REAL,
+  total_duration_s REAL
+);
+
+CREATE TABLE IF NOT EXISTS stops (
+  id INTEGER PRIMARY KEY,
+  route_id INTEGER NOT NULL REFERENCES routes(id) ON DELETE CASCADE,
+  customer_id INTEGER NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
+  sequence INTEGER NOT NULL,
+  notes TEXT NOT NULL,
+  created_at TEXT NOT NULL DEFAULT {_NOW},
+  leg_polyline TEXT,
+  cumulative_distance_m REAL,
+  cumulative_duration_s REAL
+);
+
+CREATE TABLE IF NOT EXISTS route_summary (
+  route_id INTEGER PRIMARY KEY REFERENCES routes(id) ON DELETE CASCADE,
+  route_date TEXT NOT NULL,
+  vehicle_index INTEGER NOT NULL,
+  route_name TEXT NOT NULL,
+  created_at TEXT NOT NULL,
+  stop_count INTEGER NOT NULL DEFAULT 0,
+  total_distance_miles REAL NOT NULL DEFAULT 0,
+  road_distance_miles REAL,
+  total_duration_s REAL
+);
+
+CREATE INDEX IF NOT EXISTS stops_route_id_sequence_idx ON stops (route_id, sequence);
+CREATE INDEX IF NOT EXISTS stops_customer_id_idx ON stops (customer_id);
+CREATE INDEX IF NOT EXISTS routes_route_date_idx ON routes (route_date);
+CREATE INDEX IF NOT EXISTS routes_created_at_id_idx ON routes (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS route_summary_route_date_idx ON route_summary (route_date);
+CREATE INDEX IF NOT EXISTS route_summary_created_at_id_idx ON route_summary (created_at DESC, route_id DESC);
+
+CREATE TRIGGER IF NOT EXISTS route_summary_routes_insert AFTER INSERT ON routes
+BEGIN
+  INSERT OR IGNORE INTO route_summary (route_id, route_date, vehicle_index, route_name, created_at,
+                                       road_distance_miles, total_duration_s)
+  VALUES (NEW.id, NEW.route_date, NEW.vehicle_index, NEW.route_name, NEW.created_at,
+          NEW.total_distance_m / 1609.344, NEW.total_duration_s);
+END;
+"""
+
+# Stop aggregates of the routes in the temp table `summary_routes`; the counterpart of
+# refresh_route_summary() in migration 002. SQLite triggers are per row, so writers call this
+# once per statement batch (see refresh_route_summary) instead of once per stop.
+_REFRESH_SUMMARY_SQL = """
+WITH ordered AS (
+  SELECT s.route_id, c.lat, c.lon,
+         LAG(c.lat) OVER w AS prev_lat,
+         LAG(c.lon) OVER w AS prev_lon
+  FROM stops s
+  JOIN customers c ON c.id = s.customer_id
+  WHERE s.route_id IN (SELECT route_id FROM summary_routes)
+  WINDOW w AS (PARTITION BY s.route_id ORDER BY s.sequence)
+), totals AS (
+  SELECT route_id, count(*) AS stop_count,
+         COALESCE(sum(haversine_miles(prev_lat, prev_lon, lat, lon)), 0) AS total_distance_miles
+  FROM ordered
+  GROUP BY route_id
+)
+UPDATE route_summary
+SET stop_count = COALESCE((SELECT stop_count FROM totals t WHERE t.route_id = route_summary.route_id), 0),
+    total_distance_miles = COALESCE((SELECT total_distance_miles FROM totals t WHERE t.route_id = route_summary.route_id), 0)
+WHERE route_id IN (SELECT route_id FROM summary_routes)
+"""
+
+# Columns added to existing tables after their first release: table -> [(column, type)]
+_ADDED_COLUMNS = {
+    "customers": [("snap_lat", "REAL"), ("snap_lon", "REAL"), ("snap_distance_m", "REAL"),
+                  ("osrm_hint", "TEXT"), ("osrm_dataset", "TEXT")],
+}
+
+def _add_missing_columns(connection: sqlite3.Connection):
+    # CREATE TABLE IF NOT EXISTS leaves database files created by an older schema as they were
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+        for column, column_type in columns:
+            if column not in existing:
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+def _haversine_miles(lat1, lon1, lat2, lon2):
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 3958.8 * 2 * math.asin(math.sqrt(min(1.0, h)))
+
+# One connection per process, shared by all threads and serialized by a lock: SQLite allows a
+# single writer anyway, and an in-memory database only exists on the connection that created it.
+_connection: sqlite3.Connection | None = None
+_lock = threading.RLock()
+
+def _connect(path: str) -> sqlite3.Connection:
+    # timeout: processes sharing a database file (e.g. backfill workers) wait for the write lock
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=60)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    if path != ":memory:":
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+    connection.create_function("haversine_miles", 4, _haversine_miles, deterministic=True)
+    connection.executescript(SCHEMA_SQL)
+    _add_missing_columns(connection)
+    connection.execute("CREATE TEMP TABLE IF NOT EXISTS summary_routes (route_id INTEGER PRIMARY KEY)")
+    return connection
+
+def get_sqlite() -> sqlite3.Connection:
+    """The process-wide connection, created (with the schema) on first use. Hold `sqlite_lock()` while using it."""
+    global _connection
+    with _lock:
+        if _connection is None:
+            _connection = _connect(SQLITE_PATH)
+        return _connection
+
+def configure_sqlite(path: str):
+    """Point the models at another database file (or ":memory:"), e.g. from a benchmark or backfill."""
+    global SQLITE_PATH, _connection
+    with _lock:
+        if _connection is not None:
+            _connection.close()
+        SQLITE_PATH, _connection = path, None
+
+@contextmanager
+def sqlite_lock() -> Iterator[sqlite3.Connection]:
+    """Exclusive use of the connection for reads."""
+    with _lock:
+        yield get_sqlite()
+
+@contextmanager
+def sqlite_transaction() -> Iterator[sqlite3.Connection]:
+    """Exclusive use of the connection inside one transaction, rolled back if the block raises."""
+    with _lock:
+        connection = get_sqlite()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+def refresh_route_summary(connection: sqlite3.Connection, route_ids):
+    """Recompute stop_count and total_distance_miles of the given routes. Call inside a transaction."""
+    connection.execute("DELETE FROM summary_routes")
+    connection.executemany("INSERT OR IGNORE INTO summary_routes (route_id) VALUES (?)", ((int(r),) for r in route_ids))
+    connection.execute(_REFRESH_SUMMARY_SQL)
@@ -0,0 +1,91 @@
+from typing import Any, Dict, List, Union
+from wulfs_routing_api.models.sqlite_db import refresh_route_summary, sqlite_lock, sqlite_transaction
+from wulfs_routing_api.models.stops.stop_model import StopModel
+import logging
+
+logger = logging.getLogger(__name__)
+
+STOP_INSERT_COLUMNS = ["route_id", "customer_id", "sequence", "notes", "leg_polyline", "cumulative_distance_m", "cumulative_duration_s"]
+# Same shape as STOP_LIST_COLUMNS of SupabaseStop: stop fields with nested customer and route fields
+STOP_LIST_FIELDS = ["id", "route_id", "customer_id", "sequence", "notes", "cumulative_distance_m", "cumulative_duration_s"]
+STOP_LIST_CUSTOMER_FIELDS = ["name", "address", "city", "state", "zip", "lat", "lon"]
+STOP_LIST_ROUTE_FIELDS = ["total_distance_m", "total_duration_s"]
+# SQLite's default limit on bound parameters per statement
+MAX_VARIABLES = 999
+
+def _nest(row, fields, customer_fields, route_fields=()) -> Dict[str, Any]:
+    stop = {f: row[f"s_{f}"] for f in fields}
+    stop["customers"] = {f: row[f"c_{f}"] for f in customer_fields}
+    if route_fields:
+        stop["routes"] = {f: row[f"r_{f}"] for f in route_fields}
+    return stop
+
+def _select(fields, customer_fields, route_fields=()) -> str:
+    columns = ([f"s.{f} AS s_{f}" for f in fields] + [f"c.{f} AS c_{f}" for f in customer_fields]
+               + [f"r.{f} AS r_{f}" for f in route_fields])
+    return (f"SELECT {', '.join(columns)} FROM stops s JOIN customers c ON c.id = s.customer_id "
+            + ("JOIN routes r ON r.id = s.route_id " if route_fields else ""))
+
+class SQLiteStop(StopModel):
+
+    def create(self, item_to_insert: Union[Dict[str, Any], List[Dict[str, Any]]]):
+        items = [item_to_insert] if isinstance(item_to_insert, dict) else item_to_insert
+        try:
+            logger.debug(f"Inserting stop(s): {item_to_insert}")
+            with sqlite_transaction() as connection:
+                rows = [
+                    dict(connection.execute(
+                        f"INSERT INTO stops ({', '.join(STOP_INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(STOP_INSERT_COLUMNS))}) RETURNING *",
+                        tuple(item.get(c) for c in STOP_INSERT_COLUMNS),
+                    ).fetchone())
+                    for item in items
+                ]
+                refresh_route_summary(connection, {row["route_id"] for row in rows})
+            logger.info(f"Inserted {len(rows)} stop(s) successfully.")
+            return rows[0] if isinstance(item_to_insert, dict) else rows
+
+        except Exception as e:
+            msg = f"Unexpected error during stop insert: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def get_stops_for_route(self, route_id):
+        try:
+            logger.debug(f"Get Stops for Route: {route_id}")
+            with sqlite_lock() as connection:
+                rows = connection.execute(
+                    _select(STOP_LIST_FIELDS, STOP_LIST_CUSTOMER_FIELDS, STOP_LIST_ROUTE_FIELDS)
+                    + "WHERE s.route_id = ? ORDER BY s.sequence", (route_id,)
+                ).fetchall()
+            return [_nest(row, STOP_LIST_FIELDS, STOP_LIST_CUSTOMER_FIELDS, STOP_LIST_ROUTE_FIELDS) for row in rows]
+
+        except Exception as e:
+            msg = f"Unexpected error during select stops: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def get_stops_for_routes(self, route_ids: List[int], with_geometry: bool = False) -> List[Dict[str, Any]]:
+        """
+        Select the stops of many routes, ordered by route and sequence, through the (route_id, sequence) index.
+        `with_geometry` adds each stop's encoded road leg (`leg_polyline`).
+        """
+        if not route_ids:
+            return []
+        fields = STOP_LIST_FIELDS + (["leg_polyline"] if with_geometry else [])
+        query = _select(fields, STOP_LIST_CUSTOMER_FIELDS, STOP_LIST_ROUTE_FIELDS)
+        try:
+            logger.debug(f"Get Stops for Routes: {route_ids}")
+            rows = []
+            with sqlite_lock() as connection:
+                for start in range(0, len(route_ids), MAX_VARIABLES):
+                    batch = [int(r) for r in route_ids[start:start + MAX_VARIABLES]]
+                    rows.extend(connection.execute(
+                        query + f"WHERE s.route_id IN ({', '.join('?' * len(batch))}) ORDER BY s.route_id, s.sequence", batch
+                    ).fetchall())
+            rows.sort(key=lambda row: (row["s_route_id"], row["s_sequence"]))
+            return [_nest(row, fields, STOP_LIST_CUSTOMER_FIELDS, STOP_LIST_ROUTE_FIELDS) for row in rows]
+
+        except Exception as e:
+            msg = f"Unexpected error during select stops: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
@@ -1,8 +1,16 @@
-import pandas as pd
+from wulfs_routing_api.utils.async_utils import run_sync
 
 class StopModel:
     def create(self, item_to_insert):
         # TODO Add linting hints
         raise NotImplementedError
     def get_stops_for_route(self, route_id):
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+    def get_stops_for_routes(self, route_ids, with_geometry=False):
+        raise NotImplementedError
+
+    # Async interface used by the API. Sync-only models are offloaded to the bounded thread pool.
+    async def aget_stops_for_route(self, route_id):
+        return await run_sync(self.get_stops_for_route, route_id)
+    async def aget_stops_for_routes(self, route_ids, with_geometry=False):
+        return await run_sync(self.get_stops_for_routes, route_ids, with_geometry)
@@ -1,12 +1,19 @@
 import re
-import pandas as pd
 from typing import Any, Dict, List, Union
-from wulfs_routing_api.models.supabase_db import supabase
+from wulfs_routing_api.models.supabase_db import get_supabase, get_async_supabase
 from wulfs_routing_api.models.stops.stop_model import StopModel
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Stop columns plus only the customer fields the UI displays
+STOP_LIST_COLUMNS = ("id, route_id, customer_id, sequence, notes, cumulative_distance_m, cumulative_duration_s, "
+                     "customers(name, address, city, state, zip, lat, lon), routes(total_distance_m, total_duration_s)")
+# Map views also need each stop's encoded road leg
+STOP_GEOMETRY_COLUMNS = STOP_LIST_COLUMNS + ", leg_polyline"
+# PostgREST caps a single response (max-rows); larger selections are read in pages of this size
+PAGE_SIZE = 1000
+
 class SupabaseStop(StopModel):
 
     def create(self, item_to_insert: Union[Dict[str, Any], List[Dict[str, Any]]]):
@@ -21,7 +28,7 @@ class SupabaseStop(StopModel):
         try:
             logger.debug(f"Inserting stop(s): {item_to_insert}")
 
-            response = supabase.table('stops').insert(item_to_insert).execute()
+            response = get_supabase().table('stops').insert(item_to_insert).execute()
 
             # Validate response
             if not hasattr(response, "data") or response.data is None:
@@ -47,11 +54,29 @@ class SupabaseStop(StopModel):
             logger.exception(msg)
             raise RuntimeError(msg) from e
 
+    @staticmethod
+    def _stops_for_route_query(client, route_id):
+        # Explicit columns: the response is cached as immutable, so it must not carry customer fields
+        # that are rewritten later (snapping hints) nor change shape when columns are added
+        return client.table('stops').select(STOP_LIST_COLUMNS).eq('route_id', route_id).order('sequence')
+
+    @staticmethod
+    def _stops_for_routes_query(client, route_ids, start, with_geometry=False):
+        """One PAGE_SIZE range of the batch stops query; shared by the sync and async clients."""
+        return (
+            client.table('stops')
+            .select(STOP_GEOMETRY_COLUMNS if with_geometry else STOP_LIST_COLUMNS)
+            .in_('route_id', route_ids)
+            .order('route_id')
+            .order('sequence')
+            .range(start, start + PAGE_SIZE - 1)
+        )
+
     def get_stops_for_route(self, route_id):
         try:
-            logger.error(f"Get Stops for Route: {route_id}")
+            logger.debug(f"Get Stops for Route: {route_id}")
 
-            response = supabase.table('stops').select('*, customers(*)').eq('route_id', route_id).execute()
+            response = self._stops_for_route_query(get_supabase(), route_id).execute()
 
             if not response.data:
                 return []
@@ -66,4 +91,65 @@ class SupabaseStop(StopModel):
             logger.exception(msg)
             raise RuntimeError(msg) from e
 
-        
\ No newline at end of file
+    async def aget_stops_for_route(self, route_id):
+        """Async `get_stops_for_route` on the shared async client."""
+        try:
+            logger.debug(f"Get Stops for Route (async): {route_id}")
+            response = await self._stops_for_route_query(get_async_supabase(), route_id).execute()
+            return response.data or []
+
+        except Exception as e:
+            msg = f"Unexpected error during select stops: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    def get_stops_for_routes(self, route_ids: List[int], with_geometry: bool = False) -> List[Dict[str, Any]]:
+        """
+        Select the stops of many routes with a single `IN` query, ordered by route and sequence.
+        `with_geometry` adds each stop's encoded road leg (`leg_polyline`).
+        """
+        if not route_ids:
+            return []
+        try:
+            logger.debug(f"Get Stops for Routes: {route_ids}")
+
+            stops = []
+            start = 0
+            while True:
+                response = self._stops_for_routes_query(get_supabase(), route_ids, start, with_geometry).execute()
+                stops.extend(response.data or [])
+                if not response.data or len(response.data) < PAGE_SIZE:
+                    break
+                start += PAGE_SIZE
+
+            logger.info(f"Selected {len(stops)} stops(s) for {len(route_ids)} route(s) successfully.")
+            return stops
+
+        except Exception as e:
+            msg = f"Unexpected error during select stops: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
+
+    async def aget_stops_for_routes(self, route_ids: List[int], with_geometry: bool = False) -> List[Dict[str, Any]]:
+        """Async `get_stops_for_routes` on the shared async client."""
+        if not route_ids:
+            return []
+        try:
+            logger.debug(f"Get Stops for Routes (async): {route_ids}")
+
+            client = get_async_supabase()
+            stops = []
+            start = 0
+            while True:
+                response = await self._stops_for_routes_query(client, route_ids, start, with_geometry).execute()
+                stops.extend(response.data or [])
+                if not response.data or len(response.data) < PAGE_SIZE:
+                    break
+                start += PAGE_SIZE
+
+            return stops
+
+        except Exception as e:
+            msg = f"Unexpected error during select stops: {e}"
+            logger.exception(msg)
+            raise RuntimeError(msg) from e
@@ -0,0 +1,46 @@
+from wulfs_routing_api import constants
+
+# Model classes per storage backend as (module, class) pairs. Imported on first use so the API
+# process never loads pandas/shapely for a backend it does not serve.
+MODELS = {
+    "supabase": {
+        "customer": ("wulfs_routing_api.models.customers.supabase_customer", "SupabaseCustomer"),
+        "order": ("wulfs_routing_api.models.orders.supabase_order", "SupabaseOrder"),
+        "route": ("wulfs_routing_api.models.routes.supabase_route", "SupabaseRoute"),
+        "stop": ("wulfs_routing_api.models.stops.supabase_stop", "SupabaseStop"),
+    },
+    "sqlite": {
+        "customer": ("wulfs_routing_api.models.customers.sqlite_customer", "SQLiteCustomer"),
+        "order": ("wulfs_routing_api.models.orders.sqlite_order", "SQLiteOrder"),
+        "route": ("wulfs_routing_api.models.routes.sqlite_route", "SQLiteRoute"),
+        "stop": ("wulfs_routing_api.models.stops.sqlite_stop", "SQLiteStop"),
+    },
+}
+
+def _model(kind: str):
+    import importlib
+
+    backend = constants.STORAGE_BACKEND
+    if backend not in MODELS:
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected one of {sorted(MODELS)}")
+    module_name, class_name = MODELS[backend][kind]
+    return getattr(importlib.import_module(module_name), class_name)()
+
+def customer_model():
+    return _model("customer")
+
+def order_model():
+    return _model("order")
+
+def route_model():
+    return _model("route")
+
+def stop_model():
+    return _model("stop")
+
+def storage_available() -> bool:
+    """Whether the configured backend can be used; Supabase needs credentials, local storage always can."""
+    if constants.STORAGE_BACKEND == "supabase":
+        from wulfs_routing_api.models.supabase_db import get_supabase
+        return get_supabase() is not None
+    return True
@@ -1,6 +1,7 @@
 import os
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient
 from dotenv import load_dotenv
+from wulfs_routing_api.utils.tracing import instrument_httpx_client
 
 # Load environment variables
 load_dotenv()
@@ -8,13 +9,54 @@ load_dotenv()
 url = os.environ.get("SUPABASE_URL")
 key = os.environ.get("SUPABASE_KEY")
 
-supabase: Client | None = None
+# The sync client is created on first use rather than at import, so importing the models
+# (e.g. in the API process) does not open connections or print as a side effect.
+_supabase: Client | None = None
+_supabase_initialized = False
 
-if not url or not key:
-    print("WARNING: Supabase credentials not found in .env file. Database functionality will be disabled.")
-else:
-    try:
-        supabase = create_client(url, key)  # no type hint here
-        print("✅ Supabase client initialized.")
-    except Exception as e:
-        print(f"❌ ERROR: Failed to initialize Supabase client: {e}")
\ No newline at end of file
+def get_supabase() -> Client | None:
+    global _supabase, _supabase_initialized
+    if not _supabase_initialized:
+        _supabase_initialized = True
+        if not url or not key:
+            print("WARNING: Supabase credentials not found in .env file. Database functionality will be disabled.")
+        else:
+            try:
+                _supabase = create_client(url, key)  # no type hint here
+                instrument_httpx_client(_supabase.postgrest.session, "supabase")
+                print("✅ Supabase client initialized.")
+            except Exception as e:
+                print(f"❌ ERROR: Failed to initialize Supabase client: {e}")
+    return _supabase
+
+def __getattr__(name):
+    # Keeps `from wulfs_routing_api.models.supabase_db import supabase` working (notebooks)
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Shared async client for the API process. Created once at startup (see main.lifespan) so all
+# requests reuse its pooled HTTP connections instead of blocking the event loop on the sync client.
+async_supabase: AsyncClient | None = None
+
+async def init_async_supabase() -> AsyncClient | None:
+    global async_supabase
+    if async_supabase is None and url and key:
+        try:
+            async_supabase = await acreate_client(url, key)
+            instrument_httpx_client(async_supabase.postgrest.session, "supabase")
+            print("✅ Async Supabase client initialized.")
+        except Exception as e:
+            print(f"❌ ERROR: Failed to initialize async Supabase client: {e}")
+    return async_supabase
+
+async def close_async_supabase():
+    global async_supabase
+    if async_supabase is not None:
+        await async_supabase.postgrest.aclose()
+        async_supabase = None
+
+def get_async_supabase() -> AsyncClient:
+    if async_supabase is None:
+        raise RuntimeError("Async Supabase client not initialized. Call init_async_supabase() at startup.")
+    return async_supabase
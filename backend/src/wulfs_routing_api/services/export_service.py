@@ -0,0 +1,121 @@
+import io
+import logging
+from typing import AsyncIterator
+
+from wulfs_routing_api.models.routes.route_model import RouteModel
+from wulfs_routing_api.models.stops.stop_model import StopModel
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# One row per stop, denormalized with its route and customer
+EXPORT_COLUMNS = [
+    ("route_id", "int64"), ("route_date", "string"), ("vehicle_index", "int64"), ("route_name", "string"),
+    ("stop_id", "int64"), ("sequence", "int64"), ("customer_id", "int64"), ("customer_name", "string"),
+    ("address", "string"), ("city", "string"), ("state", "string"), ("zip", "string"),
+    ("lat", "float64"), ("lon", "float64"), ("notes", "string"),
+    ("cumulative_distance_m", "float64"), ("cumulative_duration_s", "float64"),
+]
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written so far. Tracks its position for the Parquet footer."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportService():
+    def __init__(self, route_model: RouteModel, stop_model: StopModel):
+        self.route_model = route_model
+        self.stop_model = stop_model
+
+    @staticmethod
+    def _schema():
+        import pyarrow as pa  # heavy; loaded only when an export is requested
+        return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in EXPORT_COLUMNS])
+
+    async def aiter_record_batches(self, start_date=None, end_date=None, page_size: int = 200):
+        """
+        Yield one Arrow RecordBatch per page of routes (newest first).
+        Routes are read with keyset pagination and their stops with one batch query per page,
+        so memory stays bounded by `page_size` routes regardless of the date range.
+        """
+        import pyarrow as pa
+
+        schema = self._schema()
+        after = None
+        while True:
+            routes = await self.route_model.aselect_routes_page(start_date, end_date, page_size, after)
+            if not routes:
+                return
+            routes_by_id = {route["id"]: route for route in routes}
+            stops = await self.stop_model.aget_stops_for_routes(list(routes_by_id))
+
+            columns = {name: [] for name, _ in EXPORT_COLUMNS}
+            for stop in stops:
+                route = routes_by_id[stop["route_id"]]
+                customer = stop.get("customers") or {}
+                row = {
+                    "route_id": stop["route_id"], "route_date": route["route_date"],
+                    "vehicle_index": route["vehicle_index"], "route_name": route["route_name"],
+                    "stop_id": stop["id"], "sequence": stop["sequence"], "customer_id": stop["customer_id"],
+                    "customer_name": customer.get("name"), "address": customer.get("address"),
+                    "city": customer.get("city"), "state": customer.get("state"),
+                    "zip": None if customer.get("zip") is None else str(customer["zip"]),
+                    "lat": customer.get("lat"), "lon": customer.get("lon"), "notes": stop.get("notes"),
+                    "cumulative_distance_m": stop.get("cumulative_distance_m"),
+                    "cumulative_duration_s": stop.get("cumulative_duration_s"),
+                }
+                for name in columns:
+                    columns[name].append(row[name])
+            yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+            if len(routes) < page_size:
+                return
+            after = (routes[-1]["created_at"], routes[-1]["id"])
+
+    async def astream_export(self, export_format: str, start_date=None, end_date=None, page_size: int = 200) -> AsyncIterator[bytes]:
+        """Stream the route history as an Arrow IPC stream or a Parquet file, one chunk per page."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+
+        sink = _ChunkSink()
+        schema = self._schema()
+        writer = pa.ipc.new_stream(sink, schema) if export_format == "arrow" else pq.ParquetWriter(sink, schema, compression="zstd")
+        rows = 0
+        try:
+            async for batch in self.aiter_record_batches(start_date, end_date, page_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        finally:
+            writer.close()
+        yield sink.drain()
+        logger.info(f"Exported {rows} stop(s) as {export_format}.")
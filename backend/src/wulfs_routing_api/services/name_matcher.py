@@ -0,0 +1,49 @@
+from typing import Iterable
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+import logging
+
+logger = logging.getLogger(__name__)
+
+class NameMatcher():
+    def __init__(self, name_keys: Iterable[str], ngram_size: int = 3):
+        """
+        Character n-gram index over the customer master's normalized `name_key`s.
+
+        Names are vectorized once into L2-normalized TF-IDF trigram vectors. Scoring a batch of
+        queries is then a single sparse matrix product against the index, so the work grows with
+        the number of shared n-grams rather than with orders x customers.
+
+        Args:
+            name_keys (Iterable[str]): Normalized customer name keys to index.
+            ngram_size (int): Length of the character n-grams.
+        """
+        self.name_keys = np.asarray(list(name_keys), dtype=object)
+        self.vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(ngram_size, ngram_size), dtype=np.float32)
+        self.index = self.vectorizer.fit_transform(self.name_keys) if len(self.name_keys) else None
+        logger.info(f"Built name index over {len(self.name_keys)} customer name keys.")
+
+    def top_k(self, queries: Iterable[str], k: int = 3) -> pd.DataFrame:
+        """
+        Score every query against the index and keep the best `k` candidates per query.
+
+        Returns:
+            pd.DataFrame with columns: query, rank (0 = best), name_key, score (cosine similarity 0..1).
+            Queries with no shared n-gram are absent from the result.
+        """
+        queries = np.asarray(list(queries), dtype=object)
+        if self.index is None or len(queries) == 0:
+            return pd.DataFrame(columns=["query", "rank", "name_key", "score"])
+
+        scores = (self.vectorizer.transform(queries) @ self.index.T).tocoo()
+        candidates = pd.DataFrame({"row": scores.row, "col": scores.col, "score": scores.data})
+        candidates = candidates.sort_values(["row", "score"], ascending=[True, False], kind="stable")
+        candidates = candidates.groupby("row", sort=False).head(k)
+
+        return pd.DataFrame({
+            "query": queries[candidates["row"].to_numpy()],
+            "rank": candidates.groupby("row", sort=False).cumcount().to_numpy(),
+            "name_key": self.name_keys[candidates["col"].to_numpy()],
+            "score": candidates["score"].to_numpy(dtype=np.float64).round(4),
+        })
@@ -1,16 +1,34 @@
 
 import re
 import unicodedata
+import numpy as np
 import pandas as pd
 
 from wulfs_routing_api.utils.data_io_utils import read_table
 import re
 import pandas as pd
 from wulfs_routing_api.models.orders.order_model import OrderModel
+from wulfs_routing_api.services.name_matcher import NameMatcher
+import logging
+
+logger = logging.getLogger(__name__)
 
 class OrderService():
-    def __init__(self, model: OrderModel):
+    # Name index of the most recent customer master, shared across jobs in the same worker process
+    _name_index: tuple[int, NameMatcher] | None = None
+
+    def __init__(self, model: OrderModel, auto_match_threshold: float = 0.8, match_margin: float = 0.05, suggestion_count: int = 3):
+        """
+        Args:
+            model (OrderModel): Order persistence model.
+            auto_match_threshold (float): Minimum similarity for an unmatched order name to be resolved automatically.
+            match_margin (float): Required lead of the best candidate over the runner-up for an automatic match.
+            suggestion_count (int): Number of candidate customers suggested for orders that remain unmatched.
+        """
         self.model = model
+        self.auto_match_threshold = auto_match_threshold
+        self.match_margin = match_margin
+        self.suggestion_count = suggestion_count
         self.norm_space = re.compile(r"\s+")
         self.norm_keep = re.compile(r"[^a-z0-9 ]")  # keep alphanumerics + spaces
 
@@ -24,6 +42,31 @@ class OrderService():
         s = self.norm_space.sub(" ", s).strip()
         return s
 
+    def _norm_names(self, names: pd.Series) -> pd.Series:
+        """
+        Vectorized form of `_norm_name` for a whole column.
+        Only the unique names are normalized (order files repeat customers heavily),
+        and the results are broadcast back to every row through the factorized codes.
+        """
+        codes, uniques = pd.factorize(names, use_na_sentinel=True)
+        if len(uniques) == 0:
+            return pd.Series("", index=names.index, dtype=object)
+
+        keys = (
+            pd.Series(uniques, dtype=object).astype(str)
+            .str.normalize("NFKD")
+            .str.encode("ascii", "ignore")
+            .str.decode("ascii")
+            .str.strip()
+            .str.lower()
+            .str.replace(self.norm_keep, "", regex=True)
+            .str.replace(self.norm_space, " ", regex=True)
+            .str.strip()
+        )
+        # Missing names (code -1) map to an empty key, like `_norm_name(None)`
+        memo = np.append(keys.to_numpy(dtype=object), "")
+        return pd.Series(memo[codes], index=names.index, dtype=object)
+
     def _map_name_key(self, orders_df) -> pd.DataFrame:
         cols = {c.lower().strip(): c for c in orders_df.columns}
 
@@ -42,11 +85,57 @@ class OrderService():
         if "notes" not in orders_df.columns:
             orders_df["notes"] = ""
 
-        orders_df["name_key"] = orders_df["customer_name"].apply(self._norm_name)
+        orders_df["name_key"] = self._norm_names(orders_df["customer_name"])
         return orders_df
 
+    def _get_name_index(self, master_df) -> NameMatcher:
+        """Return the n-gram index for the master's name keys, rebuilding it only when the master changes."""
+        fingerprint = int(pd.util.hash_pandas_object(master_df["name_key"], index=False).sum())
+        cached = OrderService._name_index
+        if cached is None or cached[0] != fingerprint:
+            OrderService._name_index = (fingerprint, NameMatcher(master_df["name_key"]))
+        return OrderService._name_index[1]
+
+    def _fuzzy_match_name_keys(self, name_keys: pd.Series, master_df) -> tuple[dict, dict]:
+        """
+        Resolve name keys that have no exact match in the customer master.
+
+        Returns:
+            (matches, suggestions): `matches` maps a name key to a confidently matched master key and
+            its score; `suggestions` maps every remaining name key to its top candidates.
+        """
+        unmatched = pd.Series(name_keys[~name_keys.isin(master_df["name_key"])].unique())
+        unmatched = unmatched[unmatched != ""]
+        if unmatched.empty:
+            return {}, {}
+
+        candidates = self._get_name_index(master_df).top_k(unmatched, k=max(self.suggestion_count, 2))
+        best = candidates[candidates["rank"] == 0].set_index("query")
+        runner_up = candidates[candidates["rank"] == 1].set_index("query")["score"].reindex(best.index, fill_value=0.0)
+        confident = (best["score"] >= self.auto_match_threshold) & (best["score"] - runner_up >= self.match_margin)
+
+        matches = {q: (row.name_key, float(row.score)) for q, row in best[confident].iterrows()}
+        remaining = candidates[~candidates["query"].isin(matches.keys()) & (candidates["rank"] < self.suggestion_count)]
+        suggestions = {
+            q: [{"name_key": k, "score": float(sc)} for k, sc in zip(group["name_key"], group["score"])]
+            for q, group in remaining.groupby("query", sort=False)
+        }
+        return matches, suggestions
+
     def customer_details_for_orders(self, orders_df, master_df):
         orders_df = self._map_name_key(orders_df)
+
+        # Orders without an exact name_key are resolved against the n-gram index of the master.
+        # Confident matches are merged like exact ones; the rest carry suggestions for manual review.
+        matches, suggestions = self._fuzzy_match_name_keys(orders_df["name_key"], master_df)
+        orders_df["order_name_key"] = orders_df["name_key"]
+        orders_df["match_score"] = np.where(orders_df["name_key"].isin(master_df["name_key"]), 1.0, np.nan)
+        if matches:
+            matched = orders_df["name_key"].isin(matches.keys())
+            orders_df.loc[matched, "match_score"] = orders_df.loc[matched, "name_key"].map(lambda k: matches[k][1])
+            orders_df.loc[matched, "name_key"] = orders_df.loc[matched, "name_key"].map(lambda k: matches[k][0])
+            logger.info(f"Fuzzy matched {int(matched.sum())} order(s) to customers.")
+
         merged_df = orders_df.merge(
             master_df, # Merge with the full dataframe from DB
             on="name_key",
@@ -54,6 +143,7 @@ class OrderService():
             suffixes=('_order', '')
         )
         #TODO this smells bad
-        missing_customers_df = merged_df[merged_df["lat"].isna() | merged_df["lon"].isna()]
+        missing_customers_df = merged_df[merged_df["lat"].isna() | merged_df["lon"].isna()].copy()
+        missing_customers_df["suggestions"] = missing_customers_df["order_name_key"].map(lambda k: suggestions.get(k, []))
         merged_df = merged_df.dropna(subset=["lat", "lon"]).reset_index(drop=True)
-        return merged_df, missing_customers_df
\ No newline at end of file
+        return merged_df, missing_customers_df
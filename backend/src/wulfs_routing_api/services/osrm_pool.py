@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Several osrm-routed processes (e.g. one container each) behind one OSRMService. Requests go to
+# the backend with the fewest requests in flight; a backend that fails OSRM_MAX_FAILURES times in a
+# row (connection errors, timeouts, 5xx) is ejected for OSRM_EJECT_COOLDOWN_SECONDS. A background
+# thread probes every backend with a /nearest request, ejecting failing ones and bringing ejected
+# ones back once their cooldown is over and they answer again. Counts are per process.
+OSRM_MAX_FAILURES = int(os.getenv("OSRM_MAX_FAILURES", "3"))
+OSRM_EJECT_COOLDOWN_SECONDS = float(os.getenv("OSRM_EJECT_COOLDOWN_SECONDS", "30"))
+OSRM_HEALTH_INTERVAL_SECONDS = float(os.getenv("OSRM_HEALTH_INTERVAL_SECONDS", "5"))
+OSRM_HEALTH_TIMEOUT_SECONDS = float(os.getenv("OSRM_HEALTH_TIMEOUT_SECONDS", "2"))
+# Any coordinate answers /nearest; the depot is inside every extract this app uses
+HEALTH_PROBE = (float(os.getenv("DEPOT_LAT", "42.34902")), float(os.getenv("DEPOT_LON", "-71.03118")))
+
+def parse_backend_urls(urls) -> List[str]:
+    """Backend base URLs from a list or a comma-separated string (e.g. $OSRM_URL)."""
+    if isinstance(urls, str):
+        urls = urls.split(",")
+    parsed = [url.strip().rstrip("/") for url in urls if url and url.strip()]
+    if not parsed:
+        raise ValueError("At least one OSRM backend URL is required.")
+    return list(dict.fromkeys(parsed))
+
+
+@dataclass
+class OSRMBackend:
+    url: str
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+
+class OSRMBackendPool():
+    _pools: Dict[Tuple[str, ...], "OSRMBackendPool"] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, urls: List[str], max_failures: int = OSRM_MAX_FAILURES,
+                 cooldown_seconds: float = OSRM_EJECT_COOLDOWN_SECONDS,
+                 health_interval_seconds: float = OSRM_HEALTH_INTERVAL_SECONDS,
+                 health_timeout_seconds: float = OSRM_HEALTH_TIMEOUT_SECONDS):
+        """
+        Least-outstanding-requests balancing over OSRM backends, with ejection and health checks.
+
+        Args:
+            urls (List[str]): Backend base URLs.
+            max_failures (int): Consecutive failures after which a backend is ejected.
+            cooldown_seconds (float): How long an ejected backend receives no requests.
+            health_interval_seconds (float): Pause between health check rounds (0 disables them).
+            health_timeout_seconds (float): Timeout of one health check request.
+        """
+        self.backends = [OSRMBackend(url) for url in parse_backend_urls(urls)]
+        self.max_failures = max_failures
+        self.cooldown_seconds = cooldown_seconds
+        self.health_interval_seconds = health_interval_seconds
+        self.health_timeout_seconds = health_timeout_seconds
+        self._lock = threading.Lock()
+        self._next = 0
+        self._checker_pid: Optional[int] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def shared(cls, urls) -> "OSRMBackendPool":
+        """The process-wide pool of these backends, so every OSRMService sees the same load and health."""
+        key = tuple(parse_backend_urls(urls))
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls._pools[key] = cls(list(key))
+            return pool
+
+    def acquire(self, exclude: Iterable[str] = ()) -> Optional[OSRMBackend]:
+        """
+        Reserve the backend with the fewest outstanding requests, skipping `exclude` (URLs already tried).
+        Ejected backends are only used when no other is left, the one returning soonest first.
+        Returns None when every backend is excluded. Pair with release().
+        """
+        self._ensure_health_checker()
+        now = time.monotonic()
+        with self._lock:
+            candidates = [b for b in self.backends if b.url not in exclude]
+            if not candidates:
+                return None
+            available = [b for b in candidates if b.available(now)]
+            if available:
+                # Rotate the starting point so ties do not always go to the first backend
+                start = self._next % len(available)
+                self._next += 1
+                rotated = available[start:] + available[:start]
+                backend = min(rotated, key=lambda b: b.outstanding)
+            else:
+                backend = min(candidates, key=lambda b: b.ejected_until)
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: OSRMBackend, ok: bool):
+        """Finish a request on `backend`; failures count towards its ejection."""
+        with self._lock:
+            backend.outstanding -= 1
+            self._record(backend, ok)
+
+    def _record(self, backend: OSRMBackend, ok: bool):
+        if ok:
+            backend.consecutive_failures = 0
+            return
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        now = time.monotonic()
+        if backend.consecutive_failures >= self.max_failures and backend.available(now):
+            backend.ejected_until = now + self.cooldown_seconds
+            if len(self.backends) > 1:
+                logger.warning(f"Ejected OSRM backend {backend.url} for {self.cooldown_seconds:.0f}s "
+                               f"after {backend.consecutive_failures} consecutive failures")
+
+    # ---------------------------------------------------------------------
+    # Health checks
+    # ---------------------------------------------------------------------
+    def _ensure_health_checker(self):
+        # One checker thread per process (a forked worker does not inherit its parent's thread)
+        if len(self.backends) < 2 or not self.health_interval_seconds or self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._run_health_checks, name="osrm-health-check", daemon=True).start()
+
+    def _run_health_checks(self):
+        session = requests.Session()
+        while not self._stopped.wait(self.health_interval_seconds):
+            self.check_health(session)
+
+    def _probe(self, backend: OSRMBackend, session) -> bool:
+        url = f"{backend.url}/nearest/v1/driving/{HEALTH_PROBE[1]},{HEALTH_PROBE[0]}"
+        try:
+            response = session.get(url, params={"number": 1}, timeout=self.health_timeout_seconds)
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def check_health(self, session=requests):
+        """
+        Probe the backends: those in service and those whose cooldown is over. A failing backend is
+        ejected (again) right away; one that answers is back in service.
+        """
+        now = time.monotonic()
+        for backend in [b for b in self.backends if b.available(now)]:
+            healthy = self._probe(backend, session)
+            with self._lock:
+                was_ejected = backend.ejected_until > 0
+                if healthy:
+                    backend.consecutive_failures = 0
+                    backend.ejected_until = 0.0
+                    if was_ejected:
+                        logger.warning(f"OSRM backend {backend.url} is healthy again")
+                else:
+                    backend.consecutive_failures = max(backend.consecutive_failures, self.max_failures - 1)
+                    self._record(backend, False)
+
+    def stop(self):
+        self._stopped.set()
+
+    def status(self) -> List[dict]:
+        """Per backend: outstanding requests, totals and whether it is ejected (for logs and benchmarks)."""
+        now = time.monotonic()
+        with self._lock:
+            return [{"url": b.url, "outstanding": b.outstanding, "requests": b.requests, "failures": b.failures,
+                     "ejected": not b.available(now)} for b in self.backends]
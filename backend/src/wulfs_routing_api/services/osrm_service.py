@@ -1,22 +1,79 @@
+import os
 import requests
 import time
-from typing import Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict, List, Union
+
+from wulfs_routing_api.services.osrm_pool import OSRMBackendPool
+from wulfs_routing_api.utils.tracing import inject, span
 
 class OSRMService:
-    def __init__(self, osrm_url: str = "http://localhost:5001", timeout: int = 5, max_retries: int = 3, retry_delay: float = 0.5):
+    def __init__(self, osrm_url: Union[str, List[str], None] = None, timeout: int = 5, max_retries: int = 3, retry_delay: float = 0.5,
+                 session: Optional[requests.Session] = None):
         """
-        OSRMService handles route distance and duration queries via a running OSRM server.
+        OSRMService handles route distance and duration queries via one or more running OSRM servers.
 
         Args:
-            osrm_url (str): Base URL of the OSRM server.
+            osrm_url (str | List[str]): Base URL of the OSRM server, or several (a list or comma-separated)
+                balanced and failed over by services/osrm_pool.py (default: $OSRM_URL or http://localhost:5001).
             timeout (int): Request timeout in seconds.
             max_retries (int): Number of retry attempts for failed requests.
             retry_delay (float): Delay between retries in seconds.
+            session (requests.Session): Optional pooled session; without it every request opens a new connection.
         """
-        self.osrm_url = osrm_url.rstrip("/")
+        self.pool = OSRMBackendPool.shared(osrm_url or os.getenv("OSRM_URL", "http://localhost:5001"))
+        self.osrm_url = self.pool.backends[0].url
         self.timeout = timeout
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.http = session or requests
+        # (lat, lon) rounded to 6 decimals -> OSRM snapping hint (see services/snapping_service.py)
+        self.hints: Dict[Tuple[float, float], str] = {}
+
+    @staticmethod
+    def _hint_key(coords: Tuple[float, float]) -> Tuple[float, float]:
+        return round(float(coords[0]), 6), round(float(coords[1]), 6)
+
+    def set_hints(self, hints: Dict[Tuple[float, float], str]):
+        """
+        Snapping hints to send with requests through these (latitude, longitude) coordinates. OSRM then
+        skips the nearest-edge search for them; hints from another OSRM dataset are ignored by the server.
+        """
+        self.hints = {self._hint_key(coords): hint for coords, hint in hints.items() if hint}
+
+    def _with_hints(self, params: Dict, points: List[Tuple[float, float]]) -> Dict:
+        if self.hints:
+            hints = [self.hints.get(self._hint_key(coords), "") for coords in points]
+            if any(hints):
+                return {**params, "hints": ";".join(hints)}
+        return params
+
+    def _get(self, path: str, params: Dict) -> requests.Response:
+        """
+        One OSRM HTTP request for `path` (e.g. "/route/v1/driving/..."), sent to the least loaded backend.
+        Connection errors, timeouts and 5xx answers fail over to the other backends; the last error
+        (or 5xx response) is returned to the caller's retry loop once every backend was tried.
+        """
+        service = path.split("/")[1]
+        tried, error = set(), None
+        while (backend := self.pool.acquire(exclude=tried)) is not None:
+            tried.add(backend.url)
+            ok = False
+            try:
+                with span(f"osrm {service}", **{"http.host": backend.url, "osrm.coordinates": path.rsplit("/", 1)[-1].count(";") + 1}) as current:
+                    response = self.http.get(backend.url + path, params=params, timeout=self.timeout, headers=inject({}))
+                    if current is not None:
+                        current.set_attribute("http.status_code", response.status_code)
+                ok = response.status_code < 500
+                if ok or len(tried) == len(self.pool.backends):
+                    return response
+                error = requests.exceptions.HTTPError(f"{response.status_code} Server Error from {backend.url}", response=response)
+            except requests.exceptions.RequestException as e:
+                error = e
+            finally:
+                self.pool.release(backend, ok)
+            if len(tried) < len(self.pool.backends):
+                print(f"OSRM backend {backend.url} failed ({error}); failing over")
+        raise error
 
     def _validate_coords(self, coords: Tuple[float, float]) -> bool:
         """Ensure coordinates are valid (latitude -90..90, longitude -180..180)."""
@@ -35,12 +92,12 @@ class OSRMService:
 
         # OSRM expects coordinates in longitude,latitude order
         coordinates = f"{start_coords[1]},{start_coords[0]};{end_coords[1]},{end_coords[0]}"
-        url = f"{self.osrm_url}/route/v1/driving/{coordinates}"
-        params = {"overview": "false"}
+        path = f"/route/v1/driving/{coordinates}"
+        params = self._with_hints({"overview": "false"}, [start_coords, end_coords])
 
         for attempt in range(1, self.max_retries + 1):
             try:
-                response = requests.get(url, params=params, timeout=self.timeout)
+                response = self._get(path, params)
                 response.raise_for_status()
                 data = response.json()
                 # Ensure routes exist
@@ -59,6 +116,155 @@ class OSRMService:
                 print(f"Attempt {attempt}: Invalid JSON response: {ve}")
                 return None
 
+    def get_route_legs(self, waypoints: List[Tuple[float, float]]) -> Optional[List[Dict]]:
+        """
+        Fetch the road route through all `waypoints` (latitude, longitude) with one request.
+
+        The full overview geometry is split back into one piece per leg using the per-leg
+        annotation lengths (a leg with n segments spans n + 1 overview coordinates).
+
+        Returns:
+            List[dict]: one {"distance_m", "duration_s", "coordinates": [(lat, lon), ...]} per leg,
+            or None on failure.
+        """
+        if len(waypoints) < 2 or not all(self._validate_coords(coords) for coords in waypoints):
+            print(f"Invalid waypoints: {waypoints}")
+            return None
+
+        coordinates = ";".join(f"{lon},{lat}" for lat, lon in waypoints)
+        path = f"/route/v1/driving/{coordinates}"
+        params = self._with_hints({"overview": "full", "geometries": "geojson", "annotations": "distance", "steps": "false"}, waypoints)
+
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = self._get(path, params)
+                response.raise_for_status()
+                data = response.json()
+                if not data.get("routes"):
+                    print(f"No route found through {len(waypoints)} waypoints")
+                    return None
+                route = data["routes"][0]
+                overview = route["geometry"]["coordinates"]
+                legs = []
+                offset = 0
+                for leg in route["legs"]:
+                    segments = len(leg["annotation"]["distance"])
+                    legs.append({
+                        "distance_m": leg["distance"],
+                        "duration_s": leg["duration"],
+                        "coordinates": [(lat, lon) for lon, lat in overview[offset:offset + segments + 1]],
+                    })
+                    offset += segments
+                return legs
+            except requests.exceptions.RequestException as e:
+                print(f"Attempt {attempt}: Error fetching route legs: {e}")
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay)
+                else:
+                    return None
+            except (ValueError, KeyError) as ve:
+                print(f"Attempt {attempt}: Invalid route response: {ve}")
+                return None
+
+    def get_distance_table(self, points: List[Tuple[float, float]], max_table_size: int = 100) -> Optional[List[List[Optional[float]]]]:
+        """
+        Driving distances in miles between all `points` (latitude, longitude); see get_table.
+
+        Returns:
+            List[List[float]]: row i, column j is the distance from points[i] to points[j], or None on failure.
+        """
+        table = self.get_table(points, max_table_size)
+        return table[0] if table else None
+
+    def get_table(self, points: List[Tuple[float, float]], max_table_size: int = 100) -> Optional[Tuple[List[List[Optional[float]]], List[List[Optional[float]]]]]:
+        """
+        Driving distances (miles) and durations (seconds) between all `points` (latitude, longitude)
+        through OSRM's /table service.
+
+        The matrix is requested in blocks of sources x destinations so no request carries more than
+        `max_table_size` coordinates (osrm-routed --max-table-size): (n / (max_table_size / 2))^2 requests
+        instead of n^2 / 2 single routes. Unroutable pairs are None.
+
+        Returns:
+            (distances, durations): row i, column j is from points[i] to points[j], or None on failure.
+        """
+        if not points or not all(self._validate_coords(coords) for coords in points):
+            print("Invalid table coordinates")
+            return None
+
+        block = max(1, max_table_size // 2)
+        distances = [[None] * len(points) for _ in points]
+        durations = [[None] * len(points) for _ in points]
+        for src_start in range(0, len(points), block):
+            sources = points[src_start:src_start + block]
+            for dst_start in range(0, len(points), block):
+                destinations = points[dst_start:dst_start + block]
+                coordinates = ";".join(f"{lon},{lat}" for lat, lon in sources + destinations)
+                params = self._with_hints({
+                    "annotations": "distance,duration",
+                    "sources": ";".join(str(i) for i in range(len(sources))),
+                    "destinations": ";".join(str(len(sources) + i) for i in range(len(destinations))),
+                }, sources + destinations)
+                data = self._get_table(f"/table/v1/driving/{coordinates}", params)
+                if data is None:
+                    return None
+                for i, (distance_row, duration_row) in enumerate(zip(data["distances"], data["durations"])):
+                    distances[src_start + i][dst_start:dst_start + len(distance_row)] = [
+                        None if meters is None else self.meters_to_miles(meters) for meters in distance_row]
+                    durations[src_start + i][dst_start:dst_start + len(duration_row)] = duration_row
+        return distances, durations
+
+    def _get_table(self, path: str, params: Dict) -> Optional[Dict]:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = self._get(path, params)
+                response.raise_for_status()
+                data = response.json()
+                if "distances" not in data or "durations" not in data:
+                    raise KeyError("distances/durations")
+                return data
+            except requests.exceptions.RequestException as e:
+                print(f"Attempt {attempt}: Error fetching distance table: {e}")
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay)
+                else:
+                    return None
+            except (ValueError, KeyError) as ve:
+                print(f"Attempt {attempt}: Invalid table response: {ve}")
+                return None
+
+    def get_nearest(self, coords: Tuple[float, float]) -> Optional[Dict]:
+        """
+        Snap a (latitude, longitude) coordinate to the road network with OSRM's /nearest service.
+
+        Returns:
+            dict: {"lat", "lon"} of the snapped location, "distance_m" from the input, the reusable
+            "hint" and the server's "data_version" (None unless osrm-extract was given one); None on failure.
+        """
+        if not self._validate_coords(coords):
+            print(f"Invalid coordinates: {coords}")
+            return None
+
+        path = f"/nearest/v1/driving/{coords[1]},{coords[0]}"
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = self._get(path, {"number": 1})
+                response.raise_for_status()
+                data = response.json()
+                waypoint = data["waypoints"][0]
+                lon, lat = waypoint["location"]
+                return {"lat": lat, "lon": lon, "distance_m": waypoint["distance"],
+                        "hint": waypoint["hint"], "data_version": data.get("data_version")}
+            except requests.exceptions.RequestException as e:
+                print(f"Attempt {attempt}: Error fetching nearest: {e}")
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay)
+                else:
+                    return None
+            except (ValueError, KeyError, IndexError) as ve:
+                print(f"Attempt {attempt}: Invalid nearest response: {ve}")
+                return None
+
     @staticmethod
     def meters_to_miles(meters: float) -> float:
         """Convert meters to miles."""
@@ -0,0 +1,61 @@
+from typing import Dict, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from wulfs_routing_api.services.osrm_service import OSRMService
+from wulfs_routing_api.utils.polyline import encode_polyline
+
+logger = logging.getLogger(__name__)
+
+# Per-stop columns stored with the stops table
+ROAD_LEG_COLUMNS = ["leg_polyline", "cumulative_distance_m", "cumulative_duration_s"]
+
+class RoadGeometryService():
+    def __init__(self, osrm_service: OSRMService):
+        self.osrm_service = osrm_service
+
+    def annotate_stops(self, stops_df: pd.DataFrame, depot_location: Tuple[float, float]) -> Tuple[pd.DataFrame, Dict[int, dict]]:
+        """
+        Compute each vehicle's road geometry and cumulative distance/duration once, with one OSRM
+        request per vehicle through depot -> stops (in sequence order) -> depot.
+
+        Every stop gets the encoded polyline of the leg that arrives at it and the driving
+        distance/duration from the depot up to it. Vehicles OSRM cannot route keep NaN/None values.
+
+        Args:
+            stops_df (pd.DataFrame): Stops with vehicle_index, sequence, lat and lon.
+            depot_location (Tuple[float, float]): (latitude, longitude) of the depot.
+
+        Returns:
+            (pd.DataFrame, Dict[int, dict]): the stops with ROAD_LEG_COLUMNS added, and
+            vehicle_index -> {"total_distance_m", "total_duration_s"} including the return leg.
+        """
+        stops_df = stops_df.sort_values(["vehicle_index", "sequence"], kind="stable").reset_index(drop=True)
+        leg_polyline = np.full(len(stops_df), None, dtype=object)
+        cumulative_distance = np.full(len(stops_df), np.nan)
+        cumulative_duration = np.full(len(stops_df), np.nan)
+        route_totals = {}
+
+        for vehicle_index, positions in stops_df.groupby("vehicle_index", sort=True).indices.items():
+            stops = stops_df.iloc[positions]
+            waypoints = [depot_location, *zip(stops["lat"].astype(float), stops["lon"].astype(float)), depot_location]
+            legs = self.osrm_service.get_route_legs(waypoints)
+            if not legs or len(legs) != len(waypoints) - 1:
+                logger.warning(f"No road geometry for vehicle {vehicle_index}; its stops are stored without ETAs.")
+                continue
+
+            leg_polyline[positions] = [encode_polyline(leg["coordinates"]) for leg in legs[:-1]]
+            cumulative_distance[positions] = np.cumsum([leg["distance_m"] for leg in legs[:-1]])
+            cumulative_duration[positions] = np.cumsum([leg["duration_s"] for leg in legs[:-1]])
+            route_totals[int(vehicle_index)] = {
+                "total_distance_m": float(sum(leg["distance_m"] for leg in legs)),
+                "total_duration_s": float(sum(leg["duration_s"] for leg in legs)),
+            }
+
+        stops_df["leg_polyline"] = leg_polyline
+        stops_df["cumulative_distance_m"] = cumulative_distance.round(1)
+        stops_df["cumulative_duration_s"] = cumulative_duration.round(1)
+        logger.info(f"Computed road geometry for {len(route_totals)} vehicle(s).")
+        return stops_df, route_totals
@@ -1,11 +1,7 @@
-import os
-from typing import Tuple
-import folium
 import logging
 
-import pandas as pd
-
 from wulfs_routing_api.models.routes.route_model import RouteModel
+from wulfs_routing_api.utils.pagination import decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -30,58 +26,78 @@ class RouteService():
         created_map = { route["vehicle_index"]: route["id"] for route in response_data }
 
         return created_map
-    
-    def list_routes(self):
-        return self.model.select_all_routes()
-    
-    def save_routes_map(self,df: pd.DataFrame, outdir: str, route_date: str, depot_coords: Tuple[float, float], sequences: dict):
-        """Saves an HTML map of the routes. Note: The stops displayed are unsequenced; this map is for visualizing vehicle assignments, not optimized delivery order."""
-        m = folium.Map(location=[depot_coords[1], depot_coords[0]], zoom_start=10)
-        
-        # Add depot marker
-        folium.Marker(
-            location=[depot_coords[1], depot_coords[0]],
-            popup="Depot",
-            icon=folium.Icon(color="red", icon="info-sign"),
-        ).add_to(m)
-
-        colors = ["blue", "green", "purple", "orange", "darkred", "lightred", "beige", "darkblue", "darkgreen", "cadetblue", "darkpurple", "white", "pink", "lightblue", "lightgreen", "gray", "black", "lightgray"]
-
-        # If sequences are not provided, we can just show the stops for each vehicle
-        if not sequences:
-            for vehicle_index in df["vehicle_index"].unique():
-                vehicle_df = df[df["vehicle_index"] == vehicle_index]
-                color = colors[vehicle_index % len(colors)]
-                for _, row in vehicle_df.iterrows():
-                    folium.Marker(
-                        location=[row["lat"], row["lon"]],
-                        popup=f"<b>{row['customer_name']}</b><br>Vehicle: {vehicle_index + 1}",
-                        icon=folium.Icon(color=color, icon="truck", prefix="fa"),
-                    ).add_to(m)
+
+    def persist_routes_with_stops(self, stops_df, route_date_str, route_totals=None, chunk_size: int = 5000):
+        """
+        Persist the routes and stops of a job in one atomic bulk operation.
+        The payload is built column-wise from the DataFrame; only the new route ids come back.
+
+        Args:
+            stops_df (pd.DataFrame): Stops with vehicle_index, customer_id and the solver's `sequence`
+                (stops without one are numbered in DataFrame order), plus the optional road leg
+                columns from RoadGeometryService.
+            route_date_str (str): Route date.
+            route_totals (Dict[int, dict]): vehicle_index -> {"total_distance_m", "total_duration_s"}.
+
+        Returns:
+            Dict[int, int]: vehicle_index -> route_id
+        """
+        route_totals = route_totals or {}
+        vehicle_indices = sorted(int(v) for v in stops_df["vehicle_index"].unique())
+        routes = {
+            "vehicle_index": vehicle_indices,
+            "route_name": [f"Deliveries {route_date_str} - Vehicle {v + 1}" for v in vehicle_indices],
+            "total_distance_m": [route_totals.get(v, {}).get("total_distance_m") for v in vehicle_indices],
+            "total_duration_s": [route_totals.get(v, {}).get("total_duration_s") for v in vehicle_indices],
+        }
+
+        if "sequence" in stops_df.columns:
+            sequence = stops_df["sequence"]
         else:
-            for vehicle_index, seq in sequences.items():
-                color = colors[vehicle_index % len(colors)]
-                
-                route_points = [(depot_coords[1], depot_coords[0])]
-                for original_df_index in seq:
-                    if original_df_index != 0: # 0 is the depot
-                        row = df.loc[original_df_index]
-                        route_points.append((row["lat"], row["lon"])) 
-                route_points.append((depot_coords[1], depot_coords[0]))
-
-                folium.PolyLine(route_points, color=color, weight=2.5, opacity=1).add_to(m)
-
-                for original_df_index in seq:
-                    if original_df_index != 0: # 0 is the depot
-                        row = df.loc[original_df_index]
-                        folium.Marker(
-                            location=[row["lat"], row["lon"]],
-                            popup=f"<b>{row['customer_name']}</b>",
-                            icon=folium.Icon(color=color, icon="truck", prefix="fa"),
-                        ).add_to(m)
-                        
-        os.makedirs(outdir, exist_ok=True)
-        map_path = os.path.join(outdir, f"routes_map_{route_date}.html")
-        m.save(map_path)
-        print(f"🗺️  Saved routes map to {map_path}")
-        return map_path
+            sequence = stops_df.groupby("vehicle_index").cumcount() + 1
+        notes = stops_df["notes"].fillna("").astype(str).tolist() if "notes" in stops_df.columns else [""] * len(stops_df)
+        stops = {
+            "vehicle_index": stops_df["vehicle_index"].astype(int).tolist(),
+            "customer_id": stops_df["customer_id"].astype(int).tolist(),
+            "sequence": sequence.astype(int).tolist(),
+            "notes": notes,
+        }
+        for column in ("leg_polyline", "cumulative_distance_m", "cumulative_duration_s"):
+            values = stops_df[column] if column in stops_df.columns else [None] * len(stops_df)
+            # NaN is not valid JSON; missing legs are stored as NULL
+            stops[column] = [None if value is None or value != value else value for value in values]
+
+        return self.model.create_with_stops(route_date_str, routes, stops, chunk_size)
+    
+    def list_routes(self, start_date=None, end_date=None, limit: int = 50, cursor: str | None = None):
+        """
+        Return one page of the route history, newest first.
+
+        Returns:
+            dict: {"routes": [...], "next_cursor": str | None}
+        """
+        after = decode_cursor(cursor) if cursor else None
+        # Fetch one extra row to know whether there is a next page
+        rows = self.model.select_routes_page(start_date, end_date, limit + 1, after)
+        return self._to_page(rows, limit)
+
+    async def alist_routes(self, start_date=None, end_date=None, limit: int = 50, cursor: str | None = None):
+        """Async `list_routes` for the API."""
+        after = decode_cursor(cursor) if cursor else None
+        rows = await self.model.aselect_routes_page(start_date, end_date, limit + 1, after)
+        return self._to_page(rows, limit)
+
+    @staticmethod
+    def _to_page(rows, limit):
+        routes = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = routes[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return {"routes": routes, "next_cursor": next_cursor}
+
+    def route_ids_for_date(self, route_date):
+        return self.model.select_route_ids_for_date(route_date)
+
+    async def aroute_ids_for_date(self, route_date):
+        return await self.model.aselect_route_ids_for_date(route_date)
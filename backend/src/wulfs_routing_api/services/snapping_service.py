@@ -0,0 +1,94 @@
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from wulfs_routing_api.models.customers.customer_model import CustomerModel
+from wulfs_routing_api.services.osrm_service import OSRMService
+
+logger = logging.getLogger(__name__)
+
+SNAP_COLUMNS = ["snap_lat", "snap_lon", "snap_distance_m", "osrm_hint", "osrm_dataset"]
+# A stored snap whose distance to the customer's coordinates differs by more than this was taken
+# for other coordinates: the customer moved
+MOVED_TOLERANCE_M = 1.0
+
+def _haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000.0 * np.arcsin(np.sqrt(np.minimum(1.0, h)))
+
+
+class SnappingService():
+    def __init__(self, model: CustomerModel, osrm_service: OSRMService, probe: Tuple[float, float]):
+        """
+        Keeps every customer's OSRM /nearest snap (location and hint) in the customers table.
+
+        Args:
+            model (CustomerModel): Customer persistence model.
+            osrm_service (OSRMService): OSRM client used for /nearest.
+            probe (tuple): (lat, lon) snapped to identify the OSRM dataset, e.g. the depot.
+        """
+        self.model = model
+        self.osrm_service = osrm_service
+        self.probe = probe
+
+    @staticmethod
+    def hints_for(customer_df: pd.DataFrame) -> Dict[Tuple[float, float], str]:
+        """(lat, lon) -> stored hint of every snapped customer, for OSRMService.set_hints."""
+        if "osrm_hint" not in customer_df:
+            return {}
+        snapped = customer_df.dropna(subset=["lat", "lon", "osrm_hint"])
+        return dict(zip(zip(snapped["lat"], snapped["lon"]), snapped["osrm_hint"]))
+
+    def dataset_id(self) -> Optional[str]:
+        """
+        Identifier of the OSRM dataset being served: its data_version when osrm-extract set one,
+        else a digest of the probe's hint (hints embed the dataset's checksum). None if OSRM is down.
+        """
+        nearest = self.osrm_service.get_nearest(self.probe)
+        if nearest is None:
+            return None
+        if nearest["data_version"]:
+            return f"version:{nearest['data_version']}"
+        return f"hint:{hashlib.blake2b(nearest['hint'].encode('utf-8'), digest_size=8).hexdigest()}"
+
+    @staticmethod
+    def stale_customers(customer_df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+        """Located customers never snapped, snapped on another dataset, or moved since."""
+        located = customer_df.dropna(subset=["lat", "lon"]).reindex(columns=list(customer_df.columns) + [
+            c for c in SNAP_COLUMNS if c not in customer_df])
+        moved = ~np.isclose(_haversine_m(located["lat"], located["lon"], located["snap_lat"], located["snap_lon"]),
+                            located["snap_distance_m"].astype(float), atol=MOVED_TOLERANCE_M)
+        stale = located["osrm_hint"].isna() | (located["osrm_dataset"] != dataset) | moved
+        return located[stale]
+
+    def refresh(self, force: bool = False) -> dict:
+        """
+        Snap the customers whose hint is missing or stale (all of them with `force`) and store the results.
+
+        Returns:
+            dict: dataset, number of customers checked, snapped and failed.
+        """
+        dataset = self.dataset_id()
+        if dataset is None:
+            raise RuntimeError("OSRM /nearest failed; snapping hints not refreshed.")
+        customer_df = self.model.get_all_customers()
+        stale = customer_df.dropna(subset=["lat", "lon"]) if force else self.stale_customers(customer_df, dataset)
+
+        snaps, failed = [], 0
+        for customer_id, lat, lon in zip(stale["customer_id"], stale["lat"], stale["lon"]):
+            nearest = self.osrm_service.get_nearest((lat, lon))
+            if nearest is None:
+                failed += 1
+                continue
+            snaps.append({"customer_id": customer_id, "snap_lat": nearest["lat"], "snap_lon": nearest["lon"],
+                          "snap_distance_m": nearest["distance_m"], "osrm_hint": nearest["hint"]})
+        if snaps:
+            self.model.update_snapping(pd.DataFrame(snaps), dataset)
+
+        summary = {"dataset": dataset, "customers": len(customer_df), "snapped": len(snaps), "failed": failed}
+        logger.info(f"Snapping hints refreshed: {summary}")
+        return summary
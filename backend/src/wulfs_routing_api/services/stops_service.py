@@ -1,11 +1,10 @@
 import os
 from typing import Tuple
-import folium
 import logging
 
-import pandas as pd
 
 from wulfs_routing_api.models.stops.stop_model import StopModel
+from wulfs_routing_api.utils.polyline import decode_polyline
 
 logger = logging.getLogger(__name__)
 
@@ -24,16 +23,92 @@ class StopService():
             if not route_id:
                 continue  # Skip if no matching route (shouldn’t happen)
 
-            stops_to_insert.append({
+            # The solver's visiting order when present; row order only for unsequenced frames
+            sequence = row["sequence"] if "sequence" in stops_df.columns else stop_sequences[vehicle_idx]
+            stop = {
                 "route_id": int(route_id),
                 "customer_id": int(row.get("customer_id")),
-                "sequence": int(stop_sequences[vehicle_idx]),
+                "sequence": int(sequence),
                 "notes": row.get("notes",""),
-            })
+            }
+            for column in ("leg_polyline", "cumulative_distance_m", "cumulative_duration_s"):
+                value = row[column] if column in stops_df.columns else None
+                if value is not None and value == value:  # skip NaN
+                    stop[column] = value
+            stops_to_insert.append(stop)
 
         # Bulk insert all stops at once
         if stops_to_insert:
             self.model.create(stops_to_insert)
 
     def get_stops_for_route(self, route_id):
-            return self.model.get_stops_for_route(route_id)
\ No newline at end of file
+            return self.model.get_stops_for_route(route_id)
+
+    async def aget_stops_for_route(self, route_id):
+        return await self.model.aget_stops_for_route(route_id)
+
+    def get_stops_for_routes(self, route_ids):
+        """
+        Fetch the stops of many routes at once.
+
+        Returns:
+            List[dict]: [{"route_id": ..., "stops": [...]}, ...] in the order of `route_ids`
+        """
+        route_ids = [int(route_id) for route_id in route_ids]
+        return self._group_by_route(route_ids, self.model.get_stops_for_routes(route_ids))
+
+    async def aget_stops_for_routes(self, route_ids, with_geometry: bool = False):
+        """Async `get_stops_for_routes` for the API."""
+        route_ids = [int(route_id) for route_id in route_ids]
+        return self._group_by_route(route_ids, await self.model.aget_stops_for_routes(route_ids, with_geometry))
+
+    @staticmethod
+    def _group_by_route(route_ids, stops):
+        grouped = {route_id: [] for route_id in route_ids}
+        for stop in stops:
+            grouped[stop["route_id"]].append(stop)
+        return [{"route_id": route_id, "stops": route_stops} for route_id, route_stops in grouped.items()]
+
+    async def aget_route_geometry(self, route_ids):
+        """GeoJSON FeatureCollection of the given routes, built from their persisted stops."""
+        return self.build_route_geometry(await self.aget_stops_for_routes(route_ids, with_geometry=True))
+
+    @staticmethod
+    def build_route_geometry(route_groups, precision: int = 5):
+        """
+        Build a compact GeoJSON FeatureCollection from stops grouped by route: one LineString per
+        route and one Point per stop. Routes whose stops carry stored road legs (`leg_polyline`)
+        follow the roads from the depot; older routes fall back to straight segments between stops.
+        Coordinates are rounded to `precision` decimals (5 ~ 1 m). `route_index` gives each route
+        a stable color slot.
+        """
+        features = []
+        for route_index, group in enumerate(route_groups):
+            stops = [stop for stop in group["stops"] if (stop.get("customers") or {}).get("lat") is not None]
+            coordinates = [
+                [round(stop["customers"]["lon"], precision), round(stop["customers"]["lat"], precision)]
+                for stop in stops
+            ]
+            if stops and all(stop.get("leg_polyline") for stop in stops):
+                line = []
+                for stop in stops:
+                    # Consecutive legs share their joining point
+                    leg = [[round(lon, precision), round(lat, precision)] for lat, lon in decode_polyline(stop["leg_polyline"])]
+                    line.extend(leg[1:] if line else leg)
+            else:
+                line = coordinates
+            if len(line) >= 2:
+                features.append({
+                    "type": "Feature",
+                    "geometry": {"type": "LineString", "coordinates": line},
+                    "properties": {"kind": "route", "route_id": group["route_id"], "route_index": route_index,
+                                   "stop_count": len(stops)},
+                })
+            for stop, point in zip(stops, coordinates):
+                features.append({
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": point},
+                    "properties": {"kind": "stop", "route_id": group["route_id"], "route_index": route_index,
+                                   "sequence": stop["sequence"], "name": stop["customers"].get("name")},
+                })
+        return {"type": "FeatureCollection", "features": features}
@@ -1,4 +1,5 @@
 import math
+import time
 from typing import Dict, List, Tuple
 import numpy as np
 from ortools.constraint_solver import routing_enums_pb2
@@ -11,8 +12,15 @@ import pandas as pd
 logger = logging.getLogger(__name__)
 
 class VRPService():
-    def __init__(self):
+    def __init__(self, time_limit_seconds: float = 10):
+        """
+        Args:
+            time_limit_seconds (float): OR-Tools search time limit.
+        """
         self.osrm_service = OSRMService()
+        self.time_limit_seconds = time_limit_seconds
+        # Search statistics of the last OR-Tools solve (for logging and benchmarks)
+        self.last_solve_stats: Dict[str, object] = {}
 
     def _split_sweep(self,df: pd.DataFrame, k: int, depot: Tuple[float,float]) -> np.ndarray:
         dlat, dlon = depot
@@ -225,10 +233,23 @@ class VRPService():
         return transit_callback_index
 
 
+    @staticmethod
+    def sequence_stops(stops_df: pd.DataFrame, vehicle_routes: Dict[int, List[int]]) -> pd.DataFrame:
+        """
+        Number the stops 1..n within each vehicle in the solver's visiting order and sort them by
+        (vehicle_index, sequence). `vehicle_routes` holds positional stop indices per vehicle.
+        """
+        sequence = np.zeros(len(stops_df), dtype=int)
+        for stop_indices in vehicle_routes.values():
+            sequence[stop_indices] = np.arange(1, len(stop_indices) + 1)
+        stops_df = stops_df.copy()
+        stops_df["sequence"] = sequence
+        return stops_df.sort_values(["vehicle_index", "sequence"], kind="stable").reset_index(drop=True)
+
     def solve_vrp(self, split_mode, stops_table: pd.DataFrame, num_vehicles: int,
-                                depot_location: Tuple[float, float]) -> Tuple[np.ndarray, Dict[int, List[int]]]:
+                                depot_location: Tuple[float, float], distance_matrix: List[List[float]] = None) -> Tuple[np.ndarray, Dict[int, List[int]]]:
         if split_mode=="OR-Tool":
-            return self.solve_vrp_or_tools(stops_table, num_vehicles, depot_location)
+            return self.solve_vrp_or_tools(stops_table, num_vehicles, depot_location, distance_matrix)
         elif split_mode=="Sweep":
             labels = self._split_sweep(stops_table, num_vehicles, depot_location)
             vehicle_routes = self.build_vehicle_routes_from_labels(labels, stops_table, num_vehicles, depot_location)
@@ -241,10 +262,14 @@ class VRPService():
     # Solve VRP with OR-Tools
     # ---------------------------------------------------------------------
     def solve_vrp_or_tools(self, stops_table: pd.DataFrame, num_vehicles: int,
-                                depot_location: Tuple[float, float]) -> Tuple[np.ndarray, Dict[int, List[int]]]:
-        """Solve multi-vehicle VRP with distance and capacity constraints, fallback to sweep+greedy."""
+                                depot_location: Tuple[float, float], distance_matrix: List[List[float]] = None) -> Tuple[np.ndarray, Dict[int, List[int]]]:
+        """
+        Solve multi-vehicle VRP with distance and capacity constraints, fallback to sweep+greedy.
+        A precomputed `distance_matrix` (depot first, in km) skips the OSRM queries.
+        """
         num_stops = len(stops_table)
-        distance_matrix = self.build_distance_matrix(stops_table, depot_location)
+        if distance_matrix is None:
+            distance_matrix = self.build_distance_matrix(stops_table, depot_location)
 
         # Manager and routing model
         manager = pywrapcp.RoutingIndexManager(len(distance_matrix), num_vehicles, 0)
@@ -267,11 +292,24 @@ class VRPService():
         search_params = pywrapcp.DefaultRoutingSearchParameters()
         search_params.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
         search_params.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-        search_params.time_limit.seconds = 10
+        search_params.time_limit.FromMilliseconds(int(self.time_limit_seconds * 1000))
+
+        # Record when the first and last improving solutions are found
+        stats = {"first_solution_seconds": None, "last_solution_seconds": None, "solutions": 0, "fallback": False}
+        search_start = time.perf_counter()
+        def on_solution():
+            elapsed = time.perf_counter() - search_start
+            stats["solutions"] += 1
+            stats["last_solution_seconds"] = elapsed
+            if stats["first_solution_seconds"] is None:
+                stats["first_solution_seconds"] = elapsed
+        routing.AddAtSolutionCallback(on_solution)
+        self.last_solve_stats = stats
 
         # Solve
         print("🧩 Solving VRP with OR-Tools...")
         solution = routing.SolveWithParameters(search_params)
+        logger.info(f"OR-Tools search stats: {stats}")
 
         # Extract solution
         if solution:
@@ -293,6 +331,7 @@ class VRPService():
 
         # Fallback
         print("⚠️ OR-Tools failed — using sweep + greedy fallback...")
+        stats["fallback"] = True
         labels = self._split_sweep(stops_table, num_vehicles, depot_location)
         vehicle_routes = self.build_vehicle_routes_from_labels(labels, stops_table, num_vehicles, depot_location)
         return labels, vehicle_routes
@@ -4,80 +4,90 @@ import pandas as pd
 import base64
 import re
 import time
+import requests
 
 import logging
 
 from wulfs_routing_api.services.customer_service import CustomerService
-from wulfs_routing_api.models.customers.supabase_customer import SupabaseCustomer
 from wulfs_routing_api.services.order_services import OrderService
-from wulfs_routing_api.models.orders.supabase_order import SupabaseOrder
 from wulfs_routing_api.services.route_service import RouteService
-from wulfs_routing_api.models.routes.supabase_route import SupabaseRoute
-from wulfs_routing_api.services.stops_service import StopService
-from wulfs_routing_api.models.stops.supabase_stop import SupabaseStop
 from wulfs_routing_api.services.vrp_service import VRPService
+from wulfs_routing_api.services.road_geometry_service import RoadGeometryService
+from wulfs_routing_api.services.osrm_service import OSRMService
+from wulfs_routing_api.services.snapping_service import SnappingService
 
 from wulfs_routing_api.utils.data_io_utils import load_base64_to_df
 from wulfs_routing_api.celery_app import celery_app
-from wulfs_routing_api.models.supabase_db import supabase
+from wulfs_routing_api.tasks.progress import report_progress
+from wulfs_routing_api.models.storage import customer_model, order_model, route_model, storage_available
+from wulfs_routing_api.tasks.signatures import GENERATE_ROUTING_TASK, PRECOMPUTE_TASK
+from wulfs_routing_api.tasks.precompute import DEPOT, build_snapshot, get_snapshot
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(bind=True)
-def generate_routing_task(self, orders_file_content_b64: str, num_vehicles: int, split_mode: str, route_date_str: str, hq_lat: float, hq_lon: float):
+@celery_app.task(bind=True, name=GENERATE_ROUTING_TASK)
+def generate_routing_task(self, orders_file_content_b64: str, num_vehicles: int, split_mode: str, route_date_str: str, hq_lat: float, hq_lon: float, profile: str = ""):
     """
-    Celery task to perform route generation and save results to Supabase.
+    Celery task to perform route generation and save results to the configured storage (Supabase by default).
+    `profile` ("sample", "cprofile" or "memory") is read by the profiling hooks in tasks/profiling.py.
     """
-    if not supabase:
+    if not storage_available():
         raise ConnectionError("Supabase client not initialized. Check .env file.")
 
-    self.update_state(state='PROGRESS', meta={'status': 'Starting...'}) 
-    time.sleep(3)
+    report_progress(self, status='RUNNING', stage='start', message='Starting...')
 
     try:
-        customer_service = CustomerService(SupabaseCustomer())
-        order_service = OrderService(SupabaseOrder())
-        route_service = RouteService(SupabaseRoute())
-        stop_service = StopService(SupabaseStop())
-        vrp_service = VRPService()
+        customer_service = CustomerService(customer_model())
+        order_service = OrderService(order_model())
+        route_service = RouteService(route_model())
+        vrp_service = VRPService(time_limit_seconds=float(os.getenv("VRP_TIME_LIMIT_SECONDS", "10")))
+        road_geometry_service = RoadGeometryService(vrp_service.osrm_service)
 
         # 1. Load uploaded orders file
         orders_df = load_base64_to_df(orders_file_content_b64)
-        orders_df.to_csv("test.csv",index=False)
         logger.error("Can you see this error from celery")
         logger.debug("Can you see this debug from celery")
 
-        # 2. Load master customer data from Supabase
-        self.update_state(state='PROGRESS', meta={'status':'RUNNING','message': 'Fetching customer data from database...'})
-        customer_df = customer_service.load_customer_master_data()
+        # 2. Load master customer data: the nightly snapshot when there is one, else from storage
+        report_progress(self, status='RUNNING', stage='load_customers', message='Fetching customer data from database...', order_count=len(orders_df))
+        snapshot = get_snapshot()
+        customer_df = snapshot.customers if snapshot is not None else customer_service.load_customer_master_data()
 
         # 3. Merge data
-        self.update_state(state='PROGRESS', meta={'status':'RUNNING','message': 'Merging order data with customer data...'}) 
-        stops_df, missing_orders = order_service.customer_details_for_orders(orders_df, customer_df)
-
-        # 4. Assign routes using OR-Tools VRP solver
-        self.update_state(state='PROGRESS', meta={'status':'RUNNING','message': 'Calculating routes with OR-Tools...'}) 
-        labels, routes = vrp_service.solve_vrp(split_mode, stops_df, num_vehicles, (hq_lon, hq_lat))
+        report_progress(self, status='RUNNING', stage='merge', message='Merging order data with customer data...')
+        stops_df, missing_orders = order_service.customer_details_for_orders(orders_df.copy(), customer_df)
+        if snapshot is not None and len(missing_orders):
+            # Customers added since the snapshot was taken: match against storage before reporting orders missing
+            customer_df = customer_service.load_customer_master_data()
+            stops_df, missing_orders = order_service.customer_details_for_orders(orders_df, customer_df)
+
+        # OSRM requests through customer locations skip snapping with the stored hints
+        vrp_service.osrm_service.set_hints(SnappingService.hints_for(customer_df))
+
+        # 4. Assign routes using OR-Tools VRP solver (distances from the snapshot when it covers every stop)
+        report_progress(self, status='RUNNING', stage='solve', message='Calculating routes with OR-Tools...',
+                        matched_orders=len(stops_df), missing_orders=len(missing_orders))
+        distance_matrix = snapshot.matrix_for_stops(stops_df, (hq_lat, hq_lon)) if snapshot is not None and split_mode == "OR-Tool" else None
+        labels, routes = vrp_service.solve_vrp(split_mode, stops_df, num_vehicles, (hq_lat, hq_lon), distance_matrix)
         stops_df["vehicle_index"] = labels
+        stops_df = vrp_service.sequence_stops(stops_df, routes)
 
-        # 5. Save results to Supabase
-        self.update_state(state='PROGRESS', meta={'status':'RUNNING','message': 'Saving results to database...'}) 
-        route_id_map = route_service.persist_routes(stops_df, route_date_str)
-        stop_service.persist_stops(stops_df, route_id_map)
-        created_route_ids = list(route_id_map.values())
+        # 5. Road geometry and per-stop ETAs, computed once and stored with the stops
+        report_progress(self, status='RUNNING', stage='road_geometry', message='Computing road geometry and arrival times...')
+        stops_df, route_totals = road_geometry_service.annotate_stops(stops_df, (hq_lat, hq_lon))
 
-        # Save a map for the UI to display
-        temp_map_dir = os.path.join(os.getcwd(), "routes_out_temp_map")
-        os.makedirs(temp_map_dir, exist_ok=True)
-        route_service.save_routes_map(stops_df, temp_map_dir, route_date_str, (hq_lon, hq_lat), routes)
-        map_path = os.path.join(temp_map_dir, f"routes_map_{route_date_str}.html")
+        # 6. Save results to storage
+        report_progress(self, status='RUNNING', stage='save', message='Saving results to database...',
+                        stops_per_vehicle={int(v): len(seq) for v, seq in routes.items()})
+        route_id_map = route_service.persist_routes_with_stops(stops_df, route_date_str, route_totals)
+        created_route_ids = list(route_id_map.values())
 
+        # The UI draws the map from GET /routes/geometry; no HTML is rendered on the worker
         return {
             "status": "SUCCESS",
             "route_ids": created_route_ids,
             "missing_orders_json": missing_orders.to_json(orient='split'),
-            "map_path": map_path
         }
 
     except Exception as e:
@@ -88,4 +98,18 @@ def generate_routing_task(self, orders_file_content_b64: str, num_vehicles: int,
         return {
             "status": "FAILURE",
             "error_message": f"{e}\n{tb_str}"
-        }
\ No newline at end of file
+        }
+
+
+@celery_app.task(name=PRECOMPUTE_TASK)
+def precompute_snapshot_task():
+    """
+    Nightly refresh of the customers' OSRM snapping hints, then of the customer master and the depot +
+    customer distance/duration matrix shared by all workers (tasks/precompute.py). Scheduled by
+    Celery beat; can also be sent by hand.
+    """
+    if not storage_available():
+        raise ConnectionError("Supabase client not initialized. Check .env file.")
+    snapping = SnappingService(customer_model(), OSRMService(session=requests.Session()), DEPOT).refresh()
+    snapshot = build_snapshot()
+    return {"snapping": snapping, "snapshot": {k: v for k, v in snapshot.items() if k != "customer_ids"}}
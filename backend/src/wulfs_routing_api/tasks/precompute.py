@@ -0,0 +1,212 @@
+import datetime as dt
+import io
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import redis
+from celery.concurrency import get_implementation
+from celery.signals import worker_init, worker_process_init
+
+from wulfs_routing_api.constants import REDIS_URL
+from wulfs_routing_api.models.storage import customer_model, order_model
+from wulfs_routing_api.services.customer_service import CustomerService
+from wulfs_routing_api.services.order_services import OrderService
+from wulfs_routing_api.services.osrm_service import OSRMService
+from wulfs_routing_api.services.snapping_service import SnappingService
+
+logger = logging.getLogger(__name__)
+
+# Nightly precompute (Celery beat, see celery_app.beat_schedule). Refreshes the customers' OSRM
+# snapping hints (services/snapping_service.py), then builds a snapshot of the customer
+# master and of the OSRM distance/duration matrix over the depot and every located customer, stored
+# in Redis so every worker, on any host, shares it. Route generation then slices its matrix from the
+# snapshot instead of querying OSRM per pair, and reads customers without a database round trip.
+# Worker processes load the snapshot when they start, and again as soon as a new one is published
+# (announced on SNAPSHOT_CHANNEL), so the first job after the nightly rebuild does not pay for it.
+DEPOT = (float(os.getenv("DEPOT_LAT", "42.34902")), float(os.getenv("DEPOT_LON", "-71.03118")))
+PRECOMPUTE_MAX_TABLE_SIZE = int(os.getenv("PRECOMPUTE_MAX_TABLE_SIZE", "100"))
+# Kept across one missed night: distances only depend on coordinates, which are checked on use
+SNAPSHOT_TTL_SECONDS = int(os.getenv("PRECOMPUTE_TTL_HOURS", "48")) * 3600
+SNAPSHOT_PARTS = ("meta", "customers", "distances", "durations")
+SNAPSHOT_CHANNEL = "precompute:published"
+SNAPSHOT_LISTEN_RETRY_SECONDS = 30
+
+def snapshot_key(part: str) -> str:
+    return f"precompute:{part}"
+
+def _haversine_miles(points: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(points[:, 0]), np.radians(points[:, 1])
+    h = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+         + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+    return 3958.8 * 2 * np.arcsin(np.sqrt(np.minimum(1.0, h)))
+
+def _to_bytes(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+def _from_bytes(data: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+@dataclass
+class Snapshot:
+    version: str
+    depot: tuple
+    customers: pd.DataFrame
+    # Row/column 0 is the depot, row i + 1 the i-th located customer; miles and seconds
+    points: np.ndarray
+    distances: np.ndarray
+    durations: np.ndarray
+    index: dict
+
+    def matrix_for_stops(self, stops_df: pd.DataFrame, depot_location: tuple) -> list | None:
+        """
+        The distance matrix (miles, depot first) of a job's stops, or None when the snapshot does not
+        cover them: another depot, or a customer that is new or moved since the snapshot.
+        """
+        if not np.allclose(self.depot, depot_location, atol=1e-6) or "customer_id" not in stops_df:
+            return None
+        rows = stops_df["customer_id"].map(self.index)
+        if rows.isna().any():
+            return None
+        rows = rows.to_numpy(dtype=int)
+        if not np.allclose(self.points[rows], stops_df[["lat", "lon"]].to_numpy(dtype=float), atol=1e-6):
+            return None
+        index = np.concatenate(([0], rows))
+        return self.distances[np.ix_(index, index)].tolist()
+
+
+_redis: redis.Redis | None = None
+_snapshot: Snapshot | None = None
+
+def _get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(REDIS_URL)
+    return _redis
+
+def build_snapshot(depot: tuple = DEPOT, max_table_size: int = PRECOMPUTE_MAX_TABLE_SIZE) -> dict:
+    """
+    Fetch the customer master and the OSRM matrix over depot + located customers and publish them.
+    Pairs OSRM cannot route fall back to great-circle miles. Raises RuntimeError if OSRM is unavailable,
+    leaving the previous snapshot in place.
+
+    Returns:
+        dict: the snapshot's metadata.
+    """
+    customer_df = CustomerService(customer_model()).load_customer_master_data()
+    located = customer_df.dropna(subset=["lat", "lon"])
+    points = np.array([depot] + list(zip(located["lat"], located["lon"])), dtype=float)
+
+    osrm_service = OSRMService()
+    osrm_service.set_hints(SnappingService.hints_for(located))
+    table = osrm_service.get_table([tuple(p) for p in points], max_table_size)
+    if table is None:
+        raise RuntimeError("OSRM /table failed; keeping the previous precomputed snapshot.")
+    distances = np.array(table[0], dtype=float)
+    distances = np.where(np.isnan(distances), _haversine_miles(points), distances)
+    durations = np.array(table[1], dtype=float)
+
+    meta = {
+        "version": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "depot": list(depot),
+        "customer_ids": [int(c) for c in located["customer_id"]],
+        "customers": len(customer_df),
+        "points": len(points),
+        "unroutable_pairs": int(np.isnan(durations).sum()),
+    }
+    customers = io.BytesIO()
+    customer_df.to_parquet(customers, index=False)
+    parts = {"meta": json.dumps(meta).encode("utf-8"), "customers": customers.getvalue(),
+             "distances": _to_bytes(distances), "durations": _to_bytes(durations)}
+    pipe = _get_redis().pipeline(transaction=True)
+    for part, data in parts.items():
+        pipe.set(snapshot_key(part), data, ex=SNAPSHOT_TTL_SECONDS)
+    pipe.publish(SNAPSHOT_CHANNEL, meta["version"])
+    pipe.execute()
+    logger.info(f"Published precomputed snapshot {meta['version']}: {meta['points']} points, "
+                f"{sum(len(v) for v in parts.values()) / 2**20:.1f} MB")
+    return meta
+
+def get_snapshot() -> Snapshot | None:
+    """
+    This process's copy of the latest snapshot, reloaded when a newer one is published.
+    None when there is none (or Redis is unavailable): callers fall back to live queries.
+    """
+    global _snapshot
+    try:
+        meta = _get_redis().get(snapshot_key("meta"))
+        if meta is None:
+            return None
+        meta = json.loads(meta)
+        if _snapshot is not None and _snapshot.version == meta["version"]:
+            return _snapshot
+        customers, distances, durations = _get_redis().mget([snapshot_key(p) for p in SNAPSHOT_PARTS[1:]])
+        if customers is None or distances is None or durations is None:
+            return None
+        customer_ids = meta["customer_ids"]
+        customer_df = pd.read_parquet(io.BytesIO(customers))
+        located = customer_df.set_index("customer_id").loc[customer_ids]
+        _snapshot = Snapshot(
+            version=meta["version"],
+            depot=tuple(meta["depot"]),
+            customers=customer_df,
+            points=np.vstack([meta["depot"], located[["lat", "lon"]].to_numpy(dtype=float)]),
+            distances=_from_bytes(distances),
+            durations=_from_bytes(durations),
+            index={c: i + 1 for i, c in enumerate(customer_ids)},
+        )
+        logger.info(f"Loaded precomputed snapshot {_snapshot.version} ({len(customer_ids)} customers)")
+        return _snapshot
+    except (redis.RedisError, KeyError, ValueError) as e:
+        logger.warning(f"Precomputed snapshot unavailable, using live queries: {e}")
+        return None
+
+def warm_caches() -> bool:
+    """Load the snapshot and build the customer name index of this process, so its first job pays for neither."""
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return False
+    OrderService(order_model())._get_name_index(snapshot.customers)
+    return True
+
+def _listen_for_snapshots():
+    """Warm this process's caches whenever a snapshot is published, for as long as the process runs."""
+    while True:
+        try:
+            pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(SNAPSHOT_CHANNEL)
+            # Catch up on a snapshot published before subscribing (e.g. while forking or reconnecting)
+            warm_caches()
+            for _ in pubsub.listen():
+                warm_caches()
+        except redis.RedisError as e:
+            logger.warning(f"Precomputed snapshot listener disconnected, retrying: {e}")
+            time.sleep(SNAPSHOT_LISTEN_RETRY_SECONDS)
+
+def _start_snapshot_listener():
+    threading.Thread(target=_listen_for_snapshots, name="precompute-listener", daemon=True).start()
+
+@worker_init.connect
+def _warm_worker(sender=None, **extra):
+    # Runs in the worker's main process before the pool starts: prefork children inherit the
+    # warm caches, thread and solo pools use them directly
+    if warm_caches():
+        logger.info("Worker caches warmed from the precomputed snapshot.")
+    # Prefork children listen themselves (see _warm_pool_process); the main process does not fork
+    # with a listener thread running
+    if sender is None or not get_implementation(sender.pool_cls).__module__.endswith(".prefork"):
+        _start_snapshot_listener()
+
+@worker_process_init.connect
+def _warm_pool_process(**extra):
+    # A prefork child (also one replacing a recycled child) starts with the main process's snapshot,
+    # which may predate the last rebuild: its listener catches up before taking jobs' time
+    _start_snapshot_listener()
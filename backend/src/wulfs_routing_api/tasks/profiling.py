@@ -0,0 +1,256 @@
+import cProfile
+import json
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+import redis
+from celery.signals import task_postrun, task_prerun
+
+from wulfs_routing_api.constants import REDIS_URL
+from wulfs_routing_api.tasks.signatures import GENERATE_ROUTING_TASK
+
+logger = logging.getLogger(__name__)
+
+# Opt-in profiling of route generation jobs: per request (the `profile` task argument) or for every
+# job with PROFILE_JOBS=sample|cprofile|memory. Every mode samples the task thread's stack into a
+# flame-graph file and times the progress stages; "cprofile" also runs the deterministic profiler
+# and "memory" records tracemalloc peaks per stage. Both add overhead that inflates the stage times,
+# so "sample" is the one to compare durations with. Artifacts are kept in Redis next to the job result.
+PROFILE_MODES = ("sample", "cprofile", "memory")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# name -> (media type, download file name)
+PROFILE_ARTIFACTS = {
+    "summary": ("application/json", "profile-summary.json"),
+    "folded": ("text/plain; charset=utf-8", "profile.folded"),
+    "pstats": ("application/octet-stream", "profile.pstats"),
+}
+TOP_FUNCTIONS = 25
+
+def profile_key(job_id: str, artifact: str) -> str:
+    return f"job-profile:{job_id}:{artifact}"
+
+def profile_mode(requested: str | None = None) -> str | None:
+    """The profiling mode of a job: the request's, else PROFILE_JOBS. Truthy values mean "sample"."""
+    mode = (requested or os.getenv("PROFILE_JOBS", "")).strip().lower()
+    if mode in ("", "0", "false", "no", "off"):
+        return None
+    return mode if mode in PROFILE_MODES else "sample"
+
+
+# tracemalloc is process-wide: it runs while any job of this process profiles memory, and a stage
+# peak is only reset (and attributed to one job) while that job is the only one. The epoch counts
+# acquisitions, so a stage can tell whether another job started measuring while it ran.
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_epoch = 0
+_owns_tracemalloc = False
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_epoch, _owns_tracemalloc
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracemalloc = True
+        _tracemalloc_users += 1
+        _tracemalloc_epoch += 1
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _owns_tracemalloc
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _owns_tracemalloc:
+            tracemalloc.stop()
+            _owns_tracemalloc = False
+
+def _reset_peak_if_alone() -> tuple[bool, int]:
+    """
+    Reset the tracemalloc peak unless other jobs are measuring it.
+
+    Returns:
+        (shared, epoch): whether the peak is shared with other jobs, and the current epoch.
+    """
+    with _tracemalloc_lock:
+        if _tracemalloc_users > 1:
+            return True, _tracemalloc_epoch
+        tracemalloc.reset_peak()
+        return False, _tracemalloc_epoch
+
+
+class _StackSampler(threading.Thread):
+    """
+    Samples one thread's Python stack every `interval` seconds into folded stacks ("a;b;c weight").
+    Samples are weighted by the milliseconds since the previous one, so time spent holding the GIL
+    in native code (e.g. the OR-Tools search) is still attributed to the calling frame.
+    """
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name=f"profile-sampler-{thread_id}", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stage = "start"
+        self.weights = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(f"stage:{self.stage}")
+            self.weights[";".join(reversed(stack))] += (now - last) * 1000
+            last = now
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class JobProfiler():
+    def __init__(self, job_id: str, mode: str, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.job_id = job_id
+        self.mode = mode
+        self.sampler = _StackSampler(threading.get_ident(), interval_ms / 1000)
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self.memory = mode == "memory"
+        self.stages = []
+        self._memory_shared, self._memory_epoch = False, 0
+
+    def start(self):
+        """Start profiling the calling thread."""
+        if self.memory:
+            _acquire_tracemalloc()
+            self._memory_shared, self._memory_epoch = _reset_peak_if_alone()
+        self._stage, self._stage_start = "start", time.perf_counter()
+        self._job_start = self._stage_start
+        self.sampler.start()
+        if self.profile:
+            self.profile.enable()
+
+    def _close_stage(self):
+        stage = {"stage": self._stage, "seconds": round(time.perf_counter() - self._stage_start, 4)}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            stage.update(peak_mb=round(peak / 2**20, 2), end_mb=round(current / 2**20, 2))
+            # Another job measuring during the stage may have reset the peak or added to it
+            stage["memory_shared"] = self._memory_shared or _tracemalloc_users > 1 or _tracemalloc_epoch != self._memory_epoch
+            self._memory_shared, self._memory_epoch = _reset_peak_if_alone()
+        self.stages.append(stage)
+
+    def mark_stage(self, stage: str):
+        """Close the current stage and start `stage` (called for every progress event)."""
+        if stage and stage != self._stage:
+            self._close_stage()
+            self._stage, self._stage_start = stage, time.perf_counter()
+            self.sampler.stage = stage
+
+    def stop(self) -> dict:
+        """
+        Stop profiling and return the artifacts.
+
+        Returns:
+            dict: artifact name -> bytes (see PROFILE_ARTIFACTS)
+        """
+        if self.profile:
+            self.profile.disable()
+        self.sampler.stop()
+        self._close_stage()
+        if self.memory:
+            _release_tracemalloc()
+
+        summary = {
+            "job_id": self.job_id,
+            "mode": self.mode,
+            "seconds": round(time.perf_counter() - self._job_start, 4),
+            "stages": self.stages,
+        }
+        if self.memory:
+            summary["peak_mb"] = max(stage["peak_mb"] for stage in self.stages)
+            # tracemalloc is process-wide: with a threads/gevent pool, concurrent jobs share these numbers
+            summary["memory_scope"] = "process"
+        artifacts = {
+            "folded": "\n".join(f"{stack} {max(1, round(weight))}" for stack, weight in self.sampler.weights.most_common()).encode("utf-8"),
+        }
+        if self.profile:
+            self.profile.create_stats()
+            artifacts["pstats"] = marshal.dumps(self.profile.stats)
+            summary["top_functions"] = self._top_cprofile()
+        else:
+            summary["top_functions"] = self._top_sampled()
+        artifacts["summary"] = json.dumps(summary, indent=2).encode("utf-8")
+        return artifacts
+
+    def _top_cprofile(self) -> list:
+        stats = pstats.Stats(self.profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        return [{"function": f"{name} ({os.path.basename(path)}:{line})", "calls": calls,
+                 "self_seconds": round(tottime, 4), "cumulative_seconds": round(cumtime, 4)}
+                for (path, line, name), (_, calls, tottime, cumtime, _) in rows]
+
+    def _top_sampled(self) -> list:
+        self_ms = Counter()
+        for stack, weight in self.sampler.weights.items():
+            self_ms[stack.rsplit(";", 1)[-1]] += weight
+        return [{"function": function, "self_seconds": round(ms / 1000, 4)} for function, ms in self_ms.most_common(TOP_FUNCTIONS)]
+
+
+# ---------------------------------------------------------------------
+# Worker hooks
+# ---------------------------------------------------------------------
+_active: dict[str, JobProfiler] = {}
+_redis: redis.Redis | None = None
+
+def _get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(REDIS_URL)
+    return _redis
+
+def mark_stage(job_id: str, stage: str | None):
+    profiler = _active.get(job_id)
+    if profiler is not None:
+        profiler.mark_stage(stage)
+
+def save_artifacts(job_id: str, artifacts: dict, ttl_seconds: int):
+    """Store a job's profile artifacts with the same lifetime as its result."""
+    pipe = _get_redis().pipeline()
+    for name, data in artifacts.items():
+        pipe.set(profile_key(job_id, name), data, ex=ttl_seconds)
+    pipe.execute()
+
+@task_prerun.connect
+def _start_profiling(sender=None, task_id=None, kwargs=None, **extra):
+    if sender is None or sender.name != GENERATE_ROUTING_TASK:
+        return
+    mode = profile_mode((kwargs or {}).get("profile"))
+    if mode:
+        profiler = JobProfiler(task_id, mode)
+        profiler.start()
+        _active[task_id] = profiler
+        logger.info(f"Profiling job {task_id} ({mode})")
+
+@task_postrun.connect
+def _stop_profiling(sender=None, task_id=None, **extra):
+    profiler = _active.pop(task_id, None)
+    if profiler is None:
+        return
+    try:
+        artifacts = profiler.stop()
+        expires = sender.app.conf.result_expires or 86400
+        save_artifacts(task_id, artifacts, int(getattr(expires, "total_seconds", lambda: expires)()))
+        logger.info(f"Saved profile of job {task_id}: {', '.join(f'{k} {len(v)} B' for k, v in artifacts.items())}")
+    except Exception as e:
+        # Profiling must never fail the job
+        logger.warning(f"Could not save the profile of job {task_id}: {e}")
@@ -0,0 +1,54 @@
+import json
+import logging
+import redis
+from redis import asyncio as aioredis
+from celery.signals import task_postrun
+
+from wulfs_routing_api.constants import REDIS_URL
+from wulfs_routing_api.tasks import profiling, tracing
+
+logger = logging.getLogger(__name__)
+
+# Celery states after which a job publishes nothing more
+TERMINAL_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+_redis: redis.Redis | None = None
+_async_redis: aioredis.Redis | None = None
+
+def progress_channel(job_id: str) -> str:
+    """Redis pub/sub channel carrying the progress events of one job."""
+    return f"job-progress:{job_id}"
+
+def _get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(REDIS_URL)
+    return _redis
+
+def get_async_redis() -> aioredis.Redis:
+    """Shared asyncio Redis client (one connection pool) for the API process."""
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = aioredis.from_url(REDIS_URL)
+    return _async_redis
+
+def publish_progress(job_id: str, event: dict):
+    """Publish a progress event for a job. Best effort: the result backend stays the source of truth."""
+    try:
+        _get_redis().publish(progress_channel(job_id), json.dumps(event, default=str))
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish progress for job {job_id}: {e}")
+
+def report_progress(task, **meta):
+    """Record a PROGRESS state on the Celery result backend and push it to subscribers."""
+    profiling.mark_stage(task.request.id, meta.get("stage"))
+    tracing.mark_stage(task.request.id, meta.get("stage"))
+    task.update_state(state='PROGRESS', meta=meta)
+    publish_progress(task.request.id, {"status": "PROGRESS", **meta})
+
+@task_postrun.connect
+def _publish_final_state(sender=None, task_id=None, retval=None, state=None, **kwargs):
+    # task_postrun fires after the result is stored, so subscribers can fetch it immediately
+    if state in TERMINAL_STATES:
+        result = retval if state == "SUCCESS" else {"error": str(retval)}
+        publish_progress(task_id, {"status": state, "result": result})
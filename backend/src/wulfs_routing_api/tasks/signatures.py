@@ -0,0 +1,20 @@
+# Registered task names. The API enqueues by name with send_task, so it never imports the task
+# implementations (and with them OR-Tools, pandas, folium, ...); only the Celery worker does.
+GENERATE_ROUTING_TASK = "wulfs_routing_api.tasks.celery_tasks.generate_routing_task"
+# Scheduled nightly by Celery beat (celery_app.beat_schedule)
+PRECOMPUTE_TASK = "wulfs_routing_api.tasks.celery_tasks.precompute_snapshot_task"
+
+def send_generate_routing_task(orders_file_content_b64: str, num_vehicles: int, split_mode: str,
+                               route_date_str: str, hq_lat: float, hq_lon: float, profile: str = ""):
+    """Enqueue a route generation job and return its AsyncResult. `profile` opts the job into profiling (tasks/profiling.py)."""
+    # Imported here: celery_app imports this module for the beat schedule's task names
+    from wulfs_routing_api.celery_app import celery_app
+    return celery_app.send_task(GENERATE_ROUTING_TASK, kwargs={
+        "orders_file_content_b64": orders_file_content_b64,
+        "num_vehicles": num_vehicles,
+        "split_mode": split_mode,
+        "route_date_str": route_date_str,
+        "hq_lat": hq_lat,
+        "hq_lon": hq_lon,
+        "profile": profile,
+    })
@@ -0,0 +1,59 @@
+import time
+
+from celery.signals import before_task_publish, task_postrun, task_prerun
+
+from wulfs_routing_api.utils.tracing import TRACEPARENT_HEADER, end_span, inject, start_span, tracing_enabled
+
+# Carries the trace context of the enqueuing request in the Celery message headers, continues it
+# in the worker with one span per task and one child span per progress stage.
+PUBLISHED_AT_HEADER = "trace_published_at"
+
+# task id -> [task span, current stage span]
+_active: dict[str, list] = {}
+
+@before_task_publish.connect
+def _inject_trace_context(headers=None, **extra):
+    if headers is not None and tracing_enabled():
+        inject(headers)
+        headers[PUBLISHED_AT_HEADER] = time.time()
+
+@task_prerun.connect
+def _start_task_span(sender=None, task_id=None, task=None, **extra):
+    if task is None or not tracing_enabled():
+        return
+    request = task.request
+    published_at = request.get(PUBLISHED_AT_HEADER)
+    attributes = {"job_id": task_id, "task": task.name, "worker": request.hostname}
+    if published_at:
+        attributes["queue_wait_s"] = round(time.time() - float(published_at), 4)
+    span = start_span(f"celery.task {task.name.rsplit('.', 1)[-1]}", request.get(TRACEPARENT_HEADER), **attributes)
+    _active[task_id] = [span, None]
+
+def mark_stage(job_id: str, stage: str | None):
+    """End the job's current stage span and start one for `stage` (called for every progress event)."""
+    spans = _active.get(job_id)
+    if spans is None or not stage:
+        return
+    task_span, stage_span = spans
+    if stage_span is not None:
+        if stage_span.attributes.get("stage") == stage:
+            return
+        end_span(stage_span)
+    spans[1] = start_span(f"stage {stage}", job_id=job_id, stage=stage)
+
+@task_postrun.connect
+def _end_task_span(sender=None, task_id=None, retval=None, state=None, **extra):
+    spans = _active.pop(task_id, None)
+    if spans is None:
+        return
+    task_span, stage_span = spans
+    # The routing task reports its own failures in the return value instead of raising
+    error = None
+    if state != "SUCCESS":
+        error = f"{state}: {retval}"
+    elif isinstance(retval, dict) and retval.get("status") == "FAILURE":
+        error = retval.get("error_message", "FAILURE").splitlines()[0]
+    end_span(stage_span, error)
+    if task_span is not None:
+        task_span.set_attribute("state", state)
+    end_span(task_span, error)
@@ -0,0 +1,23 @@
+import os
+from functools import partial
+from typing import Any, Callable, TypeVar
+import anyio
+from anyio import to_thread
+
+T = TypeVar("T")
+
+# Blocking calls made from async handlers (sync-only models, Celery result backend) share
+# this bounded pool so a burst of requests cannot exhaust the worker's threads.
+SYNC_IO_THREADS = int(os.getenv("SYNC_IO_THREADS", "16"))
+
+_limiter: anyio.CapacityLimiter | None = None
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(SYNC_IO_THREADS)
+    return _limiter
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function in the bounded thread pool and await its result."""
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=_get_limiter())
@@ -39,24 +39,53 @@ def base64_data_to_temp_file(file_name, file_content_b64, USE_HOME=True):
     return temp_file_path
 
 
-def load_base64_to_df(base64_content: str) -> pd.DataFrame:
+# Magic bytes used to sniff uploaded order files
+XLSX_MAGIC = b"PK\x03\x04"                          # Office Open XML (zip container)
+XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"   # Legacy Excel (OLE2 compound file)
+
+
+def sniff_file_format(data: bytes) -> str:
     """
-    Load a base64-encoded file (CSV, Excel) directly into a DataFrame,
-    detecting if it's text or binary automatically.
+    Detect the format of an uploaded file from its leading magic bytes.
+    Returns "xlsx", "xls" or "csv" (anything that is not a known binary container).
     """
-    decoded_bytes = base64.b64decode(base64_content)
+    if data.startswith(XLSX_MAGIC):
+        return "xlsx"
+    if data.startswith(XLS_MAGIC):
+        return "xls"
+    return "csv"
+
+
+def read_csv_bytes(data: bytes) -> pd.DataFrame:
+    """Read CSV bytes with the Arrow based reader, falling back to the default pandas engine."""
+    try:
+        return pd.read_csv(io.BytesIO(data), engine="pyarrow")
+    except ImportError:
+        # pyarrow is not installed
+        return pd.read_csv(io.BytesIO(data))
+
 
-    # Try to decode as UTF-8 (text)
+def read_xlsx_bytes(data: bytes) -> pd.DataFrame:
+    """Read the first sheet of an .xlsx file from memory, without a temporary file."""
+    return pd.read_excel(io.BytesIO(data), engine="openpyxl")
+
+
+def load_bytes_to_df(data: bytes) -> pd.DataFrame:
+    """Load raw file bytes (CSV, XLSX, XLS) into a DataFrame based on the sniffed format."""
+    file_format = sniff_file_format(data)
     try:
-        decoded_str = decoded_bytes.decode('utf-8')
-        buffer = io.StringIO(decoded_str)
-        df = pd.read_csv(buffer)
-        return df
-    except UnicodeDecodeError:
-        # If decoding fails, assume binary (e.g., Excel)
-        buffer = io.BytesIO(decoded_bytes)
-        try:
-            df = pd.read_excel(buffer, sheet_name=0)
-            return df
-        except Exception as e:
-            raise ValueError(f"Cannot determine file type or read file: {e}")
+        if file_format == "xlsx":
+            return read_xlsx_bytes(data)
+        if file_format == "xls":
+            return pd.read_excel(io.BytesIO(data), sheet_name=0)
+        return read_csv_bytes(data)
+    except Exception as e:
+        raise ValueError(f"Cannot read {file_format} file: {e}") from e
+
+
+def load_base64_to_df(base64_content: str) -> pd.DataFrame:
+    """
+    Load a base64-encoded file (CSV, Excel) directly into a DataFrame,
+    detecting the file type from its magic bytes.
+    """
+    return load_bytes_to_df(base64.b64decode(base64_content))
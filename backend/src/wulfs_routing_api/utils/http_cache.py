@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+from fastapi import Request, Response
+
+# Persisted routes and stops never change, so their responses may be cached by clients forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Resources whose membership can grow (e.g. all routes of a date) must be revalidated
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Payloads that are not final yet (e.g. a route whose stops are not persisted) must not be stored at all
+NO_STORE_CACHE_CONTROL = "no-store"
+
+@dataclass(frozen=True)
+class CachedBody:
+    """A serialized JSON response with its precomputed gzip encoding and strong ETag."""
+    body: bytes
+    gzip_body: bytes
+    etag: str
+
+    @property
+    def gzip_etag(self) -> str:
+        # Each encoding is a different representation, so it gets its own strong validator
+        return self.etag[:-1] + '-gz"'
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body)
+
+    @classmethod
+    def from_data(cls, data: Any) -> "CachedBody":
+        body = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        return cls(body=body, gzip_body=gzip.compress(body, compresslevel=6), etag=etag)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Bounded in-process LRU of serialized responses, limited by entry count and total bytes.
+
+        Args:
+            max_entries (int): Maximum number of cached responses.
+            max_bytes (int): Maximum total size of the cached bodies (plain + gzip).
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, CachedBody] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> CachedBody | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: CachedBody):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    async def get_or_build(self, key: Hashable, build: Callable[[], Awaitable[Any]],
+                           cacheable: Callable[[Any], bool] = bool) -> tuple[CachedBody, bool]:
+        """
+        Return the cached body for `key`, building and caching it when missing (and `cacheable`).
+
+        Returns:
+            (entry, cached): `cached` is False when the built payload was not cacheable; such a
+            body must not be served with long-lived cache headers either.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry, True
+        data = await build()
+        entry = CachedBody.from_data(data)
+        cached = cacheable(data)
+        if cached:
+            self.put(key, entry)
+        return entry, cached
+
+
+def _etag_matches(if_none_match: str | None, entry: CachedBody) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return entry.etag in tags or entry.gzip_etag in tags
+
+
+def cached_json_response(request: Request, entry: CachedBody, cache_control: str = IMMUTABLE_CACHE_CONTROL,
+                         cacheable: bool = True) -> Response:
+    """
+    Build the HTTP response for a cached body: 304 when the client's ETag matches,
+    otherwise the gzip or plain JSON body depending on Accept-Encoding.
+    A body that is not `cacheable` is sent with `no-store` and without an ETag.
+    """
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {"Vary": "Accept-Encoding"}
+    if cacheable:
+        headers["Cache-Control"] = cache_control
+        headers["ETag"] = entry.gzip_etag if use_gzip else entry.etag
+        if _etag_matches(request.headers.get("if-none-match"), entry):
+            return Response(status_code=304, headers=headers)
+    else:
+        headers["Cache-Control"] = NO_STORE_CACHE_CONTROL
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# Shared cache of stop payloads for the API process
+stops_response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
@@ -0,0 +1,17 @@
+import base64
+import json
+from typing import Tuple
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    """Encode the keyset position (created_at, id) of the last row of a page as an opaque cursor."""
+    raw = json.dumps([created_at, int(row_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a cursor produced by `encode_cursor`. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
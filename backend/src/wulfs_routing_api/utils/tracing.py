@@ -0,0 +1,296 @@
+import argparse
+import contextvars
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Protocol
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Lightweight distributed tracing. A trace starts at POST /routes/generate, travels to the worker in
+# the Celery message headers (tasks/tracing.py) and to OSRM and Supabase as a W3C `traceparent`
+# header, so every span of one job shares its trace id. Disabled unless TRACE_EXPORTER is set:
+#   console - one line per finished span on stderr
+#   file    - one JSON object per span appended to TRACE_FILE (default traces.jsonl)
+# Other exporters can be installed with set_exporter(). Print a job's trace with
+#   python -m wulfs_routing_api.utils.tracing traces.jsonl --job <job_id>
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "").strip().lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_SERVICE = os.getenv("TRACE_SERVICE", "")
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    attributes: dict = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    error: str | None = None
+    _token: contextvars.Token | None = field(default=None, repr=False)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": TRACE_SERVICE or None,
+            "pid": os.getpid(),
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span): ...
+
+
+class ConsoleExporter():
+    """Writes one line per finished span to stderr."""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def export(self, span: Span):
+        parent = span.parent_id or "-" * 16
+        status = f" ERROR {span.error}" if span.error else ""
+        attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        self.stream.write(f"[trace {span.trace_id} {parent}>{span.span_id}] {span.name} "
+                          f"{span.duration_ms:.1f} ms {attributes}{status}\n")
+
+
+class FileExporter():
+    def __init__(self, path: str = TRACE_FILE):
+        """
+        Appends finished spans as JSON lines. API and worker processes may share the file: each span is
+        written with a single append.
+
+        Args:
+            path (str): File to append to.
+        """
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1, encoding="utf-8")
+            self._file.write(line)
+
+
+EXPORTERS = {"console": ConsoleExporter, "file": FileExporter}
+
+_exporter: SpanExporter | None = None
+_exporter_initialized = False
+_context: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar("trace_context", default=None)
+
+def get_exporter() -> SpanExporter | None:
+    """The configured exporter, or None when tracing is disabled."""
+    global _exporter, _exporter_initialized
+    if not _exporter_initialized:
+        _exporter_initialized = True
+        if TRACE_EXPORTER in EXPORTERS:
+            _exporter = EXPORTERS[TRACE_EXPORTER]()
+        elif TRACE_EXPORTER not in ("", "none", "off"):
+            logger.warning(f"Unknown TRACE_EXPORTER {TRACE_EXPORTER!r}; tracing disabled. Use one of {', '.join(EXPORTERS)}.")
+    return _exporter
+
+def set_exporter(exporter: SpanExporter | None):
+    """Install an exporter (None disables tracing), e.g. from a benchmark or to ship spans elsewhere."""
+    global _exporter, _exporter_initialized
+    _exporter, _exporter_initialized = exporter, True
+
+def tracing_enabled() -> bool:
+    return get_exporter() is not None
+
+def parse_traceparent(value: str | None) -> tuple[str, str] | None:
+    """(trace id, parent span id) of a `traceparent` header, or None if absent or malformed."""
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    return (match.group(1), match.group(2)) if match else None
+
+def current_traceparent() -> str | None:
+    context = _context.get()
+    return f"00-{context[0]}-{context[1]}-01" if context else None
+
+def inject(headers) -> dict:
+    """Add the current trace context to an outgoing headers mapping (no-op outside a trace)."""
+    traceparent = current_traceparent()
+    if traceparent:
+        headers[TRACEPARENT_HEADER] = traceparent
+    return headers
+
+def start_span(name: str, traceparent: str | None = None, **attributes) -> Span | None:
+    """
+    Start a span and make it current. Its parent is the remote `traceparent` if given, else the
+    current span; without either it starts a new trace. Returns None when tracing is disabled.
+    Every started span must be finished with end_span() in the same thread or task.
+    """
+    if get_exporter() is None:
+        return None
+    parent = parse_traceparent(traceparent) or _context.get()
+    span = Span(
+        name=name,
+        trace_id=parent[0] if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent[1] if parent else None,
+        attributes=attributes,
+    )
+    span._token = _context.set((span.trace_id, span.span_id))
+    return span
+
+def end_span(span: Span | None, error: BaseException | str | None = None):
+    """Finish a span started with start_span(), restore its parent as current and export it."""
+    if span is None or span.end_ns is not None:
+        return
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+    try:
+        _context.reset(span._token)
+    except ValueError:
+        # Ended from another context (e.g. a Celery signal in a different thread); leave that context alone
+        pass
+    exporter = get_exporter()
+    try:
+        if exporter is not None:
+            exporter.export(span)
+    except Exception as e:
+        # Tracing must never fail the traced work
+        logger.warning(f"Could not export span {span.name}: {e}")
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span | None]:
+    """Trace the enclosed block as a child of the current span. Yields None when tracing is disabled."""
+    current = start_span(name, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, e)
+        raise
+    end_span(current)
+
+
+# ---------------------------------------------------------------------
+# httpx instrumentation (the Supabase clients)
+# ---------------------------------------------------------------------
+def _request_attributes(request: httpx.Request) -> dict:
+    return {"http.method": request.method, "http.host": request.url.host, "http.path": request.url.path}
+
+class TracingTransport(httpx.BaseTransport):
+    """Wraps an httpx transport: one span per request, with the trace context sent as `traceparent`."""
+    def __init__(self, transport: httpx.BaseTransport, name: str):
+        self.transport = transport
+        self.name = name
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with span(f"{self.name} {request.method} {request.url.path}", **_request_attributes(request)) as current:
+            inject(request.headers)
+            response = self.transport.handle_request(request)
+            if current is not None:
+                current.set_attribute("http.status_code", response.status_code)
+            return response
+
+    def close(self):
+        self.transport.close()
+
+class AsyncTracingTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of TracingTransport."""
+    def __init__(self, transport: httpx.AsyncBaseTransport, name: str):
+        self.transport = transport
+        self.name = name
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with span(f"{self.name} {request.method} {request.url.path}", **_request_attributes(request)) as current:
+            inject(request.headers)
+            response = await self.transport.handle_async_request(request)
+            if current is not None:
+                current.set_attribute("http.status_code", response.status_code)
+            return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+def instrument_httpx_client(client: httpx.Client | httpx.AsyncClient, name: str):
+    """Trace every request of an existing httpx client (no-op when tracing is disabled)."""
+    if not tracing_enabled():
+        return
+    # httpx has no public hook around a whole request, so the client's default transport is wrapped
+    if isinstance(client, httpx.AsyncClient):
+        if not isinstance(client._transport, AsyncTracingTransport):
+            client._transport = AsyncTracingTransport(client._transport, name)
+    elif not isinstance(client._transport, TracingTransport):
+        client._transport = TracingTransport(client._transport, name)
+
+
+# ---------------------------------------------------------------------
+# Reading a trace file
+# ---------------------------------------------------------------------
+def load_trace(path: str, trace_id: str | None = None, job_id: str | None = None) -> list[dict]:
+    """The spans of one trace from a FileExporter file, selected by trace id or by a span's job_id attribute."""
+    with open(path, encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    if job_id and not trace_id:
+        trace_id = next((s["trace_id"] for s in spans if s["attributes"].get("job_id") == job_id), None)
+    if trace_id is None and spans:
+        trace_id = spans[-1]["trace_id"]
+    return sorted((s for s in spans if s["trace_id"] == trace_id), key=lambda s: s["start_ns"])
+
+def format_trace(spans: list[dict]) -> str:
+    """Render spans as an indented tree with start offsets and durations in milliseconds."""
+    if not spans:
+        return "No spans found."
+    origin = spans[0]["start_ns"]
+    children: dict[str | None, list[dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        children.setdefault(s["parent_id"] if s["parent_id"] in ids else None, []).append(s)
+
+    lines = [f"trace {spans[0]['trace_id']}", f"{'start ms':>10} {'duration ms':>12}  span"]
+    def walk(parent_id, depth):
+        for s in children.get(parent_id, []):
+            status = f"  ERROR {s['error']}" if s["status"] == "error" else ""
+            lines.append(f"{(s['start_ns'] - origin) / 1e6:>10.1f} {s['duration_ms']:>12.1f}  {'  ' * depth}{s['name']}{status}")
+            walk(s["span_id"], depth + 1)
+    walk(None, 0)
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print one trace from a TRACE_EXPORTER=file span log.")
+    parser.add_argument("path", nargs="?", default=TRACE_FILE)
+    parser.add_argument("--trace", help="Trace id (default: the trace of --job, else the latest)")
+    parser.add_argument("--job", help="Job id returned by POST /routes/generate")
+    args = parser.parse_args(argv)
+    print(format_trace(load_trace(args.path, args.trace, args.job)))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
 import streamlit as st
-import time
 
 from wulfs_routing_web.state.session import init_session_state
-from wulfs_routing_web.services.route_service import get_job_status, get_route_results
+from wulfs_routing_web.services.route_service import stream_job_events, get_job_status, get_route_results
 from wulfs_routing_web.services.api_client import APIError
 from wulfs_routing_web.components.route_form import render_route_form
 from wulfs_routing_web.components.results_viewer import render_results_viewer
@@ -13,6 +12,8 @@ from wulfs_routing_web.components.history_sidebar import render_history_sidebar
 st.set_page_config(layout="wide", page_title="Wulf's Routing Automation")
 init_session_state()
 
+TERMINAL_STATUSES = ["SUCCESS", "FAILURE", "REVOKED"]
+
 # --- Main App Layout ---
 st.title("🚚 Wulf's Routing Automation")
 main_col, history_col = st.columns([3, 1])
@@ -28,21 +29,21 @@ with main_col:
         with polling_placeholder.container():
             st.info("🔄 Processing routes...")
             
-            while st.session_state.get('job_status') not in ["SUCCESS", "FAILURE"]:
-                try:
-                    status_data = get_job_status(job_id)
-                    st.session_state['job_status'] = status_data.get('status')
-                    
-                    if status_data.get('status') == "RUNNING":
-                        st.info(f"🔄 {status_data.get('message', 'Processing routes...')}")
-                    
-                    if st.session_state.get('job_status') in ["SUCCESS", "FAILURE"]:
+            status_placeholder = st.empty()
+            try:
+                # Progress is pushed by the API as it happens; the stream ends on SUCCESS, FAILURE or REVOKED
+                for event in stream_job_events(job_id):
+                    st.session_state['job_status'] = event.get('status')
+                    if event.get('message'):
+                        status_placeholder.info(f"🔄 {event['message']}")
+                    if st.session_state.get('job_status') in TERMINAL_STATUSES:
                         break
-                    time.sleep(2)
-                except APIError as e:
-                    st.error(f"Error checking job status: {e}")
-                    st.session_state['job_status'] = "ERROR"
-                    break
+                # The stream can also end early (timeout, dropped connection): ask for the status instead
+                if st.session_state.get('job_status') not in TERMINAL_STATUSES:
+                    st.session_state['job_status'] = get_job_status(job_id).get('status')
+            except APIError as e:
+                st.error(f"Error checking job status: {e}")
+                st.session_state['job_status'] = "ERROR"
         
         polling_placeholder.empty()
 
@@ -50,16 +51,22 @@ with main_col:
         if st.session_state.get('job_status') == "SUCCESS":
             with st.spinner("Task complete! Fetching results..."):
                 try:
-                    all_routes_df, missing_orders_df, map_path = get_route_results(job_id)
+                    all_routes_df, missing_orders_df, route_geometry = get_route_results(job_id)
                     st.session_state['all_routes_df'] = all_routes_df
                     st.session_state['missing_orders_df'] = missing_orders_df
-                    st.session_state['map_path'] = map_path
+                    st.session_state['route_geometry'] = route_geometry
                     st.rerun() # Rerun to display the results viewer
                 except APIError as e:
                     st.error(f"Error fetching results: {e}")
         
         elif st.session_state.get('job_status') in ["FAILURE", "ERROR"]:
              st.error("The background task failed. Please check the Celery worker terminal for more details.")
+        elif st.session_state.get('job_status') == "REVOKED":
+             st.error("The background task was cancelled before it finished.")
+        else:
+             st.warning(f"Lost track of the job's progress (status: {st.session_state.get('job_status')}). "
+                        "It may still be running.")
+             st.button("Check again")  # any rerun resumes monitoring the job
 
     # --- Display Area ---
     if st.session_state.get('all_routes_df') is not None:
@@ -2,59 +2,84 @@ import streamlit as st
 import datetime as dt
 import os
 import pandas as pd
-from ..services.route_service import get_historical_routes, get_historical_route_details
+from ..services.route_service import get_historical_routes, get_historical_route_details, get_route_geometry
 from ..services.api_client import APIError
 from ..utils.data_processing import process_routes_from_api
-from ..utils.map_utils import generate_route_map
+
+def _load_route(route):
+    """Loads a historical route into the results viewer."""
+    # Reset state
+    st.session_state['job_id'] = None
+    st.session_state['job_status'] = "SUCCESS"
+    st.session_state['loaded_route_id'] = route['id']
+
+    # Fetch and process data (cached per route id)
+    route_detail = get_historical_route_details(route['id'])
+    st.session_state['all_routes_df'] = process_routes_from_api(route_detail)
+    st.session_state['route_date'] = dt.datetime.fromisoformat(route['route_date']).date()
+
+    # Geometry is served (and cached) by the API
+    st.session_state['route_geometry'] = get_route_geometry([route['id']])
+
+    # Clear missing orders as they aren't stored/relevant for historical views
+    st.session_state['missing_orders_df'] = pd.DataFrame()
+
+def _group_by_date(routes):
+    """Groups routes (newest first) by route date, keeping the order and dropping repeats across pages."""
+    groups = {}
+    seen = set()
+    for route in routes:
+        if route['id'] in seen:
+            continue
+        seen.add(route['id'])
+        groups.setdefault(route['route_date'][:10], []).append(route)
+    return groups
 
 def render_history_sidebar():
-    """Renders the sidebar for loading historical routes."""
+    """Renders the sidebar for loading historical routes, one route date at a time."""
     st.header("6. Historical Routes")
     try:
-        historical_routes = get_historical_routes()
+        # The newest page is cached briefly; older pages are fetched only when asked for
+        first_page = get_historical_routes()
+        historical_routes = first_page['routes'] + st.session_state['history_older_routes']
+        next_cursor = st.session_state['history_next_cursor']
+        if next_cursor is None:
+            next_cursor = first_page['next_cursor']
         if not historical_routes:
             st.write("No past routes found.")
             return
 
-        # Sort routes by date, newest first
-        historical_routes.sort(key=lambda r: r['route_date'], reverse=True)
+        routes_by_date = _group_by_date(historical_routes)
+        selected_date = st.selectbox(
+            "Route date",
+            list(routes_by_date),
+            format_func=lambda d: f"{d} ({len(routes_by_date[d])} routes)",
+            key="history_selected_date",
+        )
 
-        # Create a container with a fixed height to make the list scrollable
+        # Only the selected date's routes get buttons, keeping reruns cheap with a long history
         history_container = st.container(height=600)
         with history_container:
-            for route in historical_routes:
-                button_label = f"Load Route ID: {route['id']} ({route['route_date']})"
+            for route in routes_by_date[selected_date]:
+                button_label = f"Load Route ID: {route['id']} ({route.get('stop_count', '?')} stops)"
                 if st.button(button_label, key=f"load_route_{route['id']}"):
                     with st.spinner(f"Loading route {route['id']}..."):
-                        # Reset state
-                        st.session_state['job_id'] = None
-                        st.session_state['job_status'] = "SUCCESS"
-                        st.session_state['loaded_route_id'] = route['id']
-                        
-                        # Fetch and process data
-                        route_detail = get_historical_route_details(route['id'])
-                        all_routes_df = process_routes_from_api(route_detail)
-                        st.session_state['all_routes_df'] = all_routes_df
-                        
-                        route_date = dt.datetime.fromisoformat(route['route_date']).date()
-                        st.session_state['route_date'] = route_date
-                        
-                        # Regenerate map
-                        temp_map_dir = "routes_out_temp_map" # Relative to where the app runs
-                        map_path = generate_route_map(
-                            df=all_routes_df,
-                            outdir=temp_map_dir,
-                            route_date=route_date.strftime('%Y-%m-%d'),
-                            depot_coords=(st.session_state['hq_lon'], st.session_state['hq_lat']),
-                            sequences={}
-                        )
-                        st.session_state['map_path'] = map_path
-                        
-                        # Clear missing orders as they aren't stored/relevant for historical views
-                        st.session_state['missing_orders_df'] = pd.DataFrame()
-                        
+                        _load_route(route)
                         st.rerun()
 
+        col_older, col_refresh = st.columns(2)
+        if next_cursor and col_older.button("Load older routes", key="load_older_routes"):
+            older_page = get_historical_routes(cursor=next_cursor)
+            st.session_state['history_older_routes'] = st.session_state['history_older_routes'] + older_page['routes']
+            # An exhausted history is remembered as "" so the first page's cursor is not reused
+            st.session_state['history_next_cursor'] = older_page['next_cursor'] or ""
+            st.rerun()
+        if col_refresh.button("Refresh", key="refresh_history"):
+            get_historical_routes.clear()
+            st.session_state['history_older_routes'] = []
+            st.session_state['history_next_cursor'] = None
+            st.rerun()
+
     except APIError as e:
         st.error(f"Could not fetch history: {e}")
     except Exception as e:
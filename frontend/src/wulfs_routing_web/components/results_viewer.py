@@ -1,8 +1,18 @@
+import copy
 import streamlit as st
-import os
-import tempfile
 from datetime import datetime
-from ..utils.data_processing import export_assignments
+from ..utils.data_processing import build_assignment_downloads
+from ..utils.map_utils import build_geojson_map
+
+# Reruns (button clicks, downloads) reuse the rendered map and the built files
+@st.cache_data(max_entries=16, show_spinner=False)
+def _route_map_html(route_geometry, depot_coords):
+    # build_geojson_map labels the features in place; keep the session's copy (and its cache hash) intact
+    return build_geojson_map(copy.deepcopy(route_geometry), depot_coords).get_root().render()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _assignment_downloads(routes_df, route_date_str):
+    return build_assignment_downloads(routes_df, route_date_str)
 
 def render_results_viewer():
     """Renders the UI for displaying route results, map, and download links."""
@@ -16,37 +26,35 @@ def render_results_viewer():
         st.warning(f"⚠️ {len(missing_orders_df)} orders not matched by name.")
         st.dataframe(missing_orders_df)
 
-    map_path = st.session_state.get('map_path')
-    if map_path and os.path.exists(map_path):
-        with open(map_path, "r", encoding="utf-8") as f:
-            st.components.v1.html(f.read(), height=500)
+    route_geometry = st.session_state.get('route_geometry')
+    if route_geometry and route_geometry.get('features'):
+        st.components.v1.html(_route_map_html(route_geometry, (st.session_state['hq_lon'], st.session_state['hq_lat'])), height=500)
     
     st.subheader("Download Vehicle Routes")
     all_routes_df = st.session_state.get('all_routes_df')
 
     if all_routes_df is not None and not all_routes_df.empty:
-        with tempfile.TemporaryDirectory() as tmpdir_download:
-            route_date = st.session_state.get('route_date')
-            
-            if hasattr(route_date, 'strftime'):
-                route_date_str = route_date.strftime('%Y-%m-%d')
-            else:
-                route_date_str = datetime.now().strftime('%Y-%m-%d')
-
-            export_assignments(
-                routes_df=all_routes_df,
-                outdir=tmpdir_download,
-                route_date=route_date_str
+        route_date = st.session_state.get('route_date')
+
+        if hasattr(route_date, 'strftime'):
+            route_date_str = route_date.strftime('%Y-%m-%d')
+        else:
+            route_date_str = datetime.now().strftime('%Y-%m-%d')
+
+        files, bundle = _assignment_downloads(all_routes_df, route_date_str)
+        st.download_button(
+            label="Download all routes (.zip)",
+            data=bundle,
+            file_name=f"routes_{route_date_str}.zip",
+            mime="application/zip"
+        )
+
+        download_files = [f for f in files if f.startswith("vehicle")]
+        cols = st.columns(len(download_files))
+        for i, f in enumerate(download_files):
+            cols[i].download_button(
+                label=f"Download {f}",
+                data=files[f],
+                file_name=f,
+                mime="text/csv"
             )
-            
-            download_files = sorted([f for f in os.listdir(tmpdir_download) if f.startswith("vehicle") and f.endswith(".csv")])
-            
-            cols = st.columns(len(download_files))
-            for i, f in enumerate(download_files):
-                with open(os.path.join(tmpdir_download, f), "rb") as file_bytes:
-                    cols[i].download_button(
-                        label=f"Download {f}",
-                        data=file_bytes,
-                        file_name=f,
-                        mime="text/csv"
-                    )
@@ -21,7 +21,7 @@ def render_route_form():
             st.stop()
 
         # Reset state for a new job
-        for key in ['job_id', 'job_status', 'all_routes_df', 'missing_orders_df', 'map_path', 'loaded_route_id']:
+        for key in ['job_id', 'job_status', 'all_routes_df', 'missing_orders_df', 'route_geometry', 'loaded_route_id']:
             st.session_state[key] = None
         
         with st.spinner("Starting route generation job..."):
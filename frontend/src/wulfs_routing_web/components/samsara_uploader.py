@@ -29,7 +29,9 @@ def render_samsara_uploader():
                     route_date=st.session_state['route_date'],
                     route_start_time=route_start_time,
                     hq_lat=st.session_state['hq_lat'],
-                    hq_lon=st.session_state['hq_lon']
+                    hq_lon=st.session_state['hq_lon'],
+                    # Routes already uploaded in this session are not sent twice
+                    uploaded=st.session_state.setdefault('samsara_uploaded', {})
                 )
                 for message in upload_generator:
                     if "Successfully" in message:
@@ -3,3 +3,12 @@ from schemas.coordinates import Coordinates
 SAMSARA_ROUTES_URL = "https://api.samsara.com/fleet/routes"
 API_URL = "http://127.0.0.1:8000"
 HQ_COORDINATES = Coordinates(lat=42.34902, lon=-71.03118)
+# Time spent at each stop on top of the stored driving time when scheduling Samsara arrivals
+STOP_SERVICE_MINUTES = 5
+# Spacing between stops for routes that have no stored ETAs
+UNSEQUENCED_STOP_MINUTES = 15
+# Frontend cache lifetimes (seconds). Persisted routes never change; the history list grows.
+ROUTE_DATA_CACHE_TTL = 60 * 60
+HISTORY_CACHE_TTL = 60
+# Routes fetched per history page
+HISTORY_PAGE_SIZE = 50
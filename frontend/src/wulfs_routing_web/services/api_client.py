@@ -1,3 +1,4 @@
+import json
 import requests
 from ..constants import API_URL
 
@@ -17,12 +18,34 @@ def api_post(endpoint: str, files=None, data=None, timeout=10):
     except requests.RequestException as e:
         raise APIError(f"POST {endpoint} failed: {e}") from e
 
-def api_get(endpoint: str, timeout=10):
+def api_get(endpoint: str, params=None, timeout=10):
     try:
-        res = requests.get(f"{API_URL}/{endpoint}", timeout=timeout)
+        res = requests.get(f"{API_URL}/{endpoint}", params=params, timeout=timeout)
         if res.status_code == 200:
             return res.json()
         else:
             raise APIError(f"GET {endpoint} returned {res.status_code}", res.status_code, res)
     except requests.RequestException as e:
-        raise APIError(f"GET {endpoint} failed: {e}") from e
\ No newline at end of file
+        raise APIError(f"GET {endpoint} failed: {e}") from e
+
+def api_stream_events(endpoint: str, timeout=(5, 60)):
+    """
+    Consumes a Server-Sent Events endpoint, yielding each event's JSON data as a dict.
+    The read timeout must exceed the server's keep-alive interval.
+    """
+    try:
+        with requests.get(f"{API_URL}/{endpoint}", stream=True, timeout=timeout,
+                          headers={"Accept": "text/event-stream"}) as res:
+            if res.status_code != 200:
+                raise APIError(f"GET {endpoint} returned {res.status_code}", res.status_code, res)
+            data_lines = []
+            for line in res.iter_lines(decode_unicode=True):
+                if line:
+                    if line.startswith("data:"):
+                        data_lines.append(line[len("data:"):].strip())
+                elif data_lines:
+                    # A blank line ends the event
+                    yield json.loads("\n".join(data_lines))
+                    data_lines = []
+    except requests.RequestException as e:
+        raise APIError(f"GET {endpoint} failed: {e}") from e
@@ -1,6 +1,8 @@
 import io
 import pandas as pd
-from .api_client import api_get, api_post, APIError
+import streamlit as st
+from .api_client import api_get, api_post, api_stream_events, APIError
+from ..constants import HISTORY_CACHE_TTL, HISTORY_PAGE_SIZE, ROUTE_DATA_CACHE_TTL
 from ..utils.data_processing import process_routes_from_api
 import logging
 logger = logging.getLogger()
@@ -23,6 +25,11 @@ def get_job_status(job_id):
     """Gets the status of a running job."""
     return api_get(f"routes/{job_id}/status")
 
+def stream_job_events(job_id):
+    """Yields progress events of a running job until it succeeds, fails or is revoked."""
+    return api_stream_events(f"routes/{job_id}/events")
+
+@st.cache_data(ttl=ROUTE_DATA_CACHE_TTL, show_spinner=False)
 def get_route_results(job_id):
     """Gets the results of a completed job."""
     result_payload = api_get(f"routes/{job_id}/results")['result']
@@ -32,23 +39,39 @@ def get_route_results(job_id):
 
     missing_orders_json = io.StringIO(result_payload['missing_orders_json'])
     missing_orders_df = pd.read_json(missing_orders_json, orient='split')
-    map_path = result_payload['map_path']
-
-    all_stops = []
-    for route_id in result_payload['route_ids']:
-        # In the original app, this was a direct requests call.
-        # Refactoring to use the existing service function.
-        route_detail = get_historical_route_details(route_id)
-        all_stops.extend(route_detail)
-
+    all_stops = get_stops_for_routes(result_payload['route_ids'])
     all_routes_df = process_routes_from_api(all_stops)
+    route_geometry = get_route_geometry(result_payload['route_ids'])
     
-    return all_routes_df, missing_orders_df, map_path
+    return all_routes_df, missing_orders_df, route_geometry
 
-def get_historical_routes():
-    """Gets the list of historical routes."""
-    return api_get("routes")
+@st.cache_data(ttl=HISTORY_CACHE_TTL, show_spinner=False)
+def get_historical_routes(limit=HISTORY_PAGE_SIZE, cursor=None, start_date=None, end_date=None):
+    """
+    Gets one page of historical routes, newest first.
+    Returns the page as {"routes": [...], "next_cursor": str | None}.
+    """
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    if start_date:
+        params["start_date"] = start_date.isoformat()
+    if end_date:
+        params["end_date"] = end_date.isoformat()
+    return api_get("routes", params=params)
 
+@st.cache_data(ttl=ROUTE_DATA_CACHE_TTL, show_spinner=False)
 def get_historical_route_details(route_id):
     """Gets the details for a specific historical route."""
     return api_get(f"routes/{route_id}/stops")
+
+@st.cache_data(ttl=ROUTE_DATA_CACHE_TTL, show_spinner=False)
+def get_stops_for_routes(route_ids):
+    """Gets the stops of many routes in a single request, flattened in route order."""
+    route_groups = api_get("stops", params={"route_ids": list(route_ids)})
+    return [stop for group in route_groups for stop in group['stops']]
+
+@st.cache_data(ttl=ROUTE_DATA_CACHE_TTL, show_spinner=False)
+def get_route_geometry(route_ids):
+    """Gets the GeoJSON FeatureCollection (route lines and stop points) for the given routes."""
+    return api_get("routes/geometry", params={"route_ids": list(route_ids)})
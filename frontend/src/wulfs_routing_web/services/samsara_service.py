@@ -1,83 +1,252 @@
-import os
 import datetime as dt
-import requests
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+import numpy as np
 import pandas as pd
-from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
 
-from ..constants import SAMSARA_ROUTES_URL
+from ..constants import SAMSARA_ROUTES_URL, STOP_SERVICE_MINUTES, UNSEQUENCED_STOP_MINUTES
 
 from ..utils.env_utils import get_env
 
-def _samsara_upload_unsequenced(vehicle_df: pd.DataFrame, token: str, route_name: str,
-                               depot_lat: float, depot_lon: float, start_local: dt.datetime,
-                               vehicle_id: Optional[str] = None):
-    """Helper function to upload a single vehicle's route to Samsara."""
-    stops = [{
-        "singleUseLocation": {"address":"Depot","latitude":depot_lat,"longitude":depot_lon},
-        "scheduledDepartureTime": start_local.astimezone(dt.timezone.utc).isoformat().replace("+00:00","Z")
-    }]
-    arrival_time = start_local
-    for i, (_, r) in enumerate(vehicle_df.iterrows()):
-        # Increment start time by 15 mins for each stop
-        arrival_time = start_local + dt.timedelta(minutes=15 * (i + 1))
-        stops.append({
-            "singleUseLocation": {
-                "address": f'{r["address"]}, {r["city"]}, {r["state"]} {r["zip"]}',
-                "latitude": float(r["lat"]),
-                "longitude": float(r["lon"])
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limited or a transient server/gateway error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def _utc_strings(start_utc: dt.datetime, offsets_s: np.ndarray) -> List[str]:
+    times = pd.Timestamp(start_utc) + pd.to_timedelta(offsets_s, unit="s")
+    return list(times.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+def _arrival_offsets(vehicle_df: pd.DataFrame) -> Tuple[np.ndarray, float]:
+    """
+    Seconds from the route start to each stop and to the return at the depot.
+    Uses the driving times stored with the stops; routes without them get fixed spacing.
+    """
+    n = len(vehicle_df)
+    position = np.arange(n, dtype=float)
+    durations = vehicle_df["cumulative_duration_s"].to_numpy(dtype=float) if "cumulative_duration_s" in vehicle_df.columns else np.full(n, np.nan)
+    route_duration = vehicle_df["route_duration_s"].to_numpy(dtype=float) if "route_duration_s" in vehicle_df.columns else np.full(n, np.nan)
+    if n and not np.isnan(durations).any():
+        offsets = durations + position * STOP_SERVICE_MINUTES * 60
+        if not np.isnan(route_duration[-1]):
+            return offsets, offsets[-1] + route_duration[-1] - durations[-1] + STOP_SERVICE_MINUTES * 60
+        return offsets, offsets[-1] + UNSEQUENCED_STOP_MINUTES * 60
+    offsets = (position + 1) * UNSEQUENCED_STOP_MINUTES * 60
+    return offsets, (n + 1) * UNSEQUENCED_STOP_MINUTES * 60
+
+def build_route_payloads(all_routes_df: pd.DataFrame, route_date: dt.date, route_start_time: dt.time,
+                         hq_lat: float, hq_lon: float) -> List[Tuple[int, dict]]:
+    """
+    Build one Samsara route payload per vehicle. Addresses, coordinates and notes are prepared
+    column-wise for the whole day; each vehicle then only slices the prepared arrays.
+
+    Returns:
+        List[Tuple[int, dict]]: (vehicle_index, payload) in vehicle order.
+    """
+    start_utc = dt.datetime.combine(route_date, route_start_time).astimezone(dt.timezone.utc)
+    route_date_str = route_date.strftime('%Y-%m-%d')
+    df = all_routes_df.sort_values(["vehicle_index", "sequence"], kind="stable").reset_index(drop=True)
+
+    addresses = (df["address"].astype(str) + ", " + df["city"].astype(str) + ", "
+                 + df["state"].astype(str) + " " + df["zip"].astype(str)).tolist()
+    lats = df["lat"].astype(float).tolist()
+    lons = df["lon"].astype(float).tolist()
+    notes = (df["notes"].fillna("").astype(str).str.slice(0, 2000) if "notes" in df.columns
+             else pd.Series([""] * len(df))).tolist()
+    depot = {"address": "Depot", "latitude": hq_lat, "longitude": hq_lon}
+
+    payloads = []
+    for vehicle_index, positions in df.groupby("vehicle_index", sort=True).indices.items():
+        offsets, return_offset = _arrival_offsets(df.iloc[positions])
+        arrivals = _utc_strings(start_utc, np.append(offsets, return_offset))
+        stops = [{"singleUseLocation": depot, "scheduledDepartureTime": _utc_strings(start_utc, np.zeros(1))[0]}]
+        stops.extend(
+            {
+                "singleUseLocation": {"address": addresses[i], "latitude": lats[i], "longitude": lons[i]},
+                "scheduledArrivalTime": arrival,
+                "notes": notes[i],
+            }
+            for i, arrival in zip(positions, arrivals[:-1])
+        )
+        stops.append({"singleUseLocation": depot, "scheduledArrivalTime": arrivals[-1]})
+        payloads.append((int(vehicle_index), {
+            "name": f"Deliveries {route_date_str} - Vehicle {vehicle_index + 1}",
+            "stops": stops,
+            "settings": {
+                "routeStartingCondition": "departFirstStop",
+                "routeCompletionCondition": "arriveLastStop"
             },
-            "scheduledArrivalTime": arrival_time.astimezone(dt.timezone.utc).isoformat().replace("+00:00", "Z"),
-            "notes": str(r.get("notes",""))[:2000]
-        })
-
-    # Add final stop to return to depot
-    final_arrival_time = arrival_time + dt.timedelta(minutes=15)
-    stops.append({
-        "singleUseLocation": {"address": "Depot", "latitude": depot_lat, "longitude": depot_lon},
-        "scheduledArrivalTime": final_arrival_time.astimezone(dt.timezone.utc).isoformat().replace("+00:00", "Z")
-    })
-    payload = {
-        "name": route_name,
-        "stops": stops,
-        "settings": {
-            "routeStartingCondition":"departFirstStop",
-            "routeCompletionCondition":"arriveLastStop"
-        }
-    }
-    if vehicle_id:
-        payload["driverId"] = str(vehicle_id)
-    
-    headers = {"Authorization": f'Bearer {token}', "Content-Type":"application/json"}
-    r = requests.post(SAMSARA_ROUTES_URL, headers=headers, json=payload, timeout=30)
-    r.raise_for_status()
-    return r.json()
-
-def upload_routes_to_samsara(all_routes_df: pd.DataFrame, route_date: dt.date, route_start_time: dt.time, hq_lat: float, hq_lon: float):
+        }))
+    return payloads
+
+def idempotency_key(payload: dict) -> str:
+    """Deterministic key for a payload, so a rerun of the same route is recognized as a duplicate."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class TokenBucket():
+    def __init__(self, rate: float, capacity: int):
+        """
+        Thread-safe token bucket shared by all upload workers.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (int): Maximum burst size.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold every worker back, e.g. for a 429's Retry-After or an exhausted rate-limit window."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def update_from_headers(self, headers: MutableMapping[str, str]):
+        """Apply the server's rate-limit headers (Retry-After, X-RateLimit-Remaining/Reset) when present."""
+        retry_after = _seconds(headers.get("Retry-After"))
+        if retry_after is not None:
+            self.pause(retry_after)
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            reset = _seconds(headers.get("X-RateLimit-Reset"))
+            if reset is not None:
+                self.pause(reset)
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class SamsaraUploader():
+    def __init__(self, token: str, routes_url: str = SAMSARA_ROUTES_URL, max_workers: int = 4,
+                 rate_per_second: float = 5.0, burst: int = 5, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0, timeout: Tuple[float, float] = (5, 30)):
+        """
+        Posts route payloads to Samsara concurrently over one pooled session.
+
+        Args:
+            token (str): Samsara API token.
+            routes_url (str): Routes endpoint; point it at a local mock server to test.
+            max_workers (int): Concurrent uploads (and pooled connections).
+            rate_per_second (float): Steady request rate of the token bucket.
+            burst (int): Token bucket capacity.
+            max_retries (int): Retries of a 429/5xx or connection error before giving up.
+            backoff_base (float): First backoff in seconds, doubled per attempt with full jitter.
+            backoff_cap (float): Longest backoff in seconds.
+            timeout (Tuple[float, float]): (connect, read) timeout per request.
+        """
+        self.routes_url = routes_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f'Bearer {token}', "Content-Type": "application/json"})
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def post_route(self, payload: dict, key: str) -> dict:
+        """Post one route, retrying rate limits and transient failures with the same idempotency key."""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                res = self.session.post(self.routes_url, json=payload, timeout=self.timeout,
+                                        headers={"Idempotency-Key": key})
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Samsara upload attempt {attempt + 1} failed: {e}")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            self.bucket.update_from_headers(res.headers)
+            if res.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                logger.warning(f"Samsara returned {res.status_code} on attempt {attempt + 1}; retrying.")
+                if "Retry-After" not in res.headers:
+                    time.sleep(self._backoff(attempt))
+                continue
+            res.raise_for_status()
+            return res.json()
+
+    def upload(self, payloads: List[Tuple[int, dict]], uploaded: Optional[Dict[str, dict]] = None) -> Iterator[Tuple[int, Optional[dict], Optional[Exception]]]:
+        """
+        Upload payloads concurrently, yielding (vehicle_index, response, error) as each finishes.
+        Payloads whose idempotency key is already in `uploaded` are not sent again (response is the
+        stored one); successful uploads are added to it.
+        """
+        uploaded = {} if uploaded is None else uploaded
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for vehicle_index, payload in payloads:
+                key = idempotency_key(payload)
+                if key in uploaded:
+                    yield vehicle_index, uploaded[key], None
+                    continue
+                futures[executor.submit(self.post_route, payload, key)] = (vehicle_index, key)
+
+            for future in as_completed(futures):
+                vehicle_index, key = futures[future]
+                try:
+                    uploaded[key] = future.result()
+                    yield vehicle_index, uploaded[key], None
+                except Exception as e:
+                    yield vehicle_index, None, e
+
+def upload_routes_to_samsara(all_routes_df: pd.DataFrame, route_date: dt.date, route_start_time: dt.time, hq_lat: float, hq_lon: float,
+                             uploaded: Optional[Dict[str, dict]] = None):
     """
-    Uploads all vehicle routes from a DataFrame to Samsara.
-    
+    Uploads all vehicle routes from a DataFrame to Samsara, several at a time.
+    Pass the same `uploaded` dict across calls (e.g. from the session state) so reruns skip routes
+    that already went through.
+
     Yields: A success or error message for each vehicle.
     """
     samsara_token = get_env("SAMSARA_API_TOKEN")
     if not samsara_token:
         raise ValueError("SAMSARA_API_TOKEN environment variable not set.")
 
-    start_local = dt.datetime.combine(route_date, route_start_time)
-    route_date_str = route_date.strftime('%Y-%m-%d')
-
-    for vehicle_index in sorted(all_routes_df["vehicle_index"].unique()):
-        try:
-            vehicle_df = all_routes_df[all_routes_df["vehicle_index"] == vehicle_index]
-            route_name = f"Deliveries {route_date_str} - Vehicle {vehicle_index + 1}"
-            
-            _samsara_upload_unsequenced(
-                vehicle_df=vehicle_df,
-                token=samsara_token,
-                route_name=route_name,
-                depot_lat=hq_lat,
-                depot_lon=hq_lon,
-                start_local=start_local
-            )
+    uploader = SamsaraUploader(
+        samsara_token,
+        routes_url=get_env("SAMSARA_ROUTES_URL", SAMSARA_ROUTES_URL),
+        max_workers=int(get_env("SAMSARA_UPLOAD_WORKERS", "4")),
+        rate_per_second=float(get_env("SAMSARA_REQUESTS_PER_SECOND", "5")),
+    )
+    payloads = build_route_payloads(all_routes_df, route_date, route_start_time, hq_lat, hq_lon)
+    for vehicle_index, _, error in uploader.upload(payloads, uploaded):
+        if error is None:
             yield f"Successfully uploaded route for Vehicle {vehicle_index + 1}"
-        except Exception as e:
-            yield f"Failed to upload for Vehicle {vehicle_index + 1}: {e}"
+        else:
+            yield f"Failed to upload for Vehicle {vehicle_index + 1}: {error}"
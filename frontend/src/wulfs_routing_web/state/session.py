@@ -14,8 +14,10 @@ def init_session_state():
         'route_date': dt.date.today(),
         'hq_lat': HQ_COORDINATES.lat,
         'hq_lon': HQ_COORDINATES.lon,
-        'map_path': None,
+        'route_geometry': None,
         'loaded_route_id': None,
+        'history_older_routes': [],
+        'history_next_cursor': None,
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -1,4 +1,6 @@
+import io
 import re
+import zipfile
 import pandas as pd
 from typing import Any, Tuple
 from shapely import wkb
@@ -13,6 +15,7 @@ def process_routes_from_api(route_stops_data):
     records = []
     for stop in route_stops_data:
         customer_data = stop.get('customers', {})
+        route_data = stop.get('routes') or {}
         records.append({
             "vehicle_index": stop['route_id'], # Using route_id to group vehicles for now
             "order_id": stop.get('order_id'),
@@ -25,9 +28,35 @@ def process_routes_from_api(route_stops_data):
             "lon": customer_data.get('lon'),
             "sequence":stop.get('sequence'),
             "notes": stop.get('notes'),
+            # Precomputed driving distance/time from the depot (None for routes without road data)
+            "cumulative_distance_m": stop.get('cumulative_distance_m'),
+            "cumulative_duration_s": stop.get('cumulative_duration_s'),
+            "route_duration_s": route_data.get('total_duration_s'),
         })
     return pd.DataFrame(records)
 
+def build_assignment_downloads(routes_df: pd.DataFrame, route_date: str) -> Tuple[dict, bytes]:
+    """
+    Builds the per-vehicle CSVs of `export_assignments` in memory, plus a zip bundle of all of them.
+
+    Returns:
+        (dict, bytes): file name -> CSV bytes, and the zip archive.
+    """
+    files = {}
+    if "vehicle_index" in routes_df.columns:
+        cols = ["vehicle_index", "order_id", "customer_name", "address", "city", "state", "zip", "lat", "lon", "notes"]
+        df = routes_df.reindex(columns=cols)
+        for d, df_d in df.groupby("vehicle_index", sort=True):
+            files[f"vehicle{d+1}_{route_date}.csv"] = df_d.to_csv(index=False).encode("utf-8")
+        if files:
+            files[f"routes_assigned_{route_date}.csv"] = df.sort_values("vehicle_index", kind="stable").to_csv(index=False).encode("utf-8")
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for name, data in files.items():
+            bundle.writestr(name, data)
+    return files, buffer.getvalue()
+
 def export_assignments(routes_df: pd.DataFrame, outdir: str, route_date: str) -> pd.DataFrame:
     """Exports the vehicle assignments to CSV files."""
     os.makedirs(outdir, exist_ok=True)
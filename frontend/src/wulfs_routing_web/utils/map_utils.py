@@ -1,59 +1,37 @@
-import os
 import folium
-import pandas as pd
 from typing import Tuple
 
-def generate_route_map(df: pd.DataFrame, outdir: str, route_date: str, depot_coords: Tuple[float, float], sequences: dict):
+# CSS colors for GeoJSON styling (folium.Icon's named colors are not all valid CSS)
+ROUTE_COLORS = ["blue", "green", "purple", "orange", "darkred", "red", "saddlebrown", "darkblue", "darkgreen",
+                "cadetblue", "indigo", "deeppink", "teal", "olive", "gray", "black"]
+
+def build_geojson_map(route_geometry: dict, depot_coords: Tuple[float, float]) -> folium.Map:
     """
-    Saves an HTML map of the routes. 
-    Note: The stops displayed are unsequenced; this map is for visualizing vehicle assignments, not optimized delivery order.
-    Returns the path to the saved map file.
+    Builds a map from the API's route GeoJSON. All route lines and stops are drawn as a single
+    GeoJson layer (styled per route) instead of one folium object per stop.
     """
     m = folium.Map(location=[depot_coords[1], depot_coords[0]], zoom_start=10)
-    
-    # Add depot marker
     folium.Marker(
         location=[depot_coords[1], depot_coords[0]],
         popup="Depot",
         icon=folium.Icon(color="red", icon="info-sign"),
     ).add_to(m)
 
-    colors = ["blue", "green", "purple", "orange", "darkred", "lightred", "beige", "darkblue", "darkgreen", "cadetblue", "darkpurple", "white", "pink", "lightblue", "lightgreen", "gray", "black", "lightgray"]
-
-    # If sequences are not provided, we can just show the stops for each vehicle
-    if not sequences:
-        for vehicle_index in df["vehicle_index"].unique():
-            vehicle_df = df[df["vehicle_index"] == vehicle_index]
-            color = colors[vehicle_index % len(colors)]
-            for _, row in vehicle_df.iterrows():
-                folium.Marker(
-                    location=[row["lat"], row["lon"]],
-                    popup=f"<b>{row['customer_name']}</b><br>Vehicle: {vehicle_index + 1}",
-                    icon=folium.Icon(color=color, icon="truck", prefix="fa"),
-                ).add_to(m)
-    else:
-        for vehicle_index, seq in sequences.items():
-            color = colors[vehicle_index % len(colors)]
-            route_points = [(depot_coords[1], depot_coords[0])]
-            for original_df_index in seq:
-                if original_df_index != 0: # 0 is the depot
-                    row = df.loc[original_df_index]
-                    route_points.append((row["lat"], row["lon"])) 
-            route_points.append((depot_coords[1], depot_coords[0]))
+    for feature in route_geometry["features"]:
+        props = feature["properties"]
+        if props["kind"] == "route":
+            props["label"] = f"Route {props['route_id']} ({props['stop_count']} stops)"
+        else:
+            props["label"] = f"{props['sequence']}. {props['name']}"
 
-            folium.PolyLine(route_points, color=color, weight=2.5, opacity=1).add_to(m)
+    def style(feature):
+        color = ROUTE_COLORS[feature["properties"]["route_index"] % len(ROUTE_COLORS)]
+        return {"color": color, "fillColor": color, "weight": 2.5, "opacity": 1, "fillOpacity": 0.9}
 
-            for original_df_index in seq:
-                if original_df_index != 0: # 0 is the depot
-                    row = df.loc[original_df_index]
-                    folium.Marker(
-                        location=[row["lat"], row["lon"]],
-                        popup=f"<b>{row['customer_name']}</b>",
-                        icon=folium.Icon(color=color, icon="truck", prefix="fa"),
-                    ).add_to(m)
-                    
-    os.makedirs(outdir, exist_ok=True)
-    map_path = os.path.join(outdir, f"routes_map_{route_date}.html")
-    m.save(map_path)
-    print(f"🗺️  Saved routes map to {map_path}")
-    return map_path
+    folium.GeoJson(
+        route_geometry,
+        style_function=style,
+        marker=folium.CircleMarker(radius=6),
+        tooltip=folium.GeoJsonTooltip(fields=["label"], labels=False),
+    ).add_to(m)
+    return m
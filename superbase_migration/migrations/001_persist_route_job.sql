@@ -0,0 +1,51 @@
+-- =========================
+-- Bulk, transactional persistence of a routing job
+-- =========================
+-- Inserts every route of a job together with its stops in a single statement, so a
+-- failure cannot leave orphan routes behind. Payloads are parallel (columnar) arrays;
+-- stops reference their route by vehicle_index. Only the new ids are returned.
+CREATE OR REPLACE FUNCTION public.persist_route_job(
+  p_route_date TIMESTAMP,
+  p_vehicle_index BIGINT[],
+  p_route_name TEXT[],
+  p_stop_vehicle_index BIGINT[],
+  p_stop_customer_id BIGINT[],
+  p_stop_sequence BIGINT[],
+  p_stop_notes TEXT[]
+)
+RETURNS TABLE (vehicle_index BIGINT, route_id BIGINT)
+LANGUAGE sql
+AS $$
+  WITH new_routes AS (
+    INSERT INTO public.routes (route_date, vehicle_index, route_name)
+    SELECT p_route_date, r.vehicle_index, r.route_name
+    FROM unnest(p_vehicle_index, p_route_name) AS r(vehicle_index, route_name)
+    RETURNING routes.id, routes.vehicle_index
+  ), new_stops AS (
+    INSERT INTO public.stops (route_id, customer_id, sequence, notes)
+    SELECT nr.id, s.customer_id, s.sequence, COALESCE(s.notes, '')
+    FROM unnest(p_stop_vehicle_index, p_stop_customer_id, p_stop_sequence, p_stop_notes)
+         AS s(vehicle_index, customer_id, sequence, notes)
+    JOIN new_routes nr ON nr.vehicle_index = s.vehicle_index
+  )
+  SELECT nr.vehicle_index, nr.id FROM new_routes nr;
+$$;
+
+-- Appends further stop chunks to routes created by persist_route_job (very large jobs).
+CREATE OR REPLACE FUNCTION public.append_route_stops(
+  p_route_id BIGINT[],
+  p_customer_id BIGINT[],
+  p_sequence BIGINT[],
+  p_notes TEXT[]
+)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+  WITH new_stops AS (
+    INSERT INTO public.stops (route_id, customer_id, sequence, notes)
+    SELECT s.route_id, s.customer_id, s.sequence, COALESCE(s.notes, '')
+    FROM unnest(p_route_id, p_customer_id, p_sequence, p_notes) AS s(route_id, customer_id, sequence, notes)
+    RETURNING 1
+  )
+  SELECT count(*) FROM new_stops;
+$$;
@@ -0,0 +1,116 @@
+-- =========================
+-- Indexes for history queries
+-- =========================
+-- Stops are always fetched by route, and FK cascades from routes/customers scan stops.
+CREATE INDEX IF NOT EXISTS stops_route_id_sequence_idx ON public.stops (route_id, sequence);
+CREATE INDEX IF NOT EXISTS stops_customer_id_idx ON public.stops (customer_id);
+-- History lists filter by route date and page newest first.
+CREATE INDEX IF NOT EXISTS routes_route_date_idx ON public.routes (route_date);
+CREATE INDEX IF NOT EXISTS routes_created_at_id_idx ON public.routes (created_at DESC, id DESC);
+
+-- =========================
+-- Route summary
+-- =========================
+-- One row per route with its stop count and distance, maintained incrementally by
+-- triggers so history lists never have to aggregate the stops table.
+-- total_distance_miles is the straight-line (haversine) distance between consecutive
+-- stops in sequence order; depot legs are not included.
+CREATE TABLE IF NOT EXISTS public.route_summary (
+  route_id BIGINT PRIMARY KEY REFERENCES public.routes(id) ON DELETE CASCADE,
+  route_date TIMESTAMP NOT NULL,
+  vehicle_index BIGINT NOT NULL,
+  route_name TEXT NOT NULL,
+  created_at TIMESTAMP NOT NULL,
+  stop_count BIGINT NOT NULL DEFAULT 0,
+  total_distance_miles DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS route_summary_route_date_idx ON public.route_summary (route_date);
+CREATE INDEX IF NOT EXISTS route_summary_created_at_id_idx ON public.route_summary (created_at DESC, route_id DESC);
+
+-- Recompute the stop aggregates of the given routes
+CREATE OR REPLACE FUNCTION public.refresh_route_summary(p_route_ids BIGINT[])
+RETURNS void
+LANGUAGE sql
+AS $$
+  WITH ordered AS (
+    SELECT s.route_id, c.lat, c.lon,
+           LAG(c.lat) OVER w AS prev_lat,
+           LAG(c.lon) OVER w AS prev_lon
+    FROM public.stops s
+    JOIN public.customers c ON c.id = s.customer_id
+    WHERE s.route_id = ANY(p_route_ids)
+    WINDOW w AS (PARTITION BY s.route_id ORDER BY s.sequence)
+  ), totals AS (
+    SELECT route_id,
+           count(*) AS stop_count,
+           COALESCE(sum(
+             3958.8 * 2 * asin(sqrt(
+               power(sin(radians(lat - prev_lat) / 2), 2) +
+               cos(radians(prev_lat)) * cos(radians(lat)) * power(sin(radians(lon - prev_lon) / 2), 2)
+             ))
+           ), 0) AS total_distance_miles
+    FROM ordered
+    GROUP BY route_id
+  )
+  UPDATE public.route_summary rs
+  SET stop_count = COALESCE(t.stop_count, 0),
+      total_distance_miles = COALESCE(t.total_distance_miles, 0)
+  FROM unnest(p_route_ids) AS ids(route_id)
+  LEFT JOIN totals t ON t.route_id = ids.route_id
+  WHERE rs.route_id = ids.route_id;
+$$;
+
+CREATE OR REPLACE FUNCTION public.route_summary_on_routes_insert()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public.route_summary (route_id, route_date, vehicle_index, route_name, created_at)
+  SELECT id, route_date, vehicle_index, route_name, created_at FROM new_routes
+  ON CONFLICT (route_id) DO NOTHING;
+  RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.route_summary_on_stops_insert()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM public.refresh_route_summary(ARRAY(SELECT DISTINCT route_id FROM new_stops));
+  RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.route_summary_on_stops_delete()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM public.refresh_route_summary(ARRAY(SELECT DISTINCT route_id FROM old_stops));
+  RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS route_summary_routes_insert ON public.routes;
+CREATE TRIGGER route_summary_routes_insert
+  AFTER INSERT ON public.routes
+  REFERENCING NEW TABLE AS new_routes
+  FOR EACH STATEMENT EXECUTE FUNCTION public.route_summary_on_routes_insert();
+
+DROP TRIGGER IF EXISTS route_summary_stops_insert ON public.stops;
+CREATE TRIGGER route_summary_stops_insert
+  AFTER INSERT ON public.stops
+  REFERENCING NEW TABLE AS new_stops
+  FOR EACH STATEMENT EXECUTE FUNCTION public.route_summary_on_stops_insert();
+
+DROP TRIGGER IF EXISTS route_summary_stops_delete ON public.stops;
+CREATE TRIGGER route_summary_stops_delete
+  AFTER DELETE ON public.stops
+  REFERENCING OLD TABLE AS old_stops
+  FOR EACH STATEMENT EXECUTE FUNCTION public.route_summary_on_stops_delete();
+
+-- Backfill existing history
+INSERT INTO public.route_summary (route_id, route_date, vehicle_index, route_name, created_at)
+SELECT id, route_date, vehicle_index, route_name, created_at FROM public.routes
+ON CONFLICT (route_id) DO NOTHING;
+
+SELECT public.refresh_route_summary(ARRAY(SELECT id FROM public.routes));
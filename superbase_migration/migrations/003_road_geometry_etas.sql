@@ -0,0 +1,101 @@
+-- =========================
+-- Road geometry and ETAs stored with routes and stops
+-- =========================
+-- Computed once per job from OSRM (one request per vehicle) so maps, history views and
+-- Samsara uploads read them instead of recomputing. All columns are nullable: routes OSRM
+-- could not serve, and routes created before this migration, have no road data.
+--   stops.leg_polyline           encoded polyline (precision 5) of the leg arriving at the stop
+--   stops.cumulative_distance_m  driving distance from the depot to the stop
+--   stops.cumulative_duration_s  driving time from the depot to the stop (no service time)
+--   routes.total_*               the whole trip including the return to the depot
+ALTER TABLE public.stops
+  ADD COLUMN IF NOT EXISTS leg_polyline TEXT,
+  ADD COLUMN IF NOT EXISTS cumulative_distance_m DOUBLE PRECISION,
+  ADD COLUMN IF NOT EXISTS cumulative_duration_s DOUBLE PRECISION;
+
+ALTER TABLE public.routes
+  ADD COLUMN IF NOT EXISTS total_distance_m DOUBLE PRECISION,
+  ADD COLUMN IF NOT EXISTS total_duration_s DOUBLE PRECISION;
+
+ALTER TABLE public.route_summary
+  ADD COLUMN IF NOT EXISTS road_distance_miles DOUBLE PRECISION,
+  ADD COLUMN IF NOT EXISTS total_duration_s DOUBLE PRECISION;
+
+CREATE OR REPLACE FUNCTION public.route_summary_on_routes_insert()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public.route_summary (route_id, route_date, vehicle_index, route_name, created_at,
+                                    road_distance_miles, total_duration_s)
+  SELECT id, route_date, vehicle_index, route_name, created_at,
+         total_distance_m / 1609.344, total_duration_s
+  FROM new_routes
+  ON CONFLICT (route_id) DO NOTHING;
+  RETURN NULL;
+END $$;
+
+-- The job RPCs gain the road columns; drop the old signatures so no overload is left behind
+DROP FUNCTION IF EXISTS public.persist_route_job(TIMESTAMP, BIGINT[], TEXT[], BIGINT[], BIGINT[], BIGINT[], TEXT[]);
+DROP FUNCTION IF EXISTS public.append_route_stops(BIGINT[], BIGINT[], BIGINT[], TEXT[]);
+
+CREATE OR REPLACE FUNCTION public.persist_route_job(
+  p_route_date TIMESTAMP,
+  p_vehicle_index BIGINT[],
+  p_route_name TEXT[],
+  p_total_distance_m DOUBLE PRECISION[],
+  p_total_duration_s DOUBLE PRECISION[],
+  p_stop_vehicle_index BIGINT[],
+  p_stop_customer_id BIGINT[],
+  p_stop_sequence BIGINT[],
+  p_stop_notes TEXT[],
+  p_stop_leg_polyline TEXT[],
+  p_stop_cumulative_distance_m DOUBLE PRECISION[],
+  p_stop_cumulative_duration_s DOUBLE PRECISION[]
+)
+RETURNS TABLE (vehicle_index BIGINT, route_id BIGINT)
+LANGUAGE sql
+AS $$
+  WITH new_routes AS (
+    INSERT INTO public.routes (route_date, vehicle_index, route_name, total_distance_m, total_duration_s)
+    SELECT p_route_date, r.vehicle_index, r.route_name, r.total_distance_m, r.total_duration_s
+    FROM unnest(p_vehicle_index, p_route_name, p_total_distance_m, p_total_duration_s)
+         AS r(vehicle_index, route_name, total_distance_m, total_duration_s)
+    RETURNING routes.id, routes.vehicle_index
+  ), new_stops AS (
+    INSERT INTO public.stops (route_id, customer_id, sequence, notes,
+                              leg_polyline, cumulative_distance_m, cumulative_duration_s)
+    SELECT nr.id, s.customer_id, s.sequence, COALESCE(s.notes, ''),
+           s.leg_polyline, s.cumulative_distance_m, s.cumulative_duration_s
+    FROM unnest(p_stop_vehicle_index, p_stop_customer_id, p_stop_sequence, p_stop_notes,
+                p_stop_leg_polyline, p_stop_cumulative_distance_m, p_stop_cumulative_duration_s)
+         AS s(vehicle_index, customer_id, sequence, notes, leg_polyline, cumulative_distance_m, cumulative_duration_s)
+    JOIN new_routes nr ON nr.vehicle_index = s.vehicle_index
+  )
+  SELECT nr.vehicle_index, nr.id FROM new_routes nr;
+$$;
+
+CREATE OR REPLACE FUNCTION public.append_route_stops(
+  p_route_id BIGINT[],
+  p_customer_id BIGINT[],
+  p_sequence BIGINT[],
+  p_notes TEXT[],
+  p_leg_polyline TEXT[],
+  p_cumulative_distance_m DOUBLE PRECISION[],
+  p_cumulative_duration_s DOUBLE PRECISION[]
+)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+  WITH new_stops AS (
+    INSERT INTO public.stops (route_id, customer_id, sequence, notes,
+                              leg_polyline, cumulative_distance_m, cumulative_duration_s)
+    SELECT s.route_id, s.customer_id, s.sequence, COALESCE(s.notes, ''),
+           s.leg_polyline, s.cumulative_distance_m, s.cumulative_duration_s
+    FROM unnest(p_route_id, p_customer_id, p_sequence, p_notes,
+                p_leg_polyline, p_cumulative_distance_m, p_cumulative_duration_s)
+         AS s(route_id, customer_id, sequence, notes, leg_polyline, cumulative_distance_m, cumulative_duration_s)
+    RETURNING 1
+  )
+  SELECT count(*) FROM new_stops;
+$$;
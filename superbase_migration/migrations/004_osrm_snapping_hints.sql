@@ -0,0 +1,44 @@
+-- =========================
+-- OSRM snapping hints per customer
+-- =========================
+-- Filled by the nightly precompute (services/snapping_service.py) from OSRM /nearest, and
+-- refreshed when the OSRM dataset changes. Route and table requests send the hints so OSRM
+-- skips the nearest-edge search for known customers. All columns are nullable: customers
+-- without coordinates, or not yet snapped, have no hint.
+--   snap_lat, snap_lon   road network location the customer snaps to
+--   snap_distance_m      distance from the customer's lat/lon to that location
+--   osrm_hint            opaque OSRM hint, only valid for the dataset it came from
+--   osrm_dataset         identifier of that dataset
+ALTER TABLE public.customers
+  ADD COLUMN IF NOT EXISTS snap_lat DOUBLE PRECISION,
+  ADD COLUMN IF NOT EXISTS snap_lon DOUBLE PRECISION,
+  ADD COLUMN IF NOT EXISTS snap_distance_m DOUBLE PRECISION,
+  ADD COLUMN IF NOT EXISTS osrm_hint TEXT,
+  ADD COLUMN IF NOT EXISTS osrm_dataset TEXT;
+
+-- Stores many customers' snaps in one statement (columnar arrays, like persist_route_job)
+CREATE OR REPLACE FUNCTION public.set_customer_snaps(
+  p_customer_id BIGINT[],
+  p_snap_lat DOUBLE PRECISION[],
+  p_snap_lon DOUBLE PRECISION[],
+  p_snap_distance_m DOUBLE PRECISION[],
+  p_osrm_hint TEXT[],
+  p_osrm_dataset TEXT
+)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE public.customers c
+    SET snap_lat = s.snap_lat,
+        snap_lon = s.snap_lon,
+        snap_distance_m = s.snap_distance_m,
+        osrm_hint = s.osrm_hint,
+        osrm_dataset = p_osrm_dataset
+    FROM unnest(p_customer_id, p_snap_lat, p_snap_lon, p_snap_distance_m, p_osrm_hint)
+         AS s(customer_id, snap_lat, snap_lon, snap_distance_m, osrm_hint)
+    WHERE c.id = s.customer_id
+    RETURNING 1
+  )
+  SELECT count(*) FROM updated;
+$$;